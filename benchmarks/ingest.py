@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compares the CPU time it takes to turn pages of issues into the records of
+the list, making ``github3`` objects first or straight from the JSON.
+
+    $ python benchmarks/ingest.py [issues]
+"""
+
+import os
+import sys
+import json
+import timeit
+
+from github3.issues import Issue
+from github3.session import GitHubSession
+
+# The shipit of this checkout, not an installed one
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from shipit.records import PER_PAGE, record_from_json
+
+API = "https://api.github.com"
+
+
+def user(id):
+    url = "%s/users/user%s" % (API, id)
+    return {
+        "login": "user%s" % id, "id": id, "type": "User", "site_admin": False,
+        "gravatar_id": "", "avatar_url": "https://avatars.githubusercontent.com/u/%s" % id,
+        "url": url, "html_url": "https://github.com/user%s" % id,
+        "followers_url": url + "/followers",
+        "following_url": url + "/following{/other_user}",
+        "gists_url": url + "/gists{/gist_id}",
+        "starred_url": url + "/starred{/owner}{/repo}",
+        "subscriptions_url": url + "/subscriptions",
+        "organizations_url": url + "/orgs",
+        "repos_url": url + "/repos",
+        "events_url": url + "/events{/privacy}",
+        "received_events_url": url + "/received_events",
+    }
+
+
+def label(id):
+    return {"id": id, "name": "label %s" % id, "color": "fc2929",
+            "description": "", "default": False,
+            "url": "%s/repos/shipit/shipit/labels/label%s" % (API, id)}
+
+
+def issue(number):
+    url = "%s/repos/shipit/shipit/issues/%s" % (API, number)
+    return {
+        "id": number, "number": number, "title": "Issue %s" % number,
+        "state": "open", "locked": False, "comments": number % 7,
+        "body": "Something is broken.\n" * 20,
+        "body_text": "Something is broken.\n" * 20,
+        "body_html": "<p>Something is broken.</p>\n" * 20,
+        "user": user(number % 50), "assignee": None, "assignees": [],
+        "milestone": None, "labels": [label(number % 10), label(number % 3)],
+        "created_at": "2014-01-20T10:00:00Z", "updated_at": "2014-01-21T10:00:00Z",
+        "closed_at": None, "closed_by": None, "author_association": "NONE",
+        "url": url, "html_url": "https://github.com/shipit/shipit/issues/%s" % number,
+        "comments_url": url + "/comments", "events_url": url + "/events",
+        "labels_url": url + "/labels{/name}",
+    }
+
+
+def through_github3(pages, session):
+    """How the records were made before: from the issues of ``iter_issues``."""
+    return [record_from_json(issue._json_data, session)
+            for page in pages
+            for issue in [Issue(data, session) for data in json.loads(page)]]
+
+
+def straight_from_json(pages, session):
+    return [record_from_json(data, session)
+            for page in pages
+            for data in json.loads(page)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    issues = [issue(number) for number in range(1, count + 1)]
+    pages = [json.dumps(issues[start:start + PER_PAGE])
+             for start in range(0, count, PER_PAGE)]
+    session = GitHubSession()
+
+    print("%s issues in %s pages" % (count, len(pages)))
+    results = {}
+    for ingest in (through_github3, straight_from_json):
+        seconds = min(timeit.repeat(lambda: ingest(pages, session), number=1, repeat=3))
+        results[ingest.__name__] = seconds
+        print("%-20s %.3fs, %.2fms per page" % (ingest.__name__, seconds,
+                                                1000 * seconds / len(pages)))
+
+    print("%.1fx faster" % (results["through_github3"] / results["straight_from_json"]))
+
+
+if __name__ == "__main__":
+    main()
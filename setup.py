@@ -37,4 +37,7 @@ setup(name=NAME,
           "Operating System :: MacOS",
           "Programming Language :: Python :: 3.3",
       ],
-      install_requires=REQUIREMENTS,)
+      install_requires=REQUIREMENTS,
+      extras_require={
+          "highlight": ["pygments"],
+      },)
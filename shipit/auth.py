@@ -8,13 +8,23 @@ Authentication helpers.
 """
 
 import os
+import hashlib
 from getpass import getpass
-from ConfigParser import ConfigParser
 
-from github3 import authorize
-from github3 import login as github_login
+try:
+    from configparser import ConfigParser
+except ImportError:
+    from ConfigParser import ConfigParser
+
+try:
+    input = raw_input
+except NameError:
+    pass
+
+from github3 import authorize, GitHub
 
 from shipit import DESCRIPTION
+from .session import Session, POOL_SIZE, CONNECT_TIMEOUT, READ_TIMEOUT
 
 
 # Path to config file
@@ -24,6 +34,26 @@ CONFIG_FILE = os.path.join(os.environ['HOME'], '.shipit')
 SCOPES = ['repo']
 
 
+def create_session(config):
+    """
+    Create the HTTP session, tuned with the ``http`` section of the config
+    file if there is one:
+
+        [http]
+        pool_size = 11
+        connect_timeout = 5
+        read_timeout = 30
+    """
+    def option(name, default):
+        if config.has_option('http', name):
+            return config.getint('http', name)
+        return default
+
+    return Session(pool_size=option('pool_size', POOL_SIZE),
+                   connect_timeout=option('connect_timeout', CONNECT_TIMEOUT),
+                   read_timeout=option('read_timeout', READ_TIMEOUT))
+
+
 def login():
     # Do we have the credentials stored?
     c = ConfigParser()
@@ -35,7 +65,7 @@ def login():
     else:
         # Ask for credentials
         print("Please insert your GitHub credentials below:")
-        user = raw_input("Username: ").strip()
+        user = input("Username: ").strip()
         password = getpass().strip()
 
         auth = authorize(user, password, SCOPES, DESCRIPTION)
@@ -49,4 +79,19 @@ def login():
         with open(CONFIG_FILE, 'w') as f:
             c.write(f)
 
-    return github_login(token=token)
+    api = GitHub()
+    api._session = create_session(c)
+    api.login(token=token)
+
+    return api
+
+
+def account():
+    """
+    Return an identifier of the stored credentials that isn't the token, to
+    keep what's cached for every account apart.
+    """
+    c = ConfigParser()
+    c.read(CONFIG_FILE)
+    token = c.get('credentials', 'token').strip()
+    return hashlib.sha1(token.encode('utf-8')).hexdigest()[:16]
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.bootstrap
+~~~~~~~~~~~~~~~~
+
+What every run needs from GitHub before showing anything, kept between runs.
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+
+from github3.users import User
+from github3.repos import Repository
+
+from .records import record_from_json
+
+
+# Seconds the user and the repositories are trusted for
+TTL = 24 * 60 * 60
+
+# Caches of other versions are ignored
+VERSION = 1
+
+
+def resolve_repository(api, user, repo):
+    """
+    Return the repository ``user/repo``, or its parent if it's a fork without
+    issue tracker. Return ``None`` if no issue tracker is found.
+    """
+    repository = api.repository(user, repo)
+    while not repository.has_issues:
+        if repository.fork:
+            repository = repository.parent
+        else:
+            return None
+    return repository
+
+
+def branch_pull_request(session, repo_api, head, sha=None):
+    """
+    Return the JSON of the pull request from the branch ``head`` of the
+    repository at ``repo_api``, with a single request. If there are several,
+    return the one of commit ``sha`` or else the latest one.
+    """
+    params = {"head": head, "state": "all", "per_page": 10}
+    response = session.get(repo_api + "/pulls", params=params)
+    response.raise_for_status()
+
+    pulls = response.json()
+    for pull in pulls:
+        if pull["head"]["sha"] == sha:
+            return pull
+    return pulls[0] if pulls else None
+
+
+class Bootstrap(object):
+    """
+    The logged in user and the repositories shown, with the issue trackers of
+    forks resolved, fetched with ``api`` and kept in ``path`` for ``ttl``
+    seconds. Launching in a familiar repository makes no requests at all.
+
+    It's safe to use from several threads, to fetch what isn't known yet
+    concurrently.
+    """
+    USER = User
+    REPOSITORY = Repository
+
+    def __init__(self, api, path, ttl=TTL, clock=time.time):
+        self.api = api
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+
+        try:
+            with open(self.path) as f:
+                cache = json.load(f)
+            return cache["entries"] if cache.get("version") == VERSION else {}
+        except (ValueError, KeyError, TypeError, AttributeError):
+            # A corrupted cache isn't worth crashing for
+            return {}
+
+    def _save(self):
+        # Other shipit may be saving the same cache
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": VERSION, "entries": self._entries}, f)
+            os.rename(tmp_path, self.path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def _fresh(self, key):
+        """Return the cached JSON of ``key``, unless it's missing or too old."""
+        entry = self._entries.get(key)
+        if entry is not None and self.clock() - entry["saved_at"] < self.ttl:
+            return entry["json"]
+
+    def _store(self, key, json):
+        with self._lock:
+            self._entries[key] = {"saved_at": self.clock(), "json": json}
+            self._save()
+
+    def _cached(self, key, fetch, make):
+        """
+        Return the object of ``key`` made with ``make`` from the cached JSON,
+        or fetch it with ``fetch`` and cache it if it's missing or too old.
+        """
+        json = self._fresh(key)
+        if json is not None:
+            return make(json, self.api._session)
+
+        fetched = fetch()
+        if fetched is not None:
+            self._store(key, fetched._json_data)
+        return fetched
+
+    def user(self):
+        """Return the logged in user."""
+        return self._cached("user", self.api.user, self.USER)
+
+    def repository(self, owner, name):
+        """
+        Return the repository ``owner/name``, or the one with the issue
+        tracker of the fork ``owner/name``, or ``None`` if there is none.
+        """
+        return self._cached("repository:%s/%s" % (owner, name),
+                            lambda: resolve_repository(self.api, owner, name),
+                            self.REPOSITORY)
+
+    def pull_request(self, repo, head, sha=None):
+        """
+        Return the record of the pull request of ``repo`` from the branch
+        ``head`` (``owner:branch``), the one of commit ``sha`` if there are
+        several, or ``None`` if there is none.
+
+        It's only fetched again when the branch moves to another commit.
+        """
+        key = "pull_request:%s:%s" % (repo.full_name, head)
+        json = self._fresh(key)
+        if json is None or json["head"]["sha"] != sha:
+            json = branch_pull_request(self.api._session, repo._api, head, sha)
+            if json is None:
+                return
+            self._store(key, json)
+
+        return record_from_json(json, self.api._session)
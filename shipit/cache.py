@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.cache
+~~~~~~~~~~~~
+
+Bounded in-memory caches.
+"""
+
+from collections import OrderedDict
+from threading import RLock
+
+
+class LRUCache(object):
+    """
+    A mapping that holds at most ``max_entries`` items, evicting the least
+    recently used ones when it's full. Safe to use from several threads.
+
+    If ``max_size`` is given, the items are also evicted when the sum of their
+    sizes exceeds it. The size of a value is computed with ``sizeof`` when
+    it's stored and every time it's used, since values may grow.
+    """
+    def __init__(self, max_entries=128, max_size=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.size = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def keys(self):
+        return list(self._entries.keys())
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            value = self._entries[key]
+            self._resize(key, value)
+            self._evict(keep=key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._resize(key, value)
+            self._evict(keep=key)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            self.size -= self._sizes.pop(key, 0)
+            return self._entries.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.size = 0
+
+    def _resize(self, key, value):
+        if self.sizeof is None:
+            return
+        size = self.sizeof(value)
+        self.size += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+
+    def _over_budget(self):
+        if len(self._entries) > self.max_entries:
+            return True
+        return self.max_size is not None and self.size > self.max_size
+
+    def _evict(self, keep=None):
+        # The entry that was just used is never evicted, even if it doesn't
+        # fit the budget on its own
+        while self._over_budget() and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            if key == keep:
+                break
+            self.pop(key)
+
+
+class ViewCache(LRUCache):
+    """
+    A LRU cache of views. Every view is stored along with a stamp of the item
+    it shows, e.g. when it was last updated, and it's discarded when asked for
+    with a different stamp.
+    """
+    def __init__(self, max_entries=32, max_size=None, sizeof=None):
+        view_sizeof = None if sizeof is None else lambda entry: sizeof(entry[1])
+        super(ViewCache, self).__init__(max_entries, max_size, view_sizeof)
+
+    def get(self, key, stamp=None):
+        entry = super(ViewCache, self).get(key)
+        if entry is None:
+            return
+
+        cached_stamp, view = entry
+        if cached_stamp != stamp:
+            self.pop(key)
+            return
+
+        return view
+
+    def put(self, key, view, stamp=None):
+        super(ViewCache, self).put(key, (stamp, view))
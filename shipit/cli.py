@@ -9,32 +9,79 @@ Starts the engines.
 
 import sys
 from argparse import ArgumentParser
+from functools import partial
+from importlib import import_module
+from itertools import chain
 
-from .ui import UI
-from .core import Shipit
-from .auth import login
-from .git import get_remotes, extract_user_and_repo_from_remote
+from .config import data_path
+from .coalesce import coalesce_gets
+from .ratelimit import RATE_LIMIT
+from .scheduler import SCHEDULER
+from .git import get_remotes, current_branch, extract_user_and_repo_from_remote
+from .startup import StartupProfile
 
 
 ERR_NOT_IN_REPO = 1
 ERR_UNABLE_TO_FIND_REMOTE = 2
 ERR_ORIGIN_REMOTE_NOT_FOUND = 3
 ERR_NO_ISSUETRACKER = 4
+ERR_NO_PULL_REQUEST = 5
 
 VERSION = "alpha"
 
 
+def read_mirror_arguments(argv):
+    """Read the arguments of ``shipit mirror`` and return a dictionary."""
+    parser = ArgumentParser("shipit mirror",
+                            description="Write every issue, pull request and "
+                                        "comment of a repository to a file, "
+                                        "as JSON lines")
+
+    parser.add_argument("user/repository",
+                        nargs='?',
+                        help="The repository to mirror")
+
+    parser.add_argument("-o",
+                        "--output",
+                        help="Where to write it, <user>-<repository>.ndjson by default")
+
+    args = vars(parser.parse_args(argv))
+    args["user/repository"] = [args["user/repository"] or ""]
+    args.update(mirror=True, org=[], daemon=False)
+    return args
+
+
 def read_arguments():
     """Read arguments from the command line and return a dictionary."""
+    # `shipit mirror` is a command of its own
+    if sys.argv[1:2] == ["mirror"]:
+        return read_mirror_arguments(sys.argv[2:])
 
     parser_title = "shipit"
     parser = ArgumentParser(parser_title)
 
-    # Repo
+    # Repos
     parser.add_argument("user/repository",
-                        nargs='?',
-                        default="",
-                        help="The repository to show")
+                        nargs='*',
+                        help="The repositories to show")
+
+    parser.add_argument("--org",
+                        action="append",
+                        default=[],
+                        help="Show the repositories of an organization too")
+
+    parser.add_argument("--branch",
+                        action="store_true",
+                        help="Open the pull request of the current branch")
+
+    # Daemon
+    parser.add_argument("--daemon",
+                        action="store_true",
+                        help="Keep repositories in sync for every shipit running")
+
+    parser.add_argument("--no-daemon",
+                        action="store_true",
+                        help="Sync on our own even if a daemon is running")
 
     # version
     version = "shipit %s" % VERSION
@@ -44,23 +91,105 @@ def read_arguments():
                         version=version,
                         help="Show the current version of shipit")
 
+    # HTTP statistics
+    parser.add_argument("--http-stats",
+                        action="store_true",
+                        help="Show statistics of the HTTP session on exit")
+
+    # Startup time
+    parser.add_argument("--profile-startup",
+                        action="store_true",
+                        help="Show how long every phase of startup took on exit")
+
     args = parser.parse_args()
 
     # Coerce `args` to a dictionary
-    return vars(args)
+    return dict(vars(args), mirror=False)
+
+
+def organization_repositories(api, org):
+    """Return the repositories of ``org`` that have an issue tracker."""
+    repositories = api.organization(org).iter_repos()
+    return [repository for repository in repositories if repository.has_issues]
 
 
 def main():
-    args = read_arguments()
+    profile = StartupProfile()
+
+    with profile.phase("arguments"):
+        args = read_arguments()
+
+    # Heavy dependencies aren't imported for `--help` or `--version`
+    for module in ("github3", "urwid"):
+        with profile.phase("import %s" % module):
+            import_module(module)
+
+    with profile.phase("import shipit"):
+        from .auth import login, account
+        from .bootstrap import Bootstrap
+        from .ui import UI
+        from .core import Shipit
+        from .daemon import serve, connect, socket_path
+
+    with profile.phase("login"):
+        api = login()
+
+    # Keep track of the API quota, and spend it wisely
+    RATE_LIMIT.watch(api._session)
+    coalesce_gets(api._session)
+    SCHEDULER.budget = RATE_LIMIT
+
+    # The user and repositories of previous runs aren't fetched again
+    bootstrap = Bootstrap(api, data_path("bootstrap", "%s.json" % account()))
+
+    if args["daemon"]:
+        serve(bootstrap, account())
+        return
 
-    api = login()
+    with profile.phase("repositories"):
+        user, repos = load_repositories(api, bootstrap, args)
 
-    user = api.user()
+    if not repos:
+        print("No issue tracker found.")
+        sys.exit(ERR_NO_ISSUETRACKER)
 
-    # Get the user and repository that we are we going to manage
-    user_repo_arg = args["user/repository"].strip()
+    if args["mirror"]:
+        mirror(repos[0], args["output"])
+        return
 
-    if not user_repo_arg:
+    print("Loading: {}".format(", ".join(repo.full_name for repo in repos)))
+
+    pull_request = None
+    if args["branch"]:
+        with profile.phase("pull request"):
+            pull_request = branch_pull_request(bootstrap, repos[0])
+
+    with profile.phase("interface"):
+        # create view
+        ui = UI(repos)
+
+        # create controller
+        daemon = None if args["no_daemon"] else connect(socket_path(account()))
+        shipit = Shipit(ui, repos, user, daemon=daemon)
+
+    shipit.start(on_started=profile.finish, pull_request=pull_request)
+
+    if args["http_stats"]:
+        print(api._session.report())
+
+    if args["profile_startup"]:
+        print(profile.report())
+
+
+def load_repositories(api, bootstrap, args):
+    """
+    Return the logged in user and the repositories to manage, given in
+    ``args`` or the ones of the git repository we are in.
+    """
+    user_repo_args = [arg.strip() for arg in args["user/repository"] if arg.strip()]
+    names = []
+
+    if not user_repo_args and not args["org"]:
         remotes = get_remotes()
 
         if remotes is None:
@@ -77,30 +206,79 @@ def main():
         if remote is None:
             sys.exit(ERR_ORIGIN_REMOTE_NOT_FOUND)
 
-        USER, REPO = extract_user_and_repo_from_remote(remote)
-    elif "/" in user_repo_arg:
-        # Assume that we got a <username>/<repository>
-        USER, REPO = user_repo_arg.split("/")
-    else:
-        # If a `/` isn't included, assume that it's the name of the repository
-        # and the logged in user owns it
-        USER, REPO = str(user), user_repo_arg
-
-    # fetch repo
-    repo = api.repository(USER, REPO)
-    while not repo.has_issues:
-        if repo.fork:
-            repo = repo.parent
+        names.append(extract_user_and_repo_from_remote(remote))
+
+    for user_repo_arg in user_repo_args:
+        if "/" in user_repo_arg:
+            # Assume that we got a <username>/<repository>
+            names.append(tuple(user_repo_arg.split("/")))
         else:
-            print("No issue tracker found.")
-            sys.exit(ERR_NO_ISSUETRACKER)
+            # If a `/` isn't included, assume that it's the name of the
+            # repository and the logged in user owns it
+            names.append((None, user_repo_arg))
+
+    def repository(owner, name):
+        return bootstrap.repository(owner or str(bootstrap.user()), name)
+
+    # fetch the user and repos, all at once
+    loads = [bootstrap.user]
+    loads.extend(partial(repository, USER, REPO) for USER, REPO in names)
+    loads.extend(partial(organization_repositories, api, org) for org in args["org"])
+    loaded = SCHEDULER.map(lambda load: load(), loads)
+    user = loaded.pop(0)
+
+    # Organizations load a list of repositories
+    found = chain.from_iterable(r if isinstance(r, list) else [r] for r in loaded)
+
+    repos = []
+    for repo in found:
+        if repo is not None and repo.full_name not in [r.full_name for r in repos]:
+            repos.append(repo)
+
+    return user, repos
+
+
+def branch_pull_request(bootstrap, repo):
+    """
+    Return the pull request of ``repo`` from the branch we are on, found
+    without listing every pull request.
+    """
+    branch = current_branch()
+    if branch is None:
+        print("Not on a branch.")
+        sys.exit(ERR_NO_PULL_REQUEST)
+
+    remote = (get_remotes() or {}).get(branch.remote)
+    if remote is None:
+        print("The branch {} isn't pushed to GitHub.".format(branch.name))
+        sys.exit(ERR_NO_PULL_REQUEST)
+
+    owner, _ = extract_user_and_repo_from_remote(remote)
+    head = "{}:{}".format(owner, branch.remote_branch)
+    pull_request = SCHEDULER.call(bootstrap.pull_request, repo, head, branch.sha)
+
+    if pull_request is None:
+        print("No pull request from {} in {}.".format(head, repo.full_name))
+        sys.exit(ERR_NO_PULL_REQUEST)
+
+    return pull_request
+
+
+def mirror(repo, path=None):
+    """Mirror ``repo`` to ``path``, going on from where it was interrupted."""
+    from .mirror import Mirror
+    from .workers import run_inline
 
-    print("Loading: {}".format(repo.full_name))
+    # There is no UI thread to hand results to
+    run_inline()
 
-    # create view
-    ui = UI(repo)
+    if path is None:
+        path = "{}.ndjson".format(repo.full_name.replace("/", "-"))
 
-    # create controller
-    shipit = Shipit(ui, repo, user)
+    def progress(issues):
+        sys.stdout.write("\r{} issues and pull requests".format(issues))
+        sys.stdout.flush()
 
-    shipit.start()
+    print("Mirroring {} to {}".format(repo.full_name, path))
+    Mirror(repo, path, on_progress=progress).run()
+    print()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.coalesce
+~~~~~~~~~~~~~~~
+
+Doing the same work only once when it's asked for several times at once.
+"""
+
+import threading
+
+
+class _Flight(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Calls made with the same key while one of them is in flight wait for it
+    and share its result, or its exception.
+    """
+    def __init__(self):
+        self.shared = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.shared += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func(*args, **kwargs)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+        return flight.result
+
+
+def _freeze(value):
+    """Return a hashable version of request arguments like params or headers."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _parse_once(response):
+    """Make every reader of ``response`` share the result of parsing it."""
+    parse = response.json
+    lock = threading.Lock()
+    parsed = []
+
+    def json(**kwargs):
+        with lock:
+            if not parsed:
+                parsed.append(parse(**kwargs))
+        return parsed[0]
+
+    response.json = json
+    return response
+
+
+def coalesce_gets(session, flights=None):
+    """
+    Make the identical GET requests that ``session``, a ``requests.Session``,
+    sends at the same time share a single response, which is only parsed
+    once. Return the ``SingleFlight`` that does it.
+    """
+    flights = SingleFlight() if flights is None else flights
+    request = session.request
+
+    def get_once(method, url, *args, **kwargs):
+        return _parse_once(request(method, url, *args, **kwargs))
+
+    def coalesced_request(method, url, *args, **kwargs):
+        if method.upper() != "GET" or args:
+            return request(method, url, *args, **kwargs)
+
+        key = (url, _freeze(kwargs))
+        return flights.do(key, get_once, method, url, **kwargs)
+
+    session.request = coalesced_request
+    return flights
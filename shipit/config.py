@@ -7,6 +7,21 @@ shipit.config
 Configuration a.k.a Global State™.
 """
 
+import os
+
+# Where shipit keeps its data between runs
+DATA_DIR = os.path.join(os.environ.get('HOME', ''), '.shipit.d')
+
+
+def data_path(*parts):
+    """Return the path of a file in ``DATA_DIR``, creating its directory."""
+    path = os.path.join(DATA_DIR, *parts)
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    return path
+
+
 KEY_OPEN_ISSUE = "O"
 KEY_CLOSE_ISSUE = "C"
 KEY_REOPEN_ISSUE = "R"
@@ -17,6 +32,12 @@ KEY_COMMENT = "c"
 KEY_QUIT = "q"
 KEY_DIFF = "d"
 KEY_BROWSER = "B"
+KEY_SEARCH = "/"
+KEY_SEARCH_NEXT = "n"
+KEY_SEARCH_PREVIOUS = "N"
+KEY_SELECT = " "
+KEY_LABEL = "L"
+KEY_ASSIGN = "A"
 
 DIVIDER = "─"
 
@@ -30,6 +51,7 @@ PALETTE = [
     ("focus",     "light red",       ""),
     ("number",    "dark gray",       ""),
     ("line",      "black",           ""),
+    ("selected",  "light cyan,bold", ""),
     ("divider",   "light gray",      ""),
     ("legend",    "white,underline", ""),
     ("time",      "white",           ""),
@@ -42,5 +64,13 @@ PALETTE = [
     ("cyan_text", "dark cyan", ""),
     ("pull",   "yellow", ""),
 
+    ("added_word", "white", "dark green"),
+    ("removed_word", "white", "dark red"),
+    ("syntax_keyword", "yellow", ""),
+    ("syntax_string", "light magenta", ""),
+    ("syntax_number", "light magenta", ""),
+    ("syntax_comment", "dark gray", ""),
+    ("syntax_name", "light blue", ""),
+
     ("key",  "white", "dark blue"),
 ]
@@ -17,18 +17,26 @@ from functools import partial
 from urwid import MainLoop, ExitMainLoop
 
 from .config import (
-    PALETTE,
+    PALETTE, data_path,
 
     KEY_OPEN_ISSUE, KEY_CLOSE_ISSUE, KEY_BACK, KEY_DETAIL, KEY_EDIT,
-    KEY_REOPEN_ISSUE, KEY_COMMENT, KEY_DIFF, KEY_BROWSER, KEY_QUIT,
+    KEY_REOPEN_ISSUE, KEY_COMMENT, KEY_DIFF, KEY_BROWSER, KEY_QUIT, KEY_SEARCH,
+    KEY_SEARCH_NEXT, KEY_SEARCH_PREVIOUS, KEY_SELECT, KEY_LABEL, KEY_ASSIGN,
 )
 from .ui import time_since
 from .events import on
+from .scheduler import SCHEDULER, INTERACTIVE
+from .auth import account
+from .writes import WriteQueue, Write
+from .poller import events_poller, notifications_poller
+from .snapshot import snapshot_path
+from .daemon import DaemonClient
+from . import snapshot, workers
 from .func import lines, unlines, both
 from .models import (
-    is_issue, is_pull_request, is_comment, is_open, is_closed,
+    is_issue, is_pull_request, is_comment, is_open, is_closed, item_key,
 
-    IssuesAndPullRequests,
+    IssuesAndPullRequests, DETAILS,
 )
 
 NEW_ISSUE = """
@@ -50,7 +58,8 @@ def indent(text, indentation='    '):
 
 def format_issue_thread(issue):
     issue_thread = [format_issue_body(issue)]
-    issue_thread.extend(format_comment(comment) for comment in issue.iter_comments())
+    comments = SCHEDULER.call(list, issue.iter_comments())
+    issue_thread.extend(format_comment(comment) for comment in comments)
 
     # Make the whole thread a comment
     issue_thread.insert(0, '<!---\n')
@@ -83,14 +92,36 @@ class Shipit():
     PR_DETAIL = 2
     PR_DIFF = 3
 
-    def __init__(self, ui, repo, user):
+    def __init__(self, ui, repos, user, daemon=None):
         self.ui = ui
-        self.repo = repo
+        self.repos = repos
+        # New issues are opened in the first repository
+        self.repo = repos[0]
         self.user = user
 
-        self.issues_and_prs = IssuesAndPullRequests(self.repo)
+        # Pending writes of a previous run are sent when the UI starts
+        self.writes = WriteQueue(self.repo._session,
+                                 data_path("writes", "%s.json" % account()),
+                                 on_error=self.on_write_error)
+
+        self.issues_and_prs = IssuesAndPullRequests(self.repos, self.writes,
+                                                    on_error=self.on_load_error)
+
+        # A daemon keeps the lists in sync for every shipit, if it's running
+        self.daemon = self.attach(daemon) if daemon is not None else None
+
+        if self.daemon is None:
+            # The lists of the last run are shown until they are fetched again
+            for repo in self.repos:
+                records = snapshot.load(snapshot_path(account(), repo), repo._session)
+                self.issues_and_prs.restore(repo, records)
+
         self.issues_and_prs.set_modified_callback(self.on_modify_issues_and_prs)
-        self.issues_and_prs.show_open_issues()
+
+        # Changes made elsewhere are shown as they happen
+        self.pollers = [] if self.daemon is not None else self._events_pollers()
+        self.notifications = notifications_poller(
+            self.repo._session, self.issues_and_prs.update_notifications)
 
         # Event handlers
         on("show_all", self.issues_and_prs.show_all)
@@ -107,20 +138,148 @@ class Shipit():
         on("show_open_issues", self.issues_and_prs.show_open_issues)
         on("show_closed_issues", self.issues_and_prs.show_closed_issues)
         on("show_pull_requests", self.issues_and_prs.show_pull_requests)
+        on("show_notifications", self.issues_and_prs.show_notifications)
 
         on("filter_by_labels", self.issues_and_prs.filter_by_labels)
         on("clear_label_filters", self.issues_and_prs.clear_label_filters)
 
-    def start(self):
+    def _events_pollers(self):
+        return [events_poller(repo, partial(self.on_repository_update, repo))
+                for repo in self.repos]
+
+    def attach(self, sock):
+        """
+        Get the lists from the daemon at the other end of ``sock`` instead of
+        syncing them here. Return the ``DaemonClient``, or ``None`` if the
+        daemon didn't answer.
+        """
+        client = DaemonClient(sock, self.repos, self.repo._session,
+                              on_snapshot=self.issues_and_prs.load,
+                              on_update=self.on_repository_update,
+                              on_lost=self.on_daemon_lost)
+        try:
+            snapshots = client.subscribe()
+        except (IOError, OSError, ValueError, KeyError):
+            client.close()
+            return
+
+        for repo, records, stale in snapshots:
+            self.issues_and_prs.load(repo, records, stale)
+        return client
+
+    def on_daemon_lost(self):
+        """Keep the lists in sync here once the daemon is gone."""
+        self.daemon = None
+        self.pollers = self._events_pollers()
+        for poller in self.pollers:
+            poller.start()
+
+    def start(self, on_started=None, pull_request=None):
+        """
+        Show the list, or ``pull_request`` if given, until shipit is closed.
+        ``on_started`` is called once it's drawn for the first time.
+        """
         self.loop = MainLoop(self.ui,
                              PALETTE,
                              handle_mouse=True,
                              unhandled_input=self.handle_keypress)
-        self.loop.set_alarm_at(0, discard_args(self.issue_list))
+        workers.attach(self.loop)
+        # Repositories are loaded in the background from now on
+        self.issues_and_prs.show_open_issues()
+        if pull_request is not None:
+            # The list is loaded behind it
+            show = partial(self.pull_request_detail, pull_request)
+        else:
+            show = self.issue_list
+        self.loop.set_alarm_at(0, discard_args(show))
+        if callable(on_started):
+            self.loop.set_alarm_at(0, discard_args(on_started))
+        self.writes.flush()
+        if self.daemon is not None:
+            self.daemon.start()
+        for poller in self.pollers:
+            poller.start()
+        self.notifications.start()
         self.loop.run()
 
+        if self.daemon is not None:
+            # It keeps the snapshots too
+            self.daemon.close()
+        else:
+            self.save_snapshots()
+
+    def save_snapshots(self):
+        """Keep the lists to show them right away in the next run."""
+        for repo in self.repos:
+            snapshot.save(snapshot_path(account(), repo),
+                          self.issues_and_prs.snapshot(repo))
+
     def on_modify_issues_and_prs(self):
-        self.ui.issues_and_pulls(self.issues_and_prs)
+        # Updates from the background don't take the user out of a detail
+        if getattr(self, "mode", self.ISSUE_LIST) is self.ISSUE_LIST:
+            self.ui.issues_and_pulls(self.issues_and_prs)
+        else:
+            self.ui.reset_list(self.issues_and_prs)
+
+    def on_repository_update(self, repo, updates):
+        """Show the issues and pull requests of ``repo`` that changed on GitHub."""
+        updated = self.issues_and_prs.update(updates, repo)
+        for item in updated:
+            self.ui.invalidate(item)
+
+        # The detail that is shown is fetched again
+        shown = self.ui.get_issue_or_pr()
+        for item in updated:
+            if self.mode is self.ISSUE_LIST or shown is None:
+                break
+            if item_key(item) != item_key(shown):
+                continue
+            if self.mode is self.ISSUE_DETAIL:
+                self.issue_detail(item)
+            elif self.mode is self.PR_DETAIL:
+                self.pull_request_detail(item)
+
+    def open_notification(self, notification):
+        """Show what ``notification`` is about once it's fetched."""
+        def show(item):
+            # Unless something else was opened in the meantime
+            if self.mode is not self.ISSUE_LIST:
+                return
+            if is_issue(item):
+                self.issue_detail(item)
+            elif is_pull_request(item):
+                self.pull_request_detail(item)
+            else:
+                self.ui.message("Only issues and pull requests can be opened")
+
+        def error(error):
+            self.ui.error("Couldn't open the notification: {}".format(error))
+
+        SCHEDULER.submit(DETAILS.subject, notification,
+                         priority=INTERACTIVE,
+                         callback=show,
+                         errback=error)
+
+    def on_write_error(self, write, error):
+        """Show what's on screen again, as it was undone, and the error."""
+        self.refresh_view()
+        self.ui.error("Couldn't {}: {}".format(write.description, error))
+
+    def on_load_error(self, repo, error):
+        """Tell that ``repo`` couldn't be loaded; it's tried again when shown."""
+        self.ui.error("Couldn't load {}: {}".format(repo.full_name, error))
+
+    def refresh_view(self):
+        item = self.ui.get_issue_or_pr()
+
+        if self.mode is self.ISSUE_LIST:
+            self.issue_list()
+        elif self.mode is self.ISSUE_DETAIL and item:
+            self.ui.invalidate(item)
+            self.issue_detail(item)
+        elif self.mode is self.PR_DETAIL and item:
+            self.ui.invalidate(item)
+            self.pull_request_detail(item)
 
     def issue_list(self):
         self.mode = self.ISSUE_LIST
@@ -160,13 +319,21 @@ class Shipit():
                     return
                 body = lines(body)
 
-                issue = self.repo.create_issue(title=title, body=body)
+                issue = SCHEDULER.call(self.repo.create_issue, title=title, body=body)
 
                 if issue:
                     self.issue_detail(issue)
                 else:
                     self.issue_list()
+        elif key == KEY_SELECT:
+            if self.mode is self.ISSUE_LIST:
+                self.ui.toggle_selected()
         elif key == KEY_CLOSE_ISSUE:
+            selected = self.ui.get_selected_items()
+            if selected and self.mode is self.ISSUE_LIST:
+                self.bulk(selected, Write.close, "Closing")
+                return
+
             issue = self.ui.get_issue()
 
             if not issue:
@@ -175,15 +342,44 @@ class Shipit():
             self.issues_and_prs.close(issue)
 
             if self.mode is self.ISSUE_DETAIL:
+                self.ui.invalidate(issue)
                 self.issue_detail(issue)
         elif key == KEY_REOPEN_ISSUE:
+            selected = self.ui.get_selected_items()
+            if selected and self.mode is self.ISSUE_LIST:
+                self.bulk(selected, Write.reopen, "Reopening")
+                return
+
             issue = self.ui.get_issue()
 
             if issue and is_closed(issue):
                 self.issues_and_prs.reopen(issue)
 
-            if self.mode is self.ISSUE_DETAIL:
+            if issue and self.mode is self.ISSUE_DETAIL:
+                self.ui.invalidate(issue)
                 self.issue_detail(issue)
+        elif key == KEY_LABEL:
+            items = self.selected_or_focused()
+            if not items:
+                return
+
+            def label(name):
+                if name.strip():
+                    make_write = lambda issue: Write.add_label(issue, name.strip())
+                    self.bulk(items, make_write, "Labelling")
+
+            self.ui.prompt("Label: ", on_done=label)
+        elif key == KEY_ASSIGN:
+            items = self.selected_or_focused()
+            if not items:
+                return
+
+            def assign(login):
+                if login.strip():
+                    make_write = lambda issue: Write.assign(issue, login.strip())
+                    self.bulk(items, make_write, "Assigning")
+
+            self.ui.prompt("Assign to: ", on_done=assign)
         elif key == KEY_BACK:
             if self.mode is self.PR_DIFF:
                 pr = self.ui.get_focused_item()
@@ -198,18 +394,26 @@ class Shipit():
                     self.issue_detail(issue_or_pr)
                 elif is_pull_request(issue_or_pr):
                     self.pull_request_detail(issue_or_pr)
+
+                notification = self.ui.get_notification()
+                if notification is not None:
+                    self.open_notification(notification)
         elif key == KEY_EDIT:
             item = self.ui.get_focused_item()
 
             if item is None:
                 return
 
+            # The list only has records, without the bodies
+            item = DETAILS.hydrate(item)
+
             if is_pull_request(item):
                 item = item.issue
 
             # In case you aren't the owner of the repo, you are only allowed to
             # edit things that you created.
-            if self.repo.owner != self.user and item.user != self.user:
+            owner = item.html_url.split("/")[3]
+            if owner != str(self.user) and item.user != self.user:
                 # TODO: beep
                 return
 
@@ -223,6 +427,8 @@ class Shipit():
             if item is None:
                 return
 
+            item = DETAILS.hydrate(item)
+
             if is_pull_request(item):
                 issue = item.issue
                 self.comment_issue(item.issue, pull_request=item)
@@ -232,6 +438,15 @@ class Shipit():
             if self.mode is self.PR_DETAIL:
                 pr = self.ui.get_focused_item()
                 self.diff(pr)
+        elif key == KEY_SEARCH:
+            if self.mode is self.PR_DIFF:
+                self.ui.search_diff()
+        elif key == KEY_SEARCH_NEXT:
+            if self.mode is self.PR_DIFF:
+                self.ui.search_diff_next()
+        elif key == KEY_SEARCH_PREVIOUS:
+            if self.mode is self.PR_DIFF:
+                self.ui.search_diff_previous()
         elif key == KEY_BROWSER:
             item = self.ui.get_focused_item()
             if hasattr(item, '_api'):
@@ -239,6 +454,43 @@ class Shipit():
         elif key == KEY_QUIT:
             raise ExitMainLoop
 
+    def selected_or_focused(self):
+        """
+        Return the items selected in the list or, if there are none, the
+        focused one.
+        """
+        if self.mode is self.ISSUE_LIST:
+            selected = self.ui.get_selected_items()
+            if selected:
+                return selected
+
+        item = self.ui.get_issue_or_pr()
+        return [item] if item is not None else []
+
+    def bulk(self, items, make_write, verb):
+        """Make the write returned by ``make_write`` for every item at once."""
+        self.ui.clear_selection()
+
+        def progress(bulk):
+            sent = len(bulk.done) + len(bulk.failed)
+            text = "{} {}/{}".format(verb, sent, len(bulk))
+            if bulk.failed:
+                failures = ", ".join("#{} ({})".format(item.number, error)
+                                     for item, error in bulk.failed)
+                text = "{}, failed: {}".format(text, failures)
+
+            if bulk.finished:
+                self.refresh_view()
+
+            if bulk.failed:
+                self.ui.error(text)
+            else:
+                self.ui.message(text)
+
+        bulk = self.issues_and_prs.bulk(items, make_write, on_progress=progress)
+        if not bulk.finished:
+            self.ui.message("{} 0/{}".format(verb, len(bulk)))
+
     def edit_issue(self, issue):
         title_and_body = '\n'.join([issue.title, issue.body])
         issue_text = self.spawn_editor(title_and_body)
@@ -256,7 +508,8 @@ class Shipit():
             return
         body = lines(body)
 
-        issue.edit(title=title, body=body)
+        self.issues_and_prs.edit(issue, title, body)
+        self.ui.invalidate(issue)
 
         if self.mode is self.ISSUE_LIST:
             # TODO: focus
@@ -275,8 +528,8 @@ class Shipit():
             # TODO: cancelled
             return
 
-        # TODO: ui must be updated!
-        item.edit(text)
+        self.issues_and_prs.edit_comment(item, text)
+        self.refresh_view()
 
     def comment_issue(self, issue, pull_request=False):
         issue_thread = format_issue_thread(issue)
@@ -291,7 +544,8 @@ class Shipit():
             # TODO: A empty comment is invalid input
             return
 
-        issue.create_comment(comment_text)
+        self.issues_and_prs.comment(issue, comment_text, self.user)
+        self.ui.invalidate(pull_request or issue)
 
         if pull_request:
             self.pull_request_detail(pull_request)
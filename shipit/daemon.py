@@ -0,0 +1,417 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.daemon
+~~~~~~~~~~~~~
+
+A process that keeps the lists of repositories in sync for every shipit
+running on the machine, which attach to it through a Unix socket.
+
+Messages are JSON objects, one per line. Clients send
+
+    {"type": "subscribe", "repos": ["owner/name", ...]}
+
+and get a ``snapshot`` of the open issues and pull requests of every
+repository right away, and whenever they are fetched again, and an
+``update`` with the records that changed as they are polled:
+
+    {"type": "snapshot", "repo": "owner/name", "stale": false, "records": [...]}
+    {"type": "update", "repo": "owner/name", "issues": [...], "pulls": [...]}
+"""
+
+import os
+import json
+import socket
+import threading
+import socketserver
+from queue import Queue, Full
+
+from .config import data_path
+from .poller import Updates, events_poller
+from .records import record_from_json, fetch_records
+from .scheduler import SCHEDULER, VISIBLE_REFRESH
+from .workers import call_in_main_thread, run_inline
+from . import snapshot
+
+# Seconds to wait for the first snapshots, before shipit syncs on its own
+CONNECT_TIMEOUT = 5
+
+# Messages a client can fall behind by before it's hung up on
+MAX_PENDING = 256
+
+
+def socket_path(account):
+    """Return where the daemon of ``account`` listens."""
+    return data_path("daemon", "%s.sock" % account)
+
+
+def encode(message):
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def decode(line):
+    return json.loads(line.decode("utf-8"))
+
+
+class Subscriber(object):
+    """
+    A client connected through ``sock``, which messages can be sent to from
+    any thread without waiting for it to read them. They're written to
+    ``wfile`` by a thread of its own, and a client that falls too far behind
+    is hung up on instead of holding up the others.
+    """
+    def __init__(self, sock, wfile):
+        self.sock = sock
+        self.wfile = wfile
+        self.connected = True
+        self._outgoing = Queue(MAX_PENDING)
+        self._thread = threading.Thread(target=self._write, name="shipit-subscriber")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def send(self, message):
+        if not self.connected:
+            return
+
+        try:
+            self._outgoing.put_nowait(message)
+        except Full:
+            # It syncs on its own when we hang up
+            self.disconnect()
+
+    def _write(self):
+        while True:
+            message = self._outgoing.get()
+            if message is None or not self.connected:
+                return
+
+            try:
+                self.wfile.write(encode(message))
+                self.wfile.flush()
+            except (IOError, OSError, ValueError):
+                # It's gone, and stops being sent anything
+                self.disconnect()
+                return
+
+    def disconnect(self):
+        if not self.connected:
+            return
+
+        self.connected = False
+        try:
+            # Wakes up the writer if it's stuck writing
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except (IOError, OSError):
+            pass
+        try:
+            self._outgoing.put_nowait(None)
+        except Full:
+            pass
+
+
+class RepositoryStore(object):
+    """
+    The open issues and pull requests of ``repo``, fetched once and kept up
+    to date by polling its events, for every subscriber. The last ones are
+    kept in ``path`` between runs.
+    """
+    def __init__(self, repo, path=None):
+        self.repo = repo
+        self.full_name = repo.full_name
+        self.path = path
+        self.subscribers = []
+        self.poller = events_poller(repo, self.apply)
+        self._lock = threading.Lock()
+        # The last records are the ones saved
+        self._save_lock = threading.Lock()
+
+        # The records of the last run, until they are fetched again
+        records = snapshot.load(path, repo._session) if path else []
+        self.records = dict((record.number, record) for record in records)
+        self.stale = True
+
+    def start(self):
+        self._fetch()
+        self.poller.start()
+
+    def stop(self):
+        self.poller.stop()
+        self.save()
+
+    def _fetch(self):
+        SCHEDULER.submit(fetch_records,
+                         self.repo._session,
+                         self.repo._api + "/issues",
+                         {"state": "open"},
+                         priority=VISIBLE_REFRESH,
+                         callback=self.fetched,
+                         errback=self._fetch_failed)
+
+    def _fetch_failed(self, error):
+        # Tried again when the events are polled next
+        timer = threading.Timer(self.poller.interval, self._fetch)
+        timer.daemon = True
+        timer.start()
+
+    def _snapshot(self):
+        records = sorted(self.records.values(), key=lambda record: -record.number)
+        return {"type": "snapshot",
+                "repo": self.full_name,
+                "stale": self.stale,
+                "records": [record.to_json() for record in records]}
+
+    def _broadcast(self, message):
+        self.subscribers = [s for s in self.subscribers if s.connected]
+        for subscriber in self.subscribers:
+            subscriber.send(message)
+
+    def subscribe(self, subscriber):
+        """Send the records to ``subscriber``, and every change after them."""
+        with self._lock:
+            self.subscribers.append(subscriber)
+            subscriber.send(self._snapshot())
+
+    def fetched(self, records):
+        """Replace the records with the ones that were fetched."""
+        with self._lock:
+            self.records = dict((record.number, record) for record in records)
+            self.stale = False
+            self._broadcast(self._snapshot())
+        self.save()
+
+    def apply(self, updates):
+        """Apply the polled ``Updates`` and send them to every subscriber."""
+        with self._lock:
+            for record in updates.issues + updates.pulls:
+                if record.state != "open":
+                    # Subscribers still hear about it being closed
+                    self.records.pop(record.number, None)
+                elif record.number in self.records:
+                    self.records[record.number].update(record)
+                else:
+                    self.records[record.number] = record
+
+            self._broadcast({"type": "update",
+                             "repo": self.full_name,
+                             "issues": [r.to_json() for r in updates.issues],
+                             "pulls": [r.to_json() for r in updates.pulls]})
+        self.save()
+
+        if updates.missed:
+            # Subscribers get a snapshot once they're fetched again
+            self._fetch()
+
+    def save(self):
+        if self.path is None:
+            return
+        with self._save_lock:
+            with self._lock:
+                records = list(self.records.values())
+            snapshot.save(self.path, records)
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        subscriber = Subscriber(self.connection, self.wfile)
+        try:
+            for line in self.rfile:
+                message = decode(line)
+                if message.get("type") == "subscribe":
+                    for name in message.get("repos", []):
+                        store = self.server.daemon.store(name)
+                        if store is None:
+                            # The client syncs on its own when we hang up
+                            return
+                        store.subscribe(subscriber)
+        except ValueError:
+            # Not one of us
+            pass
+        finally:
+            subscriber.disconnect()
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class Daemon(object):
+    """
+    Serves the repositories that clients subscribe to at ``path``, looked up
+    with ``bootstrap`` of ``account``. They're synced from the first
+    subscription on.
+    """
+    def __init__(self, bootstrap, path, account):
+        self.bootstrap = bootstrap
+        self.path = path
+        self.account = account
+        self.stores = {}
+        self.server = None
+        self._lock = threading.Lock()
+
+    def store(self, full_name):
+        """Return the ``RepositoryStore`` of ``full_name``, starting it."""
+        with self._lock:
+            store = self.stores.get(full_name)
+        if store is not None:
+            return store
+
+        # Looked up without the lock, so other clients aren't kept waiting
+        owner, name = full_name.split("/", 1)
+        repo = SCHEDULER.call(self.bootstrap.repository, owner, name)
+        if repo is None:
+            return
+
+        with self._lock:
+            if full_name not in self.stores:
+                store = RepositoryStore(repo, snapshot.snapshot_path(self.account, repo))
+                store.start()
+                self.stores[full_name] = store
+            return self.stores[full_name]
+
+    def serve_forever(self):
+        if os.path.exists(self.path):
+            # Left behind by a daemon that crashed
+            os.remove(self.path)
+
+        # Only for the user, from the moment it's made
+        umask = os.umask(0o177)
+        try:
+            self.server = server = Server(self.path, Handler)
+        finally:
+            os.umask(umask)
+        server.daemon = self
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            os.remove(self.path)
+            for store in list(self.stores.values()):
+                store.stop()
+
+    def shutdown(self):
+        """Stop serving, from another thread."""
+        if self.server is not None:
+            self.server.shutdown()
+
+
+def connect(path):
+    """Return a socket connected to the daemon at ``path``, if it's running."""
+    if not os.path.exists(path):
+        return
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except (IOError, OSError):
+        sock.close()
+        return
+    return sock
+
+
+class DaemonClient(object):
+    """
+    Receives the records of ``repos`` from the daemon at the other end of
+    ``sock``, making them with ``session``.
+
+    ``on_snapshot`` and ``on_update`` are called in the UI thread with the
+    repository and the records or ``Updates`` of every message after the
+    first snapshots, and ``on_lost`` if the daemon goes away.
+    """
+    def __init__(self, sock, repos, session, on_snapshot=None, on_update=None,
+                 on_lost=None):
+        self.sock = sock
+        self.repos = dict((repo.full_name, repo) for repo in repos)
+        self.session = session
+        self.on_snapshot = on_snapshot
+        self.on_update = on_update
+        self.on_lost = on_lost
+        self._rfile = sock.makefile("rb")
+        self._thread = None
+        # Received while subscribing, after the snapshot they update
+        self._early = []
+
+    def _records(self, jsons):
+        return [record_from_json(json, self.session) for json in jsons]
+
+    def subscribe(self):
+        """
+        Subscribe to the repositories and return a list with the repository,
+        records and whether they're stale of the first snapshot of each.
+        """
+        self.sock.settimeout(CONNECT_TIMEOUT)
+        self.sock.sendall(encode({"type": "subscribe", "repos": list(self.repos)}))
+
+        snapshots = {}
+        while len(snapshots) < len(self.repos):
+            message = decode(self._rfile.readline())
+            if message.get("repo") not in self.repos:
+                continue
+            if message["type"] != "snapshot":
+                # Updates of the repositories that were already sent
+                self._early.append(message)
+                continue
+            snapshots[message["repo"]] = message
+
+        self.sock.settimeout(None)
+        return [(self.repos[full_name],
+                 self._records(message["records"]),
+                 message["stale"])
+                for full_name, message in snapshots.items()]
+
+    def start(self):
+        """Receive the messages that follow in the background."""
+        self._thread = threading.Thread(target=self._receive, name="shipit-daemon")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _receive(self):
+        for message in self._early:
+            self._dispatch(message)
+        self._early = []
+
+        try:
+            for line in self._rfile:
+                self._dispatch(decode(line))
+        except (IOError, OSError, ValueError):
+            pass
+
+        if callable(self.on_lost):
+            call_in_main_thread(self.on_lost)
+
+    def _dispatch(self, message):
+        repo = self.repos.get(message.get("repo"))
+        if repo is None:
+            return
+
+        if message["type"] == "snapshot" and callable(self.on_snapshot):
+            records = self._records(message["records"])
+            call_in_main_thread(self.on_snapshot, repo, records, message["stale"])
+        elif message["type"] == "update" and callable(self.on_update):
+            updates = Updates(issues=self._records(message["issues"]),
+                              pulls=self._records(message["pulls"]))
+            call_in_main_thread(self.on_update, repo, updates)
+
+    def close(self):
+        # Hanging up isn't losing it
+        self.on_lost = None
+        self.sock.close()
+
+
+def serve(bootstrap, account):
+    """Run the daemon of ``account`` until it's interrupted."""
+    path = socket_path(account)
+
+    running = connect(path)
+    if running is not None:
+        running.close()
+        print("A daemon is listening at {} already.".format(path))
+        return
+
+    # There is no UI thread to hand results to
+    run_inline()
+
+    print("Listening at {}".format(path))
+    try:
+        Daemon(bootstrap, path, account).serve_forever()
+    except KeyboardInterrupt:
+        pass
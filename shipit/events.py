@@ -16,9 +16,13 @@ EVENTS = [
     "show_open_issues",
     "show_closed_issues",
     "show_pull_requests",
+    "show_notifications",
 
     "filter_by_labels",
     "clear_label_filters",
+
+    "rate_limit_changed",
+    "list_stale",
 ]
 
 
@@ -8,11 +8,12 @@ Operations on git repositories.
 """
 
 import os
-import tempfile
+import re
+import threading
 import subprocess
 
 
-def get_remotes():
+def get_remotes(cwd=None):
     """
     Get a list of the git remote URLs for this repository.
 
@@ -21,21 +22,519 @@ def get_remotes():
 
     Otherwise return ``None``.
     """
-    tmp_file = tempfile.NamedTemporaryFile(mode='w+', delete=False)
+    try:
+        remotes = read_remotes(cwd)
+    except UnsupportedConfig:
+        remotes = None
 
-    retcode = subprocess.call(['git', 'remote', '-v'], stdout=tmp_file.file)
-    if retcode != 0:
+    if remotes is None:
+        # Let git itself figure it out
+        remotes = _git_remotes(cwd)
+    if remotes is None:
         return
 
-    # Store the output of the command and delete temporary file
-    tmp_file.file.seek(0)
-    raw_remotes = tmp_file.read()
-    os.remove(tmp_file.name)
+    # Get the GitHub remotes
+    return {name: url for name, url in remotes.items() if 'github' in url.lower()}
 
-    # Get the GitHub remote strings
-    nonempty_remotes = (r for r in raw_remotes.split('\n') if 'github' in r.lower())
 
-    return {remote_name(r): remote_url(r)  for r in nonempty_remotes}
+def _git_remotes(cwd=None):
+    output = _git('remote', '-v', cwd=cwd)
+    if output is None:
+        return
+
+    remotes = {}
+    for line in output.splitlines():
+        if line.strip():
+            remotes.setdefault(remote_name(line), remote_url(line))
+    return remotes
+
+
+# -- Config files -------------------------------------------------------------
+
+class UnsupportedConfig(Exception):
+    """The configuration can't be read without git."""
+
+
+# Environment variables that change which configuration git reads
+GIT_ENVIRONMENT = ['GIT_DIR', 'GIT_WORK_TREE', 'GIT_COMMON_DIR', 'GIT_CONFIG',
+                   'GIT_CONFIG_GLOBAL', 'GIT_CONFIG_SYSTEM', 'GIT_CONFIG_COUNT',
+                   'GIT_CONFIG_PARAMETERS']
+
+SYSTEM_CONFIG = '/etc/gitconfig'
+
+SECTION_RE = re.compile(r'\[\s*([^\s"\]]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]')
+KEY_RE = re.compile(r'([A-Za-z][A-Za-z0-9-]*)\s*(?:=\s*(.*))?$')
+
+
+def find_git_dir(path=None):
+    """
+    Return the git directory of the repository or worktree that ``path``, by
+    default the current directory, is in. Return ``None`` if there is none.
+    """
+    path = os.path.abspath(path or os.getcwd())
+    while True:
+        dotgit = os.path.join(path, '.git')
+        if os.path.isdir(dotgit):
+            return dotgit
+        elif os.path.isfile(dotgit):
+            # Worktrees and submodules have a file that points to it
+            with open(dotgit) as f:
+                line = f.readline().strip()
+            if line.startswith('gitdir:'):
+                git_dir = line[len('gitdir:'):].strip()
+                return os.path.normpath(os.path.join(path, git_dir))
+            return
+
+        parent = os.path.dirname(path)
+        if parent == path:
+            return
+        path = parent
+
+
+def common_dir(git_dir):
+    """
+    Return the git directory that worktrees of the repository share, which
+    has its configuration.
+    """
+    path = os.path.join(git_dir, 'commondir')
+    if not os.path.isfile(path):
+        return git_dir
+
+    with open(path) as f:
+        return os.path.normpath(os.path.join(git_dir, f.read().strip()))
+
+
+def _parse_value(text):
+    """Return the value of a config line, without quotes or comments."""
+    value = []
+    quoted = False
+    escapes = {'n': '\n', 't': '\t', 'b': '\b', '"': '"', '\\': '\\'}
+
+    chars = iter(text)
+    for char in chars:
+        if char == '"':
+            quoted = not quoted
+        elif char == '\\':
+            escaped = next(chars, '')
+            value.append(escapes.get(escaped, escaped))
+        elif char in '#;' and not quoted:
+            break
+        else:
+            value.append(char)
+
+    return ''.join(value).strip()
+
+
+def parse_config(text):
+    """
+    Yield a ``(section, subsection, key, value)`` tuple for every variable of
+    the git config ``text``. Section and key names are lowercase, and keys
+    without value are ``'true'``.
+    """
+    section = subsection = None
+
+    lines = iter(text.splitlines())
+    for line in lines:
+        # Values can go on in the next lines
+        while line.endswith('\\') and not line.endswith('\\\\'):
+            line = line[:-1] + next(lines, '')
+
+        line = line.strip()
+        if not line or line[0] in '#;':
+            continue
+
+        match = SECTION_RE.match(line)
+        if match:
+            section, subsection = match.groups()
+            if subsection is not None:
+                subsection = re.sub(r'\\(.)', r'\1', subsection)
+            elif '.' in section:
+                # The deprecated `[section.subsection]` syntax
+                section, subsection = section.split('.', 1)
+                subsection = subsection.lower()
+            section = section.lower()
+            line = line[match.end():].strip()
+            if not line or line[0] in '#;':
+                continue
+
+        match = KEY_RE.match(line)
+        if match and section is not None:
+            key, value = match.groups()
+            value = 'true' if value is None else _parse_value(value)
+            yield section, subsection, key.lower(), value
+
+
+def _glob_re(pattern, ignore_case=False):
+    """
+    Return a regular expression of the wildcard ``pattern``, where ``**``
+    matches across directories and ``*`` doesn't.
+    """
+    regex = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            regex.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            regex.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            regex.append('[^/]')
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 2:]:
+            end = pattern.index(']', i + 2)
+            chars = pattern[i + 1:end]
+            if chars.startswith('!'):
+                chars = '^' + chars[1:]
+            regex.append('[%s]' % chars.replace('\\', '\\\\'))
+            i = end + 1
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile(''.join(regex) + '$', re.IGNORECASE if ignore_case else 0)
+
+
+class ConfigReader(object):
+    """
+    Reads the configuration of the repository in ``git_dir`` the way git does,
+    following includes, and remembers every file it read.
+    """
+    # Includes that include themselves
+    MAX_DEPTH = 10
+
+    def __init__(self, git_dir):
+        self.git_dir = git_dir
+        self.files = []
+
+    def _stat(self, path):
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            mtime = None
+        self.files.append((path, mtime))
+        return mtime
+
+    def read(self):
+        """Return every variable of every config file of the repository."""
+        if any(name in os.environ for name in GIT_ENVIRONMENT):
+            raise UnsupportedConfig("the environment changes the configuration")
+
+        home = os.path.expanduser('~')
+        xdg = os.environ.get('XDG_CONFIG_HOME') or os.path.join(home, '.config')
+
+        paths = [os.path.join(xdg, 'git', 'config'),
+                 os.path.join(home, '.gitconfig'),
+                 os.path.join(common_dir(self.git_dir), 'config')]
+        if not os.environ.get('GIT_CONFIG_NOSYSTEM'):
+            paths.insert(0, SYSTEM_CONFIG)
+
+        variables = []
+        for path in paths:
+            variables.extend(self._read(path))
+
+        worktree_config = [v for s, _, k, v in variables
+                           if (s, k) == ('extensions', 'worktreeconfig')]
+        if worktree_config and worktree_config[-1].lower() in ('true', 'yes', 'on', '1'):
+            variables.extend(self._read(os.path.join(self.git_dir, 'config.worktree')))
+
+        return variables
+
+    def _read(self, path, depth=0):
+        if self._stat(path) is None or depth > self.MAX_DEPTH:
+            return []
+
+        with open(path) as f:
+            text = f.read()
+
+        variables = []
+        for section, subsection, key, value in parse_config(text):
+            if key == 'path' and section == 'include':
+                variables.extend(self._include(path, value, depth))
+            elif key == 'path' and section == 'includeif':
+                if self._applies(subsection, path):
+                    variables.extend(self._include(path, value, depth))
+            else:
+                variables.append((section, subsection, key, value))
+        return variables
+
+    def _include(self, path, included, depth):
+        included = os.path.expanduser(included)
+        # Relative to the file that includes it
+        included = os.path.join(os.path.dirname(path), included)
+        return self._read(included, depth + 1)
+
+    def _applies(self, condition, path):
+        """Return whether the ``condition`` of an ``includeIf`` is true."""
+        kind, _, pattern = (condition or '').partition(':')
+
+        if kind in ('gitdir', 'gitdir/i'):
+            if pattern.startswith('./'):
+                pattern = os.path.join(os.path.dirname(path), pattern[2:])
+            pattern = os.path.expanduser(pattern)
+            if not os.path.isabs(pattern):
+                pattern = '**/' + pattern
+            if pattern.endswith('/'):
+                pattern += '**'
+            regex = _glob_re(pattern, ignore_case=kind == 'gitdir/i')
+            git_dirs = [self.git_dir, os.path.realpath(self.git_dir)]
+            return any(regex.match(git_dir) for git_dir in git_dirs)
+        elif kind == 'onbranch':
+            if pattern.endswith('/'):
+                pattern += '**'
+            branch = self._branch()
+            return branch is not None and bool(_glob_re(pattern).match(branch))
+
+        raise UnsupportedConfig("includeIf.%s" % condition)
+
+    def _branch(self):
+        head = os.path.join(self.git_dir, 'HEAD')
+        if self._stat(head) is None:
+            return
+
+        with open(head) as f:
+            ref = f.read().strip()
+        if ref.startswith('ref: refs/heads/'):
+            return ref[len('ref: refs/heads/'):]
+
+
+def remotes_from_config(variables):
+    """
+    Return the URL of every remote in the config ``variables``, rewritten by
+    the ``url.<base>.insteadOf`` rules.
+    """
+    remotes = {}
+    rewrites = []
+    for section, subsection, key, value in variables:
+        if (section, key) == ('remote', 'url') and subsection is not None:
+            # The first URL is the one that's fetched
+            remotes.setdefault(subsection, value)
+        elif (section, key) == ('url', 'insteadof') and subsection is not None:
+            rewrites.append((value, subsection))
+
+    def rewrite(url):
+        matches = [(prefix, base) for prefix, base in rewrites if url.startswith(prefix)]
+        if not matches:
+            return url
+        prefix, base = max(matches, key=lambda match: len(match[0]))
+        return base + url[len(prefix):]
+
+    return {name: rewrite(url) for name, url in remotes.items()}
+
+
+# Variables of every git directory, and the files they were read from
+_CONFIGS = {}
+_CONFIGS_LOCK = threading.Lock()
+
+
+def _unchanged(files):
+    for path, mtime in files:
+        try:
+            if os.stat(path).st_mtime != mtime:
+                return False
+        except OSError:
+            if mtime is not None:
+                return False
+    return True
+
+
+def read_config(git_dir):
+    """
+    Return the variables of the configuration of the repository in
+    ``git_dir``, which are read again only when a config file changes.
+
+    Raise ``UnsupportedConfig`` if git is needed to read them.
+    """
+    with _CONFIGS_LOCK:
+        cached = _CONFIGS.get(git_dir)
+    if cached is not None and _unchanged(cached[0]):
+        return cached[1]
+
+    reader = ConfigReader(git_dir)
+    variables = reader.read()
+    with _CONFIGS_LOCK:
+        _CONFIGS[git_dir] = (reader.files, variables)
+    return variables
+
+
+def read_remotes(cwd=None):
+    """
+    Return the URL of every remote of the repository that ``cwd`` is in, read
+    from its configuration without running git, or ``None`` if it isn't in a
+    repository.
+
+    Raise ``UnsupportedConfig`` if git is needed to read them.
+    """
+    git_dir = find_git_dir(cwd)
+    if git_dir is None:
+        return
+
+    return remotes_from_config(read_config(git_dir))
+
+
+# -- Branches -----------------------------------------------------------------
+
+class Branch(object):
+    """
+    A local branch at commit ``sha``, that is pushed to the branch
+    ``remote_branch`` of ``remote``.
+    """
+    def __init__(self, name, sha, remote, remote_branch):
+        self.name = name
+        self.sha = sha
+        self.remote = remote
+        self.remote_branch = remote_branch
+
+
+def _ref_sha(git_dir, ref):
+    """Return the commit of ``ref``, a loose or a packed one."""
+    path = os.path.join(git_dir, *ref.split('/'))
+    if os.path.isfile(path):
+        with open(path) as f:
+            return f.read().strip()
+
+    packed = os.path.join(git_dir, 'packed-refs')
+    if os.path.isfile(packed):
+        with open(packed) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2 and parts[1] == ref:
+                    return parts[0]
+
+
+def _config_getter(git_dir, cwd=None):
+    """
+    Return a function that returns the value of a config variable given its
+    section, subsection and key.
+    """
+    try:
+        config = dict(((section, subsection, key), value)
+                      for section, subsection, key, value in read_config(git_dir))
+        return lambda *variable: config.get(variable)
+    except UnsupportedConfig:
+        def get(section, subsection, key):
+            name = '.'.join(filter(None, [section, subsection, key]))
+            value = _git('config', '--get', name, cwd=cwd)
+            return value.strip() if value else None
+        return get
+
+
+def current_branch(cwd=None):
+    """
+    Return the ``Branch`` checked out in the repository that ``cwd`` is in,
+    read without running git.
+
+    Return ``None`` if it isn't in a repository or no branch is checked out.
+    """
+    git_dir = find_git_dir(cwd)
+    if git_dir is None:
+        return
+
+    head = os.path.join(git_dir, 'HEAD')
+    if not os.path.isfile(head):
+        return
+    with open(head) as f:
+        ref = f.read().strip()
+    if not ref.startswith('ref: refs/heads/'):
+        # A detached HEAD
+        return
+
+    name = ref[len('ref: refs/heads/'):]
+    sha = _ref_sha(common_dir(git_dir), 'refs/heads/' + name)
+
+    # Where the branch is pushed to, like `git push` does
+    get = _config_getter(git_dir, cwd)
+    upstream = get('branch', name, 'remote')
+    remote = (get('branch', name, 'pushremote') or
+              get('remote', None, 'pushdefault') or
+              upstream or
+              'origin')
+
+    merge = get('branch', name, 'merge')
+    if remote == upstream and merge and merge.startswith('refs/heads/'):
+        remote_branch = merge[len('refs/heads/'):]
+    else:
+        remote_branch = name
+
+    return Branch(name, sha, remote, remote_branch)
+
+
+# -- Commands -----------------------------------------------------------------
+
+def _git(*args, **kwargs):
+    """
+    Run ``git`` with ``args`` and return its standard output as a string.
+
+    Return ``None`` if the command failed.
+    """
+    try:
+        process = subprocess.Popen(['git'] + list(args),
+                                   cwd=kwargs.get('cwd'),
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+    except OSError:
+        # `git` isn't installed
+        return
+
+    out, _ = process.communicate()
+    if process.returncode != 0:
+        return
+
+    return out.decode('utf-8', 'replace')
+
+
+def has_commits(*shas, **kwargs):
+    """
+    Return ``True`` if every commit in ``shas`` is present in the local object
+    store.
+    """
+    if not all(shas):
+        return False
+
+    return all(_git('cat-file', '-e', '%s^{commit}' % sha, **kwargs) is not None
+               for sha in shas)
+
+
+def diff(base, head, **kwargs):
+    """
+    Compute the diff of ``head`` against its merge base with ``base``, like
+    GitHub does for pull requests.
+
+    Return ``None`` if any of the commits isn't available locally.
+    """
+    if not has_commits(base, head, **kwargs):
+        return
+
+    return _git('diff', '--no-color', '--no-ext-diff',
+                '%s...%s' % (base, head), **kwargs)
+
+
+def diff_stats(base, head, **kwargs):
+    """
+    Return a list of ``(additions, deletions, filename)`` tuples for every file
+    changed between ``base`` and ``head``. Binary files count as no additions
+    nor deletions.
+
+    Return ``None`` if any of the commits isn't available locally.
+    """
+    if not has_commits(base, head, **kwargs):
+        return
+
+    numstat = _git('diff', '--numstat', '--no-renames',
+                   '%s...%s' % (base, head), **kwargs)
+    if numstat is None:
+        return
+
+    stats = []
+    for line in numstat.splitlines():
+        additions, deletions, filename = line.split('\t', 2)
+        additions = int(additions) if additions.isdigit() else 0
+        deletions = int(deletions) if deletions.isdigit() else 0
+        stats.append((additions, deletions, filename))
+
+    return stats
 
 
 def remote_name(remotestring):
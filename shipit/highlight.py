@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.highlight
+~~~~~~~~~~~~~~~~
+
+Syntax and intra-line change highlighting of diff hunks.
+
+Syntax highlighting is only available when ``pygments`` is installed.
+"""
+
+import re
+from difflib import SequenceMatcher
+
+try:
+    from pygments.lexers import get_lexer_for_filename
+    from pygments.token import Token
+    from pygments.util import ClassNotFound
+except ImportError:
+    get_lexer_for_filename = None
+
+
+# Pairs of removed and added lines that are less similar than this are
+# considered completely different, and their words aren't highlighted
+MIN_SIMILARITY = 0.3
+
+WORD_RE = re.compile(r'\w+|\s+|[^\w\s]')
+
+
+class Hunk(object):
+    """
+    A hunk of a diff, from its ``@@`` header at line ``start`` to line ``end``
+    (exclusive) of the diff.
+    """
+    def __init__(self, filename, start, end):
+        self.filename = filename
+        self.start = start
+        self.end = end
+        self._key = None
+
+    def lines(self, diff_lines):
+        return diff_lines[self.start:self.end]
+
+    def key(self, diff_lines):
+        """Return a key that identifies the hunk in any diff it appears."""
+        if self._key is None:
+            text = '\n'.join(self.lines(diff_lines))
+            self._key = (self.filename, hash(text))
+        return self._key
+
+
+def _is_file_header(line):
+    # The first line of diffs downloaded from GitHub is truncated to "ff"
+    return line.startswith("diff --git") or line.startswith("ff --git")
+
+
+def parse_hunks(lines):
+    """Return the hunks of the diff whose lines are ``lines``, in order."""
+    hunks = []
+    filename = None
+    start = None
+
+    for n, line in enumerate(lines):
+        if _is_file_header(line):
+            if start is not None:
+                hunks.append(Hunk(filename, start, n))
+                start = None
+            filename = line.rsplit(" b/", 1)[-1]
+        elif start is None and line.startswith("+++ "):
+            path = line[4:]
+            if path != "/dev/null":
+                filename = path[2:] if path.startswith("b/") else path
+        elif line.startswith("@@"):
+            if start is not None:
+                hunks.append(Hunk(filename, start, n))
+            start = n
+
+    if start is not None:
+        hunks.append(Hunk(filename, start, len(lines)))
+
+    return hunks
+
+
+def line_attr(line):
+    """Return the attribute of a line of a hunk based on its prefix."""
+    if line.startswith("+"):
+        return "green_text"
+    elif line.startswith("-"):
+        return "red_text"
+    else:
+        return "code"
+
+
+# -- Syntax -------------------------------------------------------------------
+
+_LEXERS = {}
+
+
+def _lexer(filename):
+    if get_lexer_for_filename is None or not filename:
+        return
+
+    extension = filename.rsplit(".", 1)[-1]
+    if extension not in _LEXERS:
+        try:
+            _LEXERS[extension] = get_lexer_for_filename(filename,
+                                                        stripnl=False,
+                                                        ensurenl=False)
+        except ClassNotFound:
+            _LEXERS[extension] = None
+
+    return _LEXERS[extension]
+
+
+def _token_attr(token_type):
+    if get_lexer_for_filename is None:
+        return
+    elif token_type in Token.Comment:
+        return "syntax_comment"
+    elif token_type in Token.Keyword:
+        return "syntax_keyword"
+    elif token_type in Token.Literal.String:
+        return "syntax_string"
+    elif token_type in Token.Literal.Number:
+        return "syntax_number"
+    elif token_type in Token.Name.Function or token_type in Token.Name.Class:
+        return "syntax_name"
+
+
+def syntax_attrs(filename, code_lines):
+    """
+    Return, for every line in ``code_lines``, a list with the syntax attribute
+    of each character or ``None`` where there is nothing to highlight.
+    """
+    attrs = [[None] * len(line) for line in code_lines]
+
+    lexer = _lexer(filename)
+    if lexer is None:
+        return attrs
+
+    row, column = 0, 0
+    for token_type, value in lexer.get_tokens('\n'.join(code_lines)):
+        attr = _token_attr(token_type)
+        for char in value:
+            if row >= len(attrs):
+                return attrs
+            if char == '\n':
+                row, column = row + 1, 0
+                continue
+            if column < len(attrs[row]):
+                attrs[row][column] = attr
+            column += 1
+
+    return attrs
+
+
+# -- Intra-line changes -------------------------------------------------------
+
+def _changed_spans(old, new):
+    """
+    Return the character spans that changed in ``old`` and in ``new`` as two
+    lists of ``(start, end)`` tuples, comparing them word by word.
+    """
+    old_words = WORD_RE.findall(old)
+    new_words = WORD_RE.findall(new)
+
+    matcher = SequenceMatcher(None, old_words, new_words, autojunk=False)
+    if matcher.ratio() < MIN_SIMILARITY:
+        return [], []
+
+    def offsets(words):
+        result = [0]
+        for word in words:
+            result.append(result[-1] + len(word))
+        return result
+
+    old_offsets = offsets(old_words)
+    new_offsets = offsets(new_words)
+
+    old_spans, new_spans = [], []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        if i1 != i2:
+            old_spans.append((old_offsets[i1], old_offsets[i2]))
+        if j1 != j2:
+            new_spans.append((new_offsets[j1], new_offsets[j2]))
+
+    return old_spans, new_spans
+
+
+def intraline_changes(lines):
+    """
+    Pair every block of removed lines with the block of added lines that
+    follows it, and return a dictionary mapping the index of each paired line
+    to the spans of its code (without the prefix) that changed.
+    """
+    changes = {}
+
+    n = 0
+    while n < len(lines):
+        if not lines[n].startswith("-"):
+            n += 1
+            continue
+
+        removed_start = n
+        while n < len(lines) and lines[n].startswith("-"):
+            n += 1
+        added_start = n
+        while n < len(lines) and lines[n].startswith("+"):
+            n += 1
+
+        removed = range(removed_start, added_start)
+        added = range(added_start, n)
+        for old, new in zip(removed, added):
+            old_spans, new_spans = _changed_spans(lines[old][1:], lines[new][1:])
+            if old_spans:
+                changes[old] = old_spans
+            if new_spans:
+                changes[new] = new_spans
+
+    return changes
+
+
+# -- Markup -------------------------------------------------------------------
+
+def _group(text, attrs):
+    """Group consecutive characters of ``text`` with the same attribute."""
+    markup = []
+    start = 0
+    for n in range(1, len(text) + 1):
+        if n == len(text) or attrs[n] != attrs[start]:
+            markup.append((attrs[start], text[start:n]))
+            start = n
+    return markup
+
+
+def highlight_hunk(filename, lines):
+    """
+    Return the urwid text markup of every line of the hunk whose lines are
+    ``lines``, the first of them being the ``@@`` header.
+    """
+    header, body = lines[0], lines[1:]
+    code_lines = [line[1:] for line in body]
+
+    syntax = syntax_attrs(filename, code_lines)
+    changes = intraline_changes(body)
+
+    markup = [("cyan_text", header)]
+    for n, line in enumerate(body):
+        base = line_attr(line)
+        code = code_lines[n]
+        attrs = [attr or base for attr in syntax[n]]
+
+        changed = "added_word" if line.startswith("+") else "removed_word"
+        for start, end in changes.get(n, []):
+            for column in range(start, end):
+                attrs[column] = changed
+
+        markup.append([(base, line[:1])] + _group(code, attrs))
+
+    return markup
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.mirror
+~~~~~~~~~~~~~
+
+A copy of every issue, pull request and comment of a repository, for
+looking at them without GitHub.
+"""
+
+import os
+import json
+import time
+
+from .records import PER_PAGE, fetch_page
+from .scheduler import SCHEDULER, BULK, OverBudget
+
+
+def fetch_all(session, url):
+    """Return the JSON of every item of the list at ``url``."""
+    items = []
+    params = {"per_page": PER_PAGE}
+    while url:
+        page, url = fetch_page(session, url, params)
+        items.extend(page)
+        params = None
+    return items
+
+
+class Mirror(object):
+    """
+    Writes every issue and pull request of ``repo``, and their comments, to
+    ``path`` as JSON lines:
+
+        {"type": "issue", "data": {...}}
+        {"type": "comment", "issue": 1, "data": {...}}
+        {"type": "review_comment", "issue": 2, "data": {...}}
+
+    Issues are fetched a page at a time, oldest first, and the comments of a
+    page concurrently, within the limits of the ``BULK`` class of the
+    scheduler. Only one page is held in memory.
+
+    Where it got to is saved after every page, so an interrupted mirror goes
+    on from there when it's run again. ``on_progress`` is called with the
+    number of issues written after every page.
+    """
+    def __init__(self, repo, path, scheduler=None, on_progress=None):
+        self.repo = repo
+        self.path = path
+        self.checkpoint_path = path + ".checkpoint"
+        self.scheduler = SCHEDULER if scheduler is None else scheduler
+        self.on_progress = on_progress
+        self.issues = 0
+
+    def _retry(self, func, *args, **kwargs):
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except OverBudget:
+                # A mirror can wait for the quota to be reset
+                time.sleep(max(self.scheduler.budget.seconds_until_reset(), 1))
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return
+
+        try:
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+        except ValueError:
+            # Better start over than mirror the wrong things
+            return
+
+        # The mirror itself has to be there, up to the checkpoint
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= checkpoint["size"]:
+            return checkpoint
+
+    def _save_checkpoint(self, next_url, size):
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"next": next_url, "size": size, "issues": self.issues}, f)
+        os.rename(tmp_path, self.checkpoint_path)
+
+    def _comments(self, issue):
+        """Return the lines of the comments of ``issue``."""
+        session = self.repo._session
+        lines = []
+
+        if issue.get("comments"):
+            for comment in fetch_all(session, issue["comments_url"]):
+                lines.append({"type": "comment",
+                              "issue": issue["number"],
+                              "data": comment})
+
+        if "pull_request" in issue:
+            url = issue["pull_request"]["url"] + "/comments"
+            for comment in fetch_all(session, url):
+                lines.append({"type": "review_comment",
+                              "issue": issue["number"],
+                              "data": comment})
+
+        return lines
+
+    def run(self):
+        """Mirror what's left, and return the number of issues mirrored."""
+        checkpoint = self._load_checkpoint()
+        if checkpoint is not None:
+            url, params = checkpoint["next"], None
+            size, self.issues = checkpoint["size"], checkpoint["issues"]
+        else:
+            url = self.repo._api + "/issues"
+            # Oldest first, so new issues don't move the pages
+            params = {"state": "all", "sort": "created", "direction": "asc",
+                      "per_page": PER_PAGE}
+            size = 0
+
+        with open(self.path, "ab") as out:
+            # What was written after the last checkpoint is written again
+            out.truncate(size)
+
+            while url:
+                issues, url = self._retry(self.scheduler.call,
+                                          fetch_page, self.repo._session, url, params,
+                                          priority=BULK)
+                params = None
+
+                comments = self._retry(self.scheduler.map, self._comments, issues,
+                                       priority=BULK)
+                for issue, lines in zip(issues, comments):
+                    out.write(encode({"type": "issue", "data": issue}))
+                    for line in lines:
+                        out.write(encode(line))
+                self.issues += len(issues)
+
+                out.flush()
+                os.fsync(out.fileno())
+                self._save_checkpoint(url, out.tell())
+
+                if callable(self.on_progress):
+                    self.on_progress(self.issues)
+
+        os.remove(self.checkpoint_path)
+        return self.issues
+
+
+def encode(line):
+    return (json.dumps(line, separators=(",", ":")) + "\n").encode("utf-8")
@@ -8,14 +8,34 @@ Data structures that power `shipit`.
 """
 
 import itertools
+import threading
+from functools import partial
+from datetime import datetime
 from abc import ABCMeta, abstractmethod
 
 from urwid import MonitoredList
 import github3.issues as issues
 import github3.pulls as pulls
+from github3.issues.label import Label
+from github3.notifications import Thread
+
+from .cache import LRUCache
+from .events import trigger
+from .coalesce import SingleFlight
+from .writes import Write, Bulk
+from .scheduler import SCHEDULER, INTERACTIVE
+from .registry import LABELS
+from .records import IssueRecord, PullRequestRecord
+from . import git, records
+
+
+def is_record(item):
+    return isinstance(item, IssueRecord)
 
 
 def is_issue(item):
+    if is_record(item):
+        return not isinstance(item, PullRequestRecord)
     return isinstance(item, issues.Issue) and item.pull_request is None
 
 
@@ -30,11 +50,14 @@ def is_closed(item):
 
 
 def is_pull_request(item):
-    return isinstance(item, pulls.PullRequest)
+    return isinstance(item, (pulls.PullRequest, PullRequestRecord))
 
 
 def extract_issue(issue_or_pull):
-    if is_pull_request(issue_or_pull):
+    if is_record(issue_or_pull):
+        # Records of pull requests are records of their issue too
+        return issue_or_pull
+    elif is_pull_request(issue_or_pull):
         return issue_or_pull.issue
     elif is_issue(issue_or_pull):
         return issue_or_pull
@@ -46,6 +69,273 @@ def is_comment(item):
     return isinstance(item, (issues.comment.IssueComment, pulls.ReviewComment))
 
 
+def is_notification(item):
+    return isinstance(item, Thread)
+
+
+def item_key(item):
+    """Return a key that identifies an issue or pull request across repos."""
+    if is_notification(item):
+        return item._api
+    return item.html_url
+
+
+def item_stamp(item):
+    """
+    Return what identifies the version of an issue or pull request, it
+    changes when the item is updated or commented.
+    """
+    issue = extract_issue(item)
+    return (issue.updated_at, issue.comments)
+
+
+class Comments(object):
+    """
+    The comments of an issue, fetched from GitHub a page at a time as they are
+    needed.
+    """
+    PAGE_SIZE = 30
+
+    def __init__(self, issue):
+        self.issue = issue
+        self.loaded = []
+        self.exhausted = not issue.comments
+        self._iterator = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.loaded)
+
+    def __getitem__(self, index):
+        return self.loaded[index]
+
+    def ensure(self, count):
+        """Fetch pages until ``count`` comments are loaded or there are no more."""
+        while len(self.loaded) < count and not self.exhausted:
+            self.fetch_page()
+
+    def fetch_page(self):
+        """Fetch the next page of comments and return them."""
+        with self._lock:
+            if self.exhausted:
+                return []
+
+            if self._iterator is None:
+                self._iterator = self.issue.iter_comments()
+
+            page = SCHEDULER.call(list, itertools.islice(self._iterator, self.PAGE_SIZE))
+            self.loaded.extend(page)
+
+            if len(page) < self.PAGE_SIZE:
+                self.exhausted = True
+
+            return page
+
+
+class PendingComment(object):
+    """A comment that is being sent to GitHub."""
+    def __init__(self, user, body):
+        self.user = user
+        self.body = body
+        self.body_text = body
+        self.created_at = datetime.utcnow()
+
+
+def fetch_subject(notification):
+    """
+    Return the issue or pull request that ``notification`` is about, or
+    ``None`` if it's about something else, like a commit or a release.
+    """
+    subject = notification.subject
+    url = subject.get("url")
+    session = notification._session
+
+    def fetch(url):
+        response = SCHEDULER.call(notification._get, url)
+        return notification._json(response, 200)
+
+    if subject.get("type") == "Issue":
+        return issues.Issue(fetch(url), session)
+    elif subject.get("type") == "PullRequest":
+        pr = pulls.PullRequest(fetch(url), session)
+        issue_url = url.replace("/pulls/", "/issues/")
+        setattr(pr, 'issue', issues.Issue(fetch(issue_url), session))
+        return pr
+
+
+def fetch_json(session, url):
+    response = session.get(url)
+    response.raise_for_status()
+    return response.json()
+
+
+def object_urls(record):
+    """Return the URLs of the JSON the object of ``record`` is made of."""
+    if is_pull_request(record):
+        return [record._api, record.pull_api]
+    return [record._api]
+
+
+def make_object(record, issue_json, pr_json=None):
+    """Return the ``github3`` issue or pull request of ``record``."""
+    issue = issues.Issue(issue_json, record._session)
+    if pr_json is None:
+        return issue
+
+    pr = pulls.PullRequest(pr_json, record._session)
+    setattr(pr, 'issue', issue)
+    return pr
+
+
+def fetch_object(record):
+    """Return the ``github3`` issue or pull request of ``record``."""
+    jsons = [SCHEDULER.call(fetch_json, record._session, url)
+             for url in object_urls(record)]
+    return make_object(record, *jsons)
+
+
+def fetch_file_stats(pr):
+    """
+    Return a list of ``(additions, deletions)`` tuples for the files changed in
+    ``pr``, computed locally if both ends of the PR are in our clone.
+    """
+    stats = git.diff_stats(pr.base.sha, pr.head.sha)
+    if stats is not None:
+        return [(additions, deletions) for additions, deletions, _ in stats]
+
+    files = SCHEDULER.call(list, pr.iter_files())
+    return [(file.additions, file.deletions) for file in files]
+
+
+class DetailStore(object):
+    """
+    The data shown in the detail views of issues and pull requests, fetched
+    at most once for every version of an item.
+    """
+    MAX_ITEMS = 256
+
+    def __init__(self):
+        self._comments = LRUCache(self.MAX_ITEMS)
+        self._commits = LRUCache(self.MAX_ITEMS)
+        self._file_stats = LRUCache(self.MAX_ITEMS)
+        self._subjects = LRUCache(self.MAX_ITEMS)
+        self._objects = LRUCache(self.MAX_ITEMS)
+        self._flights = SingleFlight()
+
+    def _get(self, cache, item, create, stamp=None):
+        key = item_key(item)
+        stamp = item_stamp(item) if stamp is None else stamp
+
+        def cached():
+            entry = cache.get(key)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+
+            value = create(item)
+            cache.put(key, (stamp, value))
+            return value
+
+        # Concurrent requests of the same data are made once
+        return self._flights.do((id(cache), key, stamp), cached)
+
+    def hydrate(self, item):
+        """
+        Return the ``github3`` object of ``item`` if it's a record, or
+        ``item`` itself.
+        """
+        if not is_record(item):
+            return item
+        return self._get(self._objects, item, fetch_object)
+
+    def hydrate_later(self, item, callback, errback=None, scope=None):
+        """
+        Call ``callback`` with the ``github3`` object of ``item`` in the UI
+        thread, right away if it's there for the version of ``item``. The
+        pull request and issue of a pull request are fetched concurrently.
+        """
+        if not is_record(item):
+            callback(item)
+            return
+
+        stamp = item_stamp(item)
+        entry = self._objects.get(item_key(item))
+        if entry is not None and entry[0] == stamp:
+            callback(entry[1])
+            return
+
+        urls = object_urls(item)
+        fetched = {}
+        failed = []
+
+        def done(url, json):
+            fetched[url] = json
+            if len(fetched) == len(urls):
+                hydrated = make_object(item, *[fetched[u] for u in urls])
+                self._objects.put(item_key(item), (stamp, hydrated))
+                callback(hydrated)
+
+        def fail(error):
+            # Only once, even if both requests fail
+            if not failed and callable(errback):
+                errback(error)
+            failed.append(error)
+
+        for url in urls:
+            SCHEDULER.submit(fetch_json, item._session, url,
+                             priority=INTERACTIVE,
+                             scope=scope,
+                             callback=partial(done, url),
+                             errback=fail)
+
+    def hydrated(self, item):
+        """Return the ``github3`` object of ``item`` if it was fetched."""
+        entry = self._objects.get(item_key(item))
+        return entry[1] if entry is not None else None
+
+    def loaded_comments(self, item):
+        """Return the comments of ``item`` that were fetched, if any."""
+        entry = self._comments.get(item_key(item))
+        return list(entry[1].loaded) if entry is not None else []
+
+    def comments(self, issue):
+        """Return the ``Comments`` of ``issue``."""
+        return self._get(self._comments, issue,
+                         lambda issue: Comments(extract_issue(self.hydrate(issue))))
+
+    def commits(self, pr):
+        """Return the commits of ``pr``."""
+        return self._get(self._commits, pr,
+                         lambda pr: SCHEDULER.call(list, self.hydrate(pr).iter_commits()))
+
+    def file_stats(self, pr):
+        """See ``fetch_file_stats``."""
+        return self._get(self._file_stats, pr,
+                         lambda pr: fetch_file_stats(self.hydrate(pr)))
+
+    def subject(self, notification):
+        """
+        See ``fetch_subject``, it's fetched again when the notification is
+        updated.
+        """
+        return self._get(self._subjects, notification, fetch_subject,
+                         stamp=notification.updated_at)
+
+    def warm(self, item):
+        """Fetch what the detail view of ``item`` shows first."""
+        if is_notification(item):
+            self.subject(item)
+        elif is_pull_request(item):
+            self.comments(item).ensure(1)
+            self.commits(item)
+            self.file_stats(item)
+        else:
+            self.comments(item).ensure(1)
+
+
+# Shared by every view
+DETAILS = DetailStore()
+
+
 class DataSource(object):
     """A source of data with the notion of updates."""
     __metaclass__ = ABCMeta
@@ -83,6 +373,15 @@ class DataFilter(object):
         return combined
 
 
+def fetch_issue_records(repo, state):
+    """
+    Return the records of the issues of ``repo`` in ``state``, pull requests
+    included, without making ``github3`` objects of them.
+    """
+    url = repo._api + "/issues"
+    return SCHEDULER.call(records.fetch_records, repo._session, url, {"state": state})
+
+
 class IssueSource(DataSource):
     # TODO: use etag to minimize payloads
     def __init__(self, repo):
@@ -90,14 +389,42 @@ class IssueSource(DataSource):
         self.issues = []
         self.open_bootstrapped = False
         self.closed_bootstrapped = False
+        # Whether the open issues are the ones of the last run
+        self.stale = False
+
+    def restore(self, records):
+        """Have the issues in ``records`` until the open ones are fetched."""
+        self.issues = [r for r in records if is_issue(r)]
+        self.stale = bool(self.issues)
+
+    def _extend(self, records):
+        known = dict((i.number, i) for i in self.issues)
+        for record in records:
+            if not is_issue(record):
+                continue
+            if record.number in known:
+                known[record.number].update(record)
+            else:
+                self.issues.append(record)
 
     def fetch_open(self):
-        open_issues = filter(is_issue, self.repo.iter_issues(state='open'))
-        self.issues.extend([i for i in open_issues if i not in self.issues])
+        self.load(fetch_issue_records(self.repo, 'open'))
+
+    def load(self, records, stale=False):
+        """
+        Have the open issues in ``records``, fetched here or elsewhere,
+        updating the ones we had in place.
+        """
+        # The ones that were closed since
+        numbers = set(r.number for r in records)
+        self.issues = [i for i in self.issues if not is_open(i) or i.number in numbers]
+        self._extend(records)
+        self.open_bootstrapped = True
+        self.stale = stale
 
     def fetch_closed(self):
-        closed_issues = filter(is_issue, self.repo.iter_issues(state='closed'))
-        self.issues.extend([i for i in closed_issues if i not in self.issues])
+        self._extend(fetch_issue_records(self.repo, 'closed'))
+        self.closed_bootstrapped = True
 
     def update(self):
         raise NotImplementedError
@@ -105,18 +432,30 @@ class IssueSource(DataSource):
     def __iter__(self):
         return itertools.chain(self.iter_open(), self.iter_closed())
 
+    # They're fetched again next time if fetching them fails
+
     def iter_open(self):
         if not self.open_bootstrapped:
-            self.open_bootstrapped = True
             self.fetch_open()
         return filter(is_open, self.issues)
 
     def iter_closed(self):
         if not self.closed_bootstrapped:
-            self.closed_bootstrapped = True
             self.fetch_closed()
         return filter(is_closed, self.issues)
 
+    def upsert(self, issue):
+        """
+        Update the record with the number of ``issue`` in place, or add it if
+        it's new. Return the record that's tracked.
+        """
+        for existing in self.issues:
+            if existing.number == issue.number:
+                existing.update(issue)
+                return existing
+        self.issues.append(issue)
+        return issue
+
 
 class PullRequestSource(DataSource):
     # TODO: use etag here, too
@@ -124,34 +463,93 @@ class PullRequestSource(DataSource):
         self.repo = repo
         self.pulls = []
         self.bootstrapped = False
+        # Whether the pull requests are the ones of the last run
+        self.stale = False
+
+    def restore(self, records):
+        """Have the open pull requests in ``records`` until they're fetched."""
+        self.pulls = [r for r in records if is_pull_request(r) and is_open(r)]
+        self.stale = bool(self.pulls)
 
     def update(self):
-        for num in (p.number for p in self.repo.iter_pulls()):
-            p = self.repo.pull_request(num)
-            setattr(p, 'issue', self.repo.issue(num))
-            if p not in self.pulls:
-                self.pulls.append(p)
+        # The issues of pull requests have everything the list shows
+        self.load(fetch_issue_records(self.repo, 'open'))
+
+    def load(self, records, stale=False):
+        """
+        Have the open pull requests in ``records``, fetched here or
+        elsewhere, updating the ones we had in place.
+        """
+        known = dict((p.number, p) for p in self.pulls)
+        pulls = []
+        for pr in records:
+            if not is_pull_request(pr) or not is_open(pr):
+                continue
+            if pr.number in known:
+                known[pr.number].update(pr)
+                pr = known[pr.number]
+            pulls.append(pr)
+        # The ones that aren't open anymore are dropped
+        self.pulls = pulls
+        self.bootstrapped = True
+        self.stale = stale
 
     def __iter__(self):
         if not self.bootstrapped:
+            # Bootstrapped once they're loaded, so a failure is tried again
             self.update()
-            self.bootstrapped = True
         return iter(self.pulls)
 
+    def upsert(self, pr):
+        """
+        Update the record with the number of ``pr`` in place, add it if it's
+        new and open, or stop tracking it once it's closed. Return the record
+        that was updated, if any.
+        """
+        for existing in self.pulls:
+            if existing.number == pr.number:
+                existing.update(pr)
+                if not is_open(existing):
+                    self.pulls.remove(existing)
+                return existing
+        if is_open(pr):
+            self.pulls.append(pr)
+            return pr
+
+
+class NotificationSource(DataSource):
+    """
+    The unread notifications of the user, which are polled for instead of
+    fetched on demand.
+    """
+    def __init__(self):
+        self.notifications = []
+
+    def update(self, notifications=()):
+        """Replace the notifications with the ones that were polled."""
+        self.notifications = sorted(notifications,
+                                    key=lambda n: n.updated_at,
+                                    reverse=True)
+
+    def __iter__(self):
+        return iter(self.notifications)
+
 
 class LabelsFilter(DataFilter):
     def __init__(self, labels=None):
         self.labels = [] if labels is None else labels
 
     def has_labels(self, issue):
-        return any(label in issue.labels for label in self.labels)
+        # Labels of different repositories are the same if they're named alike
+        names = set(label.name for label in issue.labels)
+        return any(label.name in names for label in self.labels)
 
     def filter(self, iterable):
         if not self.labels:
             # We needn't filter anything!
             for i in iterable:
                 yield i
-            raise StopIteration()
+            return
 
         for i in iterable:
             issue = extract_issue(i)
@@ -175,7 +573,7 @@ class UserFilter(DataFilter):
 class CreatedByFilter(UserFilter):
     def filter(self, iterable):
         for i in iterable:
-            if i.user == self.user:
+            if str(i.user) == str(self.user):
                 yield i
 
 
@@ -183,19 +581,23 @@ class AssignedToFilter(UserFilter):
     def filter(self, iterable):
         for i in iterable:
             issue = extract_issue(i)
-            if issue.assignee and issue.assignee == self.user:
+            if issue.assignee and str(issue.assignee) == str(self.user):
                 yield i
 
 
 class MentioningFilter(UserFilter):
-    def is_mentioned_in(self, issue):
+    def is_mentioned_in(self, item):
+        """
+        Whether the user is mentioned in the body of ``item`` or the comments
+        of it that were fetched: the list is filtered without making requests.
+        """
         username = "@{} ".format(self.user)
 
-        if username in issue.body_text:
+        if username in (extract_issue(item).body or ""):
             return True
 
-        for comment in issue.iter_comments():
-            if username in comment.body_text:
+        for comment in DETAILS.loaded_comments(item):
+            if username in (comment.body_text or ""):
                 return True
         else:
             return False
@@ -212,70 +614,298 @@ class IssuesAndPullRequests(MonitoredList):
     ``urwid.MonitoredList`` so the widget that is displaying it reacts to
     changes on the list.
 
-    It tracks which issues/pulls are being shown.
+    It tracks which issues/pulls are being shown, of one or more
+    repositories.
     """
     OPEN_ISSUES = 0
     CLOSED_ISSUES = 1
     PULL_REQUESTS = 2
-
-    def __init__(self, repo):
-        self.repo = repo
-        # Data sources
-        self._issues_source = IssueSource(repo)
-        self._prs_source = PullRequestSource(repo)
+    NOTIFICATIONS = 3
+
+    def __init__(self, repos, writes, on_error=None):
+        self.repos = repos
+        self.writes = writes
+        # Called with the repository and the error when it can't be loaded
+        self.on_error = on_error
+        # What's being loaded in the background
+        self._loading = set()
+        # Data sources, of every repository
+        self._issues_sources = [IssueSource(repo) for repo in repos]
+        self._prs_sources = [PullRequestSource(repo) for repo in repos]
+        self._notifications_source = NotificationSource()
         # Filters
         self.label_filter = LabelsFilter()
         self.participating_filter = NoOpFilter()
         # What's currently holding
         self.showing = self.OPEN_ISSUES
 
-    # TODO: Asynchronous operations
+    # Writes are queued and shown right away, and undone if they fail
+
+    def _records(self):
+        for source in self._issues_sources:
+            for record in source.issues:
+                yield record
+        for source in self._prs_sources:
+            for record in source.pulls:
+                yield record
+
+    def _copies(self, item):
+        """
+        Return the issue of every copy of ``item``: ``item`` itself, its
+        record in the list and its ``github3`` object, if they exist.
+        """
+        key = item_key(item)
+        copies = [item, DETAILS.hydrated(item)]
+        copies.extend(r for r in self._records() if item_key(r) == key)
+
+        issues = []
+        for copy in filter(None, copies):
+            issue = extract_issue(copy)
+            if all(issue is not i for i in issues):
+                issues.append(issue)
+        return issues
+
+    def _assign(self, item, **values):
+        """
+        Set ``values`` on every copy of ``item`` that has those fields, and
+        return a function that undoes it.
+        """
+        changed = []
+        for issue in self._copies(item):
+            fields = [field for field in values if hasattr(issue, field)]
+            changed.append((issue, dict((f, getattr(issue, f)) for f in fields)))
+            for field in fields:
+                setattr(issue, field, values[field])
+
+        def undo():
+            for issue, previous in changed:
+                for field, value in previous.items():
+                    setattr(issue, field, value)
+        return undo
+
+    def _set_state(self, issue, write, state, on_error=None):
+        if state == "open":
+            undo = self._assign(issue, state=state, closed_at=None)
+        else:
+            undo = self._assign(issue, state=state)
+
+        def rollback(error):
+            undo()
+            self.refresh()
+            if callable(on_error):
+                on_error(error)
+
+        self.writes.push(write, on_error=rollback)
+
+    def close(self, issue, on_error=None):
+        self._set_state(issue, Write.close(issue), "closed", on_error)
+        self._remove_hidden()
+
+    def reopen(self, issue, on_error=None):
+        self._set_state(issue, Write.reopen(issue), "open", on_error)
+        self._remove_hidden()
+
+    def edit(self, issue, title, body, on_error=None):
+        undo = self._assign(issue, title=title, body=body, body_text=body)
+
+        def rollback(error):
+            undo()
+            if callable(on_error):
+                on_error(error)
+
+        self.writes.push(Write.edit(issue, title, body), on_error=rollback)
 
-    def close(self, issue):
-        issue.close()
+    def edit_comment(self, comment, body, on_error=None):
+        previous = (comment.body, comment.body_text)
+
+        def rollback(error):
+            comment.body, comment.body_text = previous
+            if callable(on_error):
+                on_error(error)
+
+        comment.body, comment.body_text = body, body
+        self.writes.push(Write.edit_comment(comment, body), on_error=rollback)
+
+    def comment(self, issue, body, author, on_error=None):
+        pending = PendingComment(author, body)
+
+        # The comment is shown at the end of the thread if it's loaded
+        comments = DETAILS.comments(issue)
+        if comments.exhausted:
+            comments.loaded.append(pending)
+
+        def rollback(error):
+            if pending in comments.loaded:
+                comments.loaded.remove(pending)
+            if callable(on_error):
+                on_error(error)
+
+        self.writes.push(Write.comment(issue, body), on_error=rollback)
+
+    def bulk(self, items, make_write, on_progress=None):
+        """
+        Send the write that ``make_write`` returns for the issue of every
+        item in ``items``, concurrently. The items are updated as their
+        writes are sent, and the ones that shouldn't be shown anymore are
+        removed when all of them are done.
+
+        Return the running ``Bulk``, which is passed to ``on_progress`` too.
+        """
+        def progress(bulk):
+            if bulk.finished:
+                self._remove_hidden()
+            if callable(on_progress):
+                on_progress(bulk)
+
+        bulk = Bulk(self.writes.session,
+                    items,
+                    lambda item: make_write(extract_issue(item)),
+                    on_item_done=self._on_bulk_item_done,
+                    on_progress=progress)
+        return bulk.start()
+
+    def _on_bulk_item_done(self, item, write, result):
+        for issue in self._copies(item):
+            if isinstance(result, dict) and is_record(issue):
+                # The response is the updated issue
+                issue.update_from_json(result)
+            elif isinstance(result, dict):
+                # A new object of the response, which the one shown takes
+                # the attributes of
+                vars(issue).update(vars(type(issue)(result, issue._session)))
+            elif isinstance(result, list) and is_record(issue):
+                # The response is the labels of the issue
+                issue.labels = tuple(LABELS.get(label) for label in result)
+            elif isinstance(result, list):
+                issue.labels = [Label(label, issue._session) for label in result]
+
+    def _is_hidden(self, item):
         if self.showing == self.OPEN_ISSUES:
-            self.remove(issue)
+            return is_closed(item)
+        elif self.showing == self.CLOSED_ISSUES:
+            return is_open(item)
+        return False
 
-    def reopen(self, issue):
-        issue.reopen()
-        if self.showing == self.CLOSED_ISSUES:
-            self.remove(issue)
+    def _remove_hidden(self):
+        shown = [i for i in self if not self._is_hidden(i)]
+        if len(shown) != len(self):
+            # A single modification instead of one per item
+            self[:] = shown
 
     # TODO: merge PR
 
     # Sources
 
     def show_open_issues(self, **kwargs):
-        self.showing = self.OPEN_ISSUES
-        del self[:]
-        self._append_open_issues()
+        self._show(self.OPEN_ISSUES)
 
     def show_closed_issues(self, **kwargs):
-        self.showing = self.CLOSED_ISSUES
-        del self[:]
-        self._append_closed_issues()
+        self._show(self.CLOSED_ISSUES)
 
     def show_pull_requests(self, **kwargs):
-        self.showing = self.PULL_REQUESTS
-        del self[:]
-        self._append_pull_requests()
-
-    def _append_open_issues(self):
-        iterable = self._issues_source.iter_open()
-        for i in self.filter(iterable):
-            if i not in self:
-                self.append(i)
-
-    def _append_closed_issues(self):
-        iterable = self._issues_source.iter_closed()
-        for i in self.filter(iterable):
-            if i not in self:
-                self.append(i)
-
-    def _append_pull_requests(self):
-        for pr in self.filter(self._prs_source):
-            if pr not in self:
-                self.append(pr)
+        self._show(self.PULL_REQUESTS)
+
+    def show_notifications(self, **kwargs):
+        self.showing = self.NOTIFICATIONS
+        # Filters are about issues, notifications are shown as they are
+        self[:] = list(self._notifications_source)
+        trigger("list_stale", self.stale)
+
+    def _show(self, showing):
+        """
+        Show what was already loaded and load the rest of the repositories
+        concurrently, adding their items as they arrive.
+
+        What the last run left is shown until it's fetched again, and then
+        replaced.
+        """
+        self.showing = showing
+        stale = self.stale
+        self[:] = list(self.filter(self._loaded()))
+        trigger("list_stale", stale)
+
+        for repo, load in self._pending_loads():
+            self._loading.add(load)
+            SCHEDULER.submit(load,
+                             priority=INTERACTIVE,
+                             callback=partial(self._on_loaded, load, showing, stale),
+                             errback=partial(self._on_load_failed, load, repo))
+
+    def _loaded(self):
+        if self.showing == self.OPEN_ISSUES:
+            return [i for s in self._issues_sources for i in s.issues if is_open(i)]
+        elif self.showing == self.CLOSED_ISSUES:
+            return [i for s in self._issues_sources for i in s.issues if is_closed(i)]
+        return [pr for s in self._prs_sources for pr in s.pulls]
+
+    def _pending_loads(self):
+        """Return the repository and load of what isn't loaded nor loading."""
+        if self.showing == self.OPEN_ISSUES:
+            loads = [(s.repo, s.iter_open) for s in self._issues_sources
+                     if not s.open_bootstrapped]
+        elif self.showing == self.CLOSED_ISSUES:
+            loads = [(s.repo, s.iter_closed) for s in self._issues_sources
+                     if not s.closed_bootstrapped]
+        else:
+            loads = [(s.repo, s.__iter__) for s in self._prs_sources
+                     if not s.bootstrapped]
+        return [(repo, load) for repo, load in loads if load not in self._loading]
+
+    def _on_load_failed(self, load, repo, error):
+        # It's loaded again the next time the list is shown
+        self._loading.discard(load)
+        if callable(self.on_error):
+            self.on_error(repo, error)
+
+    def _on_loaded(self, load, showing, stale, items):
+        self._loading.discard(load)
+        if self.showing != showing:
+            return
+        if stale:
+            # Items of the last run may have changed or be gone
+            self._show_current()
+            trigger("list_stale", self.stale)
+            return
+        shown = set(item_key(i) for i in self)
+        new = [i for i in self.filter(items) if item_key(i) not in shown]
+        if new:
+            # A single modification for every repository
+            self.extend(new)
+
+    # Snapshots of the last run
+
+    @property
+    def stale(self):
+        """Whether some of what is shown is from the last run."""
+        if self.showing == self.OPEN_ISSUES:
+            return any(s.stale for s in self._issues_sources)
+        elif self.showing == self.PULL_REQUESTS:
+            return any(s.stale for s in self._prs_sources)
+        # Only open issues and pull requests are kept
+        return False
+
+    def snapshot(self, repo):
+        """Return the records of ``repo`` that the next run starts with."""
+        index = self.repos.index(repo)
+        issues = [i for i in self._issues_sources[index].issues if is_open(i)]
+        return issues + list(self._prs_sources[index].pulls)
+
+    def restore(self, repo, records):
+        """Have the ``records`` of ``repo`` saved by the last run."""
+        index = self.repos.index(repo)
+        self._issues_sources[index].restore(records)
+        self._prs_sources[index].restore(records)
+
+    def load(self, repo, records, stale=False):
+        """
+        Show the open issues and pull requests of ``repo`` in ``records``,
+        which were fetched elsewhere, instead of fetching them.
+        """
+        index = self.repos.index(repo)
+        self._issues_sources[index].load(records, stale)
+        self._prs_sources[index].load(records, stale)
+        self._show_current()
+        trigger("list_stale", self.stale)
 
     # Filters
 
@@ -299,9 +929,58 @@ class IssuesAndPullRequests(MonitoredList):
         self.participating_filter = MentioningFilter(user)
         self.refresh()
 
-    # TODO
-    #def update(self):
-        #pass
+    def update(self, updates, repo=None):
+        """
+        Apply the ``Updates`` of issues and pull requests of ``repo`` (by
+        default the first one) that changed on GitHub to the items we know
+        about, and show them as a single change of the list. Return the
+        items that were updated.
+        """
+        index = 0 if repo is None else self.repos.index(repo)
+        issues_source = self._issues_sources[index]
+        prs_source = self._prs_sources[index]
+
+        updated = []
+        for issue in updates.issues:
+            updated.append(issues_source.upsert(issue))
+        for pr in updates.pulls:
+            updated.append(prs_source.upsert(pr))
+        updated = [item for item in updated if item is not None]
+
+        if updates.missed:
+            self.refetch(repo)
+        elif updated:
+            self._show_current()
+        return updated
+
+    def refetch(self, repo=None):
+        """
+        Fetch the issues and pull requests of ``repo`` (by default the first
+        one) again, because some of their changes were missed. What is shown
+        until then is stale.
+        """
+        index = 0 if repo is None else self.repos.index(repo)
+        issues_source = self._issues_sources[index]
+        prs_source = self._prs_sources[index]
+
+        issues_source.open_bootstrapped = issues_source.closed_bootstrapped = False
+        prs_source.bootstrapped = False
+        issues_source.stale = prs_source.stale = True
+
+        if self.showing != self.NOTIFICATIONS:
+            self._show(self.showing)
+
+    def update_notifications(self, notifications):
+        """Show the ``notifications`` that were polled, if they are shown."""
+        self._notifications_source.update(notifications)
+        if self.showing == self.NOTIFICATIONS:
+            self.show_notifications()
+
+    def _show_current(self):
+        if self.showing == self.NOTIFICATIONS:
+            return
+        # Items are updated in place, so it's a change even if they're equal
+        self[:] = list(self.filter(self._loaded()))
 
     def filter_by_labels(self, labels):
         self.label_filter.reset(labels)
@@ -316,5 +995,7 @@ class IssuesAndPullRequests(MonitoredList):
             self.show_open_issues()
         elif self.showing == self.CLOSED_ISSUES:
             self.show_closed_issues()
+        elif self.showing == self.NOTIFICATIONS:
+            self.show_notifications()
         else:
             self.show_pull_requests()
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.poller
+~~~~~~~~~~~~~
+
+Keeping up with what happens on GitHub.
+"""
+
+import threading
+
+from github3.notifications import Thread
+
+from .scheduler import SCHEDULER, VISIBLE_REFRESH
+from .records import PER_PAGE, PullRequestRecord, fetch_page, record_from_json
+
+
+class ConditionalPoller(object):
+    """
+    Polls ``url`` with conditional requests, which don't count against the
+    rate limit when nothing changed, as often as the ``X-Poll-Interval``
+    header of the responses allows.
+
+    ``fetch`` is called in the background with the JSON of every response
+    that has changes and its return value is passed to ``on_change`` in the
+    UI thread.
+    """
+    # Seconds between polls until GitHub tells us otherwise
+    DEFAULT_INTERVAL = 60
+
+    def __init__(self, session, url, on_change, fetch=None, params=None,
+                 scheduler=None, priority=VISIBLE_REFRESH):
+        self.session = session
+        self.url = url
+        self.on_change = on_change
+        self.fetch = (lambda json: json) if fetch is None else fetch
+        self.params = params
+        self.scheduler = SCHEDULER if scheduler is None else scheduler
+        self.priority = priority
+
+        self.etag = None
+        self.last_modified = None
+        self.interval = self.DEFAULT_INTERVAL
+
+        self._timer = None
+        self._stopped = True
+
+    def poll(self):
+        """
+        Make a conditional request and return what ``fetch`` returns for it,
+        or ``None`` if nothing changed since the last one.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        response = self.session.get(self.url, params=self.params, headers=headers)
+
+        interval = response.headers.get("X-Poll-Interval")
+        if interval and interval.isdigit():
+            self.interval = int(interval)
+
+        if response.status_code == 304:
+            return
+
+        response.raise_for_status()
+
+        self.etag = response.headers.get("ETag", self.etag)
+        self.last_modified = response.headers.get("Last-Modified", self.last_modified)
+
+        return self.fetch(response.json())
+
+    def start(self, delay=0):
+        """Poll after ``delay`` seconds, and then every ``interval``."""
+        self._stopped = False
+        self._schedule(delay)
+
+    def stop(self):
+        self._stopped = True
+        if self._timer is not None:
+            self._timer.cancel()
+
+    def _schedule(self, delay):
+        if self._stopped:
+            return
+        self._timer = threading.Timer(delay, self._submit)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _submit(self):
+        self.scheduler.submit(self.poll,
+                              priority=self.priority,
+                              callback=self._on_poll,
+                              errback=self._on_error)
+
+    def _on_poll(self, changes):
+        try:
+            if changes is not None:
+                self.on_change(changes)
+        finally:
+            # Polling goes on even if the changes couldn't be applied
+            self._schedule(self.interval)
+
+    def _on_error(self, error):
+        # Network hiccups, or we were deferred to save the rate limit
+        self._schedule(self.interval)
+
+
+class Updates(object):
+    """
+    The records of the issues and pull requests that changed. If ``missed``,
+    some changes couldn't be told and everything has to be fetched again.
+    """
+    def __init__(self, issues=None, pulls=None, missed=False):
+        self.issues = [] if issues is None else issues
+        self.pulls = [] if pulls is None else pulls
+        self.missed = missed
+
+    def __bool__(self):
+        return bool(self.issues or self.pulls or self.missed)
+
+    __nonzero__ = __bool__
+
+
+class RepositoryEvents(object):
+    """
+    Turns the events feed of a repository into the records of the updated
+    issues and pull requests, straight from the payload of the events.
+    """
+    def __init__(self, session, make_record=None, url=None):
+        self.session = session
+        self.make_record = make_record or (lambda json: record_from_json(json, session))
+        # Of the feed, for the pages after the first one
+        self.url = url
+        self.last_seen = None
+
+    def __call__(self, events):
+        """
+        Return the ``Updates`` in ``events``, the first page of the feed, and
+        the pages after it until the last event that was seen. The first page
+        is only used to know where we are.
+
+        If the last event seen isn't in the feed anymore, the ``Updates`` are
+        marked as ``missed``.
+        """
+        if self.last_seen is None:
+            if events:
+                self.last_seen = events[0]["id"]
+            return Updates()
+
+        new, found = self._unseen(events)
+
+        page, url, params = events, self.url, {"per_page": PER_PAGE, "page": 2}
+        while not found and url and len(page) == PER_PAGE:
+            page, url = fetch_page(self.session, url, params)
+            # The link to the next page has the parameters already
+            params = None
+            unseen, found = self._unseen(page)
+            new.extend(unseen)
+
+        if events:
+            self.last_seen = events[0]["id"]
+
+        updates = self.updates(reversed(new))
+        updates.missed = not found
+        return updates
+
+    def _unseen(self, events):
+        """
+        Return the events before the last one seen, and whether it was found.
+        """
+        for index, event in enumerate(events):
+            if event["id"] == self.last_seen:
+                return events[:index], True
+        return list(events), False
+
+    def updates(self, events):
+        """Return the ``Updates`` in ``events``, oldest first."""
+        latest = {}
+
+        for event in events:
+            payload = event.get("payload", {})
+            kind = event.get("type")
+
+            if kind in ("IssuesEvent", "IssueCommentEvent") and "issue" in payload:
+                json = payload["issue"]
+            elif kind in ("PullRequestEvent",
+                          "PullRequestReviewCommentEvent") and "pull_request" in payload:
+                json = payload["pull_request"]
+            else:
+                continue
+
+            # Issues and pull requests are numbered together
+            latest[json["number"]] = json
+
+        records = [self.make_record(json) for json in latest.values()]
+        return Updates(issues=[r for r in records if not isinstance(r, PullRequestRecord)],
+                       pulls=[r for r in records if isinstance(r, PullRequestRecord)])
+
+
+def events_poller(repo, on_update):
+    """
+    Return a ``ConditionalPoller`` of the events of ``repo`` that passes the
+    ``Updates`` to ``on_update``.
+    """
+    session = repo._session
+    url = repo._api + "/events"
+    events = RepositoryEvents(session, url=url)
+
+    def on_change(updates):
+        if updates:
+            on_update(updates)
+
+    return ConditionalPoller(session, url, on_change, fetch=events,
+                             params={"per_page": PER_PAGE})
+
+
+def notifications_poller(session, on_update):
+    """
+    Return a ``ConditionalPoller`` of the unread notifications of the user
+    that passes all of them to ``on_update`` when any changes.
+    """
+    url = session.build_url("notifications")
+
+    def fetch(json):
+        return [Thread(notification, session) for notification in json]
+
+    return ConditionalPoller(session, url, on_update, fetch=fetch,
+                             params={"per_page": 50})
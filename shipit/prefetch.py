@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.prefetch
+~~~~~~~~~~~~~~~
+
+Fetch what the user is likely to look at next.
+"""
+
+import threading
+
+from .cache import LRUCache
+from .models import item_key, item_stamp, is_notification
+from .scheduler import SCHEDULER, PREFETCH
+
+
+def item_version(item):
+    """
+    Return what identifies ``item`` and its version, it's warmed again once
+    it's updated.
+    """
+    if is_notification(item):
+        return item_key(item), item.updated_at
+    return item_key(item), item_stamp(item)
+
+
+class Prefetcher(object):
+    """
+    Warms the detail data of the focused item of a list and its nearest
+    neighbours in the background, so their detail views open instantly.
+
+    The requests are made with ``PREFETCH`` priority so they never get in the
+    way of what the user asked for, and the ones for items that are no longer
+    around the focus are cancelled.
+    """
+    NEIGHBOURS = 2
+    # Versions of items remembered as warmed
+    MAX_WARMED = 256
+
+    def __init__(self, warm, scheduler=None):
+        self.warm = warm
+        self.scheduler = SCHEDULER if scheduler is None else scheduler
+        self._jobs = {}
+        self._warmed = LRUCache(self.MAX_WARMED)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def neighbourhood(cls, items, position):
+        """
+        Return the item at ``position`` followed by its neighbours, closest
+        first.
+        """
+        order = [position]
+        for distance in range(1, cls.NEIGHBOURS + 1):
+            order.extend([position + distance, position - distance])
+
+        return [items[n] for n in order if 0 <= n < len(items)]
+
+    def focus(self, items, position):
+        """Prefetch around the item at ``position`` of ``items``."""
+        wanted = [(item_version(item), item)
+                  for item in self.neighbourhood(items, position)]
+        wanted_versions = set(version for version, _ in wanted)
+
+        with self._lock:
+            for version in list(self._jobs):
+                if version not in wanted_versions:
+                    self._jobs.pop(version).cancel()
+
+            for version, item in wanted:
+                if version in self._jobs or version in self._warmed:
+                    continue
+                self._submit(version, item)
+
+    def _submit(self, version, item):
+        # Must be called with the lock held
+        def warm():
+            try:
+                self.warm(item)
+                self._warmed.put(version, True)
+            finally:
+                with self._lock:
+                    # Unless it was cancelled and replaced meanwhile
+                    if self._jobs.get(version) is request:
+                        del self._jobs[version]
+
+        request = self.scheduler.submit(warm, priority=PREFETCH)
+        self._jobs[version] = request
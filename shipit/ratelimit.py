@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.ratelimit
+~~~~~~~~~~~~~~~~
+
+Keeping track of the GitHub API quota, and of how much of it we can spend.
+"""
+
+import time
+import threading
+
+from .events import trigger
+from .scheduler import INTERACTIVE, VISIBLE_REFRESH, PREFETCH, BULK
+from .workers import call_in_main_thread
+
+
+# Requests that are always kept for what the user asks for
+RESERVE = 100
+
+# Share of the quota, on top of the reserve, below which every class of
+# background requests stops
+THRESHOLDS = {
+    VISIBLE_REFRESH: 0.0,
+    PREFETCH: 0.1,
+    BULK: 0.25,
+}
+
+# Below this share of the quota, background requests are spaced out so they
+# don't exhaust it before it's reset
+THROTTLE_BELOW = 0.5
+
+
+class RateLimit(object):
+    """
+    The state of the rate limit, as reported by the ``X-RateLimit-*`` headers
+    of the latest response.
+
+    It's used as the budget of a ``Scheduler``: background requests are
+    slowed down as the quota shrinks and deferred until it's reset when only
+    the reserve for interactive requests is left.
+    """
+    def __init__(self):
+        self.limit = None
+        self.remaining = None
+        self.reset = None
+        self._last_started = {}
+        self._lock = threading.Lock()
+
+    def watch(self, session):
+        """Track the rate limit reported by the responses of ``session``."""
+        session.hooks["response"].append(self.hook)
+
+    def hook(self, response, *args, **kwargs):
+        self.update(response.headers)
+        return response
+
+    def update(self, headers):
+        """Update from the headers of a response."""
+        try:
+            limit = int(headers["X-RateLimit-Limit"])
+            remaining = int(headers["X-RateLimit-Remaining"])
+            reset = int(headers["X-RateLimit-Reset"])
+        except (KeyError, ValueError):
+            return
+
+        with self._lock:
+            self.limit = limit
+            self.remaining = remaining
+            self.reset = reset
+
+        call_in_main_thread(trigger, "rate_limit_changed", self)
+
+    def seconds_until_reset(self, now=None):
+        if self.reset is None:
+            return 0
+        now = time.time() if now is None else now
+        return max(self.reset - now, 0)
+
+    def spare(self, priority):
+        """
+        Return how many requests of the ``priority`` class can still be made
+        before the quota is reset, or ``None`` if it isn't known.
+        """
+        if self.remaining is None:
+            return
+        if priority == INTERACTIVE:
+            return self.remaining
+
+        floor = RESERVE + THRESHOLDS[priority] * self.limit
+        return self.remaining - floor
+
+    def allows(self, priority):
+        """Return ``True`` if a request of the ``priority`` class can be made."""
+        spare = self.spare(priority)
+        return spare is None or spare > 0 or self.seconds_until_reset() == 0
+
+    def delay(self, priority, now=None):
+        """
+        Return how many seconds a request of the ``priority`` class should wait
+        before being made.
+        """
+        now = time.time() if now is None else now
+        spare = self.spare(priority)
+
+        if priority == INTERACTIVE or spare is None:
+            return 0
+
+        until_reset = self.seconds_until_reset(now)
+        if spare <= 0:
+            return until_reset
+
+        if self.remaining >= THROTTLE_BELOW * self.limit:
+            return 0
+
+        # Spread what's left evenly until the quota is reset
+        interval = until_reset / float(spare)
+        last = self._last_started.get(priority)
+        if last is None:
+            return 0
+        return max(last + interval - now, 0)
+
+    def started(self, priority, now=None):
+        """Tell that a request of the ``priority`` class was made."""
+        self._last_started[priority] = time.time() if now is None else now
+
+
+# Shared by the whole application
+RATE_LIMIT = RateLimit()
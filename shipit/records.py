@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.records
+~~~~~~~~~~~~~~
+
+Compact versions of issues and pull requests, for the lists.
+"""
+
+from datetime import datetime
+
+try:
+    from sys import intern
+except ImportError:
+    pass
+
+from .registry import USERS, LABELS, MILESTONES
+
+
+# Items in every page of a list, the most GitHub allows
+PER_PAGE = 100
+
+
+def parse_time(timestamp):
+    """Return the ``datetime`` of a GitHub ``timestamp``, if there is one."""
+    if timestamp:
+        # Several times faster than ``strptime``, for GitHub's only format
+        return datetime(int(timestamp[0:4]), int(timestamp[5:7]),
+                        int(timestamp[8:10]), int(timestamp[11:13]),
+                        int(timestamp[14:16]), int(timestamp[17:19]))
+
+
+def format_time(time):
+    """Return the GitHub timestamp of ``time``, if there is one."""
+    if time:
+        return time.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class IssueRecord(object):
+    """
+    What the list shows of an issue, and where to fetch the rest of it from.
+    Users, labels and the milestone are entries of ``shipit.registry``.
+
+    The whole ``github3`` issue is only fetched for detail views and the
+    actions that need it, see ``shipit.models.DetailStore.hydrate``.
+    """
+    __slots__ = ("id", "number", "title", "body", "state", "user", "assignee",
+                 "milestone", "labels", "comments", "created_at", "updated_at",
+                 "closed_at", "html_url", "_api", "_session")
+
+    def __init__(self, session):
+        self._session = session
+
+    @classmethod
+    def fields(cls):
+        """Return the name of every field of the record."""
+        return [name for klass in reversed(cls.__mro__)
+                for name in getattr(klass, "__slots__", ())]
+
+    def update_from_json(self, json):
+        """Update the record with the JSON of its issue."""
+        self.id = json["id"]
+        self.number = json["number"]
+        self.title = json["title"]
+        # For the filters
+        self.body = json.get("body")
+        self.state = intern(str(json["state"]))
+        self.user = USERS.get(json.get("user"))
+        self.assignee = USERS.get(json.get("assignee"))
+        self.milestone = MILESTONES.get(json.get("milestone"))
+        self.labels = tuple(LABELS.get(label) for label in json.get("labels") or ())
+        self.comments = json.get("comments", 0)
+        self.created_at = parse_time(json.get("created_at"))
+        self.updated_at = parse_time(json.get("updated_at"))
+        self.closed_at = parse_time(json.get("closed_at"))
+        self.html_url = json["html_url"]
+        self._api = json["url"]
+
+    def to_json(self):
+        """
+        Return the JSON of the issue as far as the record knows it, which
+        ``update_from_json`` reads back.
+        """
+        user, assignee, milestone = self.user, self.assignee, self.milestone
+        return {
+            "id": self.id,
+            "number": self.number,
+            "title": self.title,
+            "body": self.body,
+            "state": self.state,
+            "user": user and {"id": user.id, "login": user.login},
+            "assignee": assignee and {"id": assignee.id, "login": assignee.login},
+            "milestone": milestone and {"id": milestone.id,
+                                        "number": milestone.number,
+                                        "title": milestone.title},
+            "labels": [{"id": label.id, "name": label.name, "color": label.color}
+                       for label in self.labels],
+            "comments": self.comments,
+            "created_at": format_time(self.created_at),
+            "updated_at": format_time(self.updated_at),
+            "closed_at": format_time(self.closed_at),
+            "html_url": self.html_url,
+            "url": self._api,
+        }
+
+    def update(self, other):
+        """Update the record with the fields of a newer ``other`` record."""
+        for name in self.fields():
+            setattr(self, name, getattr(other, name))
+
+    def __repr__(self):
+        return "<%s #%s>" % (type(self).__name__, self.number)
+
+
+class PullRequestRecord(IssueRecord):
+    """
+    An ``IssueRecord`` of the issue of a pull request, that knows where the
+    pull request is too.
+    """
+    __slots__ = ("pull_api", "merged")
+
+    def update_from_json(self, json):
+        """Update the record with the JSON of its issue or pull request."""
+        if "head" in json:
+            # The pull request, which has most of the fields of its issue
+            self.pull_api = json["url"]
+            self.merged = bool(json.get("merged_at"))
+            json = dict(json, url=json["issue_url"])
+        else:
+            self.pull_api = json["pull_request"]["url"]
+            self.merged = bool(json["pull_request"].get("merged_at"))
+        super(PullRequestRecord, self).update_from_json(json)
+
+    def to_json(self):
+        json = super(PullRequestRecord, self).to_json()
+        # Only whether it was merged is known, not when
+        merged_at = (format_time(self.closed_at) or True) if self.merged else None
+        json["pull_request"] = {"url": self.pull_api, "merged_at": merged_at}
+        return json
+
+
+def record_from_json(json, session):
+    """
+    Return the record of the JSON of an issue, or a pull request or its
+    issue.
+    """
+    if "head" in json or "pull_request" in json:
+        record = PullRequestRecord(session)
+    else:
+        record = IssueRecord(session)
+    record.update_from_json(json)
+    return record
+
+
+def fetch_page(session, url, params=None):
+    """
+    Return the JSON of the page of a list at ``url``, and the URL of the
+    next page if there is one.
+    """
+    response = session.get(url, params=params)
+    response.raise_for_status()
+    return response.json(), response.links.get("next", {}).get("url")
+
+
+def pages(session, url, params=None):
+    """
+    Yield the JSON of every page of the list at ``url``, following the
+    ``Link`` headers of the responses.
+    """
+    params = dict(params or {}, per_page=PER_PAGE)
+    while url:
+        page, url = fetch_page(session, url, params)
+        yield page
+
+        # The link to the next page has the parameters already
+        params = None
+
+
+def fetch_records(session, url, params=None):
+    """
+    Return the records of every issue or pull request of the list at
+    ``url``, made straight from the JSON of the pages.
+    """
+    return [record_from_json(json, session)
+            for page in pages(session, url, params)
+            for json in page]
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.registry
+~~~~~~~~~~~~~~~
+
+One entry for every user, label and milestone, shared by the records of
+every repository.
+"""
+
+import threading
+
+try:
+    from sys import intern
+except ImportError:
+    pass
+
+
+class User(object):
+    __slots__ = ("id", "login")
+
+    def __init__(self, json):
+        self.id = json["id"]
+        self.login = None
+        self.update(json)
+
+    def update(self, json):
+        if json["login"] != self.login:
+            self.login = intern(str(json["login"]))
+
+    def __str__(self):
+        return self.login
+
+
+class Label(object):
+    """A label, with the urwid attribute it's shown with."""
+    __slots__ = ("id", "name", "color", "attr")
+
+    def __init__(self, json):
+        self.id = json["id"]
+        self.color = None
+        self.update(json)
+
+    def update(self, json):
+        self.name = json["name"]
+        if json["color"] != self.color:
+            self.color = json["color"]
+            self.attr = label_attr(self.color)
+
+
+class Milestone(object):
+    __slots__ = ("id", "number", "title")
+
+    def __init__(self, json):
+        self.id = json["id"]
+        self.update(json)
+
+    def update(self, json):
+        self.number = json["number"]
+        self.title = json["title"]
+
+
+def label_attr(color):
+    """Return the urwid attribute of a label of the hex ``color``."""
+    # Records are made without importing the UI
+    import urwid
+    from x256 import x256
+
+    # TODO: sensible foreground color
+    bg = "h%s" % x256.from_hex(color)
+    return urwid.AttrSpec("black", bg)
+
+
+class Registry(object):
+    """
+    Keeps an entry for every id, made by ``make`` from the JSON of the first
+    object with that id that is seen, and updated in place with the JSON of
+    the ones that follow, so renames show everywhere.
+    """
+    def __init__(self, make):
+        self.make = make
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, json):
+        """Return the entry of the object of ``json``, if there is one."""
+        if not json:
+            return None
+
+        entry = self._entries.get(json["id"])
+        if entry is None:
+            entry = self.make(json)
+            with self._lock:
+                entry = self._entries.setdefault(entry.id, entry)
+        else:
+            entry.update(json)
+        return entry
+
+
+USERS = Registry(User)
+LABELS = Registry(Label)
+MILESTONES = Registry(Milestone)
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.scheduler
+~~~~~~~~~~~~~~~~
+
+Every request to GitHub goes through here, so what the user is waiting for
+is served before what they may want later.
+"""
+
+import threading
+from collections import deque
+
+from .workers import call_in_main_thread
+
+
+# Priority classes, from most to least urgent
+
+# The user is waiting for it, e.g. opening a issue
+INTERACTIVE = 0
+# Updates of what is on screen
+VISIBLE_REFRESH = 1
+# What the user may look at next
+PREFETCH = 2
+# Everything else, e.g. scanning all the comments of a repository
+BULK = 3
+
+PRIORITIES = [INTERACTIVE, VISIBLE_REFRESH, PREFETCH, BULK]
+
+# How many requests of every class can be in flight at the same time
+LIMITS = {
+    INTERACTIVE: 8,
+    VISIBLE_REFRESH: 2,
+    PREFETCH: 2,
+    BULK: 8,
+}
+
+
+class Cancelled(Exception):
+    """The request was cancelled before it was sent."""
+
+
+class OverBudget(Cancelled):
+    """The request wasn't sent to save what's left of the rate limit."""
+
+
+class Request(object):
+    """A call submitted to the ``Scheduler``."""
+    def __init__(self, func, args, kwargs, priority, scope=None,
+                 callback=None, errback=None):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.scope = scope
+        self.callback = callback
+        self.errback = errback
+        self.cancelled = False
+
+    def cancel(self):
+        """Don't send the request if it hasn't been sent yet."""
+        self.cancelled = True
+
+    def run(self):
+        if self.cancelled:
+            self._fail(Cancelled())
+            return
+
+        try:
+            result = self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            self._fail(e)
+            return
+
+        if callable(self.callback) and not self.cancelled:
+            call_in_main_thread(self.callback, result)
+
+    def _fail(self, error):
+        if callable(self.errback):
+            call_in_main_thread(self.errback, error)
+
+
+class Scheduler(object):
+    """
+    Runs calls with a priority class, never more than the class limit at the
+    same time. Queued requests are run most urgent class first.
+
+    Requests can be submitted with a ``scope``, e.g. the view that needs them,
+    so all of them can be cancelled at once when it's left.
+
+    If a ``budget`` is given, e.g. a ``RateLimit``, it decides how long the
+    requests of every class have to wait before being made.
+    """
+    def __init__(self, limits=None, budget=None):
+        self.limits = dict(LIMITS if limits is None else limits)
+        self.budget = budget
+        self._queues = dict((p, deque()) for p in PRIORITIES)
+        self._running = dict((p, 0) for p in PRIORITIES)
+        self._condition = threading.Condition()
+        self._threads = []
+        self._local = threading.local()
+
+    def _in_request(self):
+        return getattr(self._local, "priority", None) is not None
+
+    def _acquire(self, priority):
+        # Must be called with the condition held
+        while self._running[priority] >= self.limits[priority]:
+            self._condition.wait()
+        self._running[priority] += 1
+
+    def _release(self, priority):
+        with self._condition:
+            self._running[priority] -= 1
+            self._condition.notify_all()
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call ``func`` with the given arguments in the calling thread, waiting
+        for a free slot of the ``priority`` keyword argument class (by default
+        ``INTERACTIVE``) and return its result.
+
+        Calls made while serving a request run right away, in the slot of
+        that request.
+
+        Raise ``OverBudget`` if the budget doesn't allow calls of the class
+        anymore.
+        """
+        priority = kwargs.pop("priority", INTERACTIVE)
+
+        if self._in_request():
+            return func(*args, **kwargs)
+
+        if self.budget is not None and not self.budget.allows(priority):
+            raise OverBudget()
+
+        with self._condition:
+            self._acquire(priority)
+
+        self._started(priority)
+        self._local.priority = priority
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._local.priority = None
+            self._release(priority)
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Call ``func`` with the given arguments in the background. Accepts the
+        following keyword arguments:
+
+        - ``priority``: the class of the request, by default ``PREFETCH``
+        - ``scope``: see ``cancel_scope``
+        - ``callback``: receives the result in the UI thread
+        - ``errback``: receives the exception in the UI thread if the call
+          fails or is cancelled
+
+        Return the ``Request``.
+        """
+        request = Request(func, args, kwargs,
+                          priority=kwargs.pop("priority", PREFETCH),
+                          scope=kwargs.pop("scope", None),
+                          callback=kwargs.pop("callback", None),
+                          errback=kwargs.pop("errback", None))
+
+        with self._condition:
+            self._ensure_started()
+            self._queues[request.priority].append(request)
+            self._condition.notify_all()
+
+        return request
+
+    def map(self, func, iterable, priority=INTERACTIVE):
+        """
+        Call ``func`` with every item of ``iterable`` concurrently and return
+        the results in order, once all of them are done. The first exception
+        is raised after waiting for the rest.
+
+        Inside a request, the calls are made one after the other instead.
+        """
+        items = list(iterable)
+
+        if self._in_request():
+            return [func(item) for item in items]
+
+        results = [None] * len(items)
+        errors = []
+        done = threading.Semaphore(0)
+
+        def run(index, item):
+            try:
+                results[index] = func(item)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                done.release()
+
+        for index, item in enumerate(items):
+            self.submit(run, index, item, priority=priority)
+        for _ in items:
+            done.acquire()
+
+        if errors:
+            raise errors[0]
+        return results
+
+    def cancel_scope(self, scope):
+        """Cancel the requests submitted with ``scope`` that are pending."""
+        with self._condition:
+            for queue in self._queues.values():
+                for request in queue:
+                    if request.scope == scope:
+                        request.cancel()
+
+    def _ensure_started(self):
+        # Enough threads to fill the limits of every class
+        while len(self._threads) < sum(self.limits.values()):
+            thread = threading.Thread(target=self._run, name="shipit-scheduler")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _delay(self, priority):
+        return 0 if self.budget is None else self.budget.delay(priority)
+
+    def _started(self, priority):
+        if self.budget is not None:
+            self.budget.started(priority)
+
+    def _next_request(self):
+        """
+        Return the next request to run, or ``None`` and how many seconds to
+        wait before looking again (``None`` meaning until notified).
+        """
+        # Must be called with the condition held
+        wait = None
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            if not queue:
+                continue
+            if queue[0].cancelled:
+                return queue.popleft(), None
+            if self._running[priority] >= self.limits[priority]:
+                continue
+
+            delay = self._delay(priority)
+            if delay <= 0:
+                return queue.popleft(), None
+            wait = delay if wait is None else min(wait, delay)
+
+        return None, wait
+
+    def _run(self):
+        while True:
+            with self._condition:
+                request, wait = self._next_request()
+                while request is None:
+                    self._condition.wait(wait)
+                    request, wait = self._next_request()
+
+                if not request.cancelled:
+                    self._running[request.priority] += 1
+                    self._started(request.priority)
+
+            if request.cancelled:
+                request.run()
+                with self._condition:
+                    self._condition.notify_all()
+                continue
+
+            self._local.priority = request.priority
+            try:
+                request.run()
+            finally:
+                self._local.priority = None
+                self._release(request.priority)
+
+    def pending(self):
+        """Return the number of requests that are queued or running."""
+        with self._condition:
+            queued = sum(len(queue) for queue in self._queues.values())
+            return queued + sum(self._running.values())
+
+    def join(self):
+        """Block until there is nothing queued or running."""
+        with self._condition:
+            while any(self._queues.values()) or any(self._running.values()):
+                self._condition.wait()
+
+
+# Shared by the whole application
+SCHEDULER = Scheduler()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.search
+~~~~~~~~~~~~~
+
+Incremental search over big texts.
+"""
+
+from bisect import bisect_left, bisect_right
+
+
+class LineIndex(object):
+    """
+    An index over a list of lines, built once per text.
+
+    All the lines are kept lowercased in a single buffer along with the offset
+    where every line starts, so a search is a scan of the buffer in C instead
+    of a loop over the lines in Python.
+    """
+    def __init__(self, lines):
+        self.lines = [line.lower() for line in lines]
+        self.text = '\n'.join(self.lines)
+
+        self.offsets = []
+        offset = 0
+        for line in self.lines:
+            self.offsets.append(offset)
+            offset += len(line) + 1
+
+    def __len__(self):
+        return len(self.lines)
+
+    def line_at(self, offset):
+        """Return the number of the line that contains ``offset``."""
+        return bisect_right(self.offsets, offset) - 1
+
+    def find(self, query):
+        """Return the sorted numbers of the lines that contain ``query``."""
+        matches = []
+        if not query:
+            return matches
+
+        start = self.text.find(query)
+        while start != -1:
+            line = self.line_at(start)
+            matches.append(line)
+
+            # Skip to the next line, we only care about a match per line
+            if line + 1 >= len(self.offsets):
+                break
+            start = self.text.find(query, self.offsets[line + 1])
+
+        return matches
+
+    def narrow(self, query, line_numbers):
+        """Return the numbers in ``line_numbers`` whose line contain ``query``."""
+        return [n for n in line_numbers if query in self.lines[n]]
+
+
+class Search(object):
+    """
+    Case-insensitive incremental search on a ``LineIndex``.
+
+    When the query is refined, e.g. a character is typed, only the lines that
+    matched the previous query are looked at again.
+    """
+    def __init__(self, index):
+        self.index = index
+        self.query = ''
+        self.matches = []
+
+    def update(self, query):
+        """Search ``query`` and return the numbers of the matching lines."""
+        query = query.lower()
+
+        if not query:
+            matches = []
+        elif self.query and self.query in query:
+            matches = self.index.narrow(query, self.matches)
+        else:
+            matches = self.index.find(query)
+
+        self.query = query
+        self.matches = matches
+
+        return matches
+
+    def next(self, line):
+        """
+        Return the first match after ``line``, wrapping around the end.
+
+        Return ``None`` if there are no matches.
+        """
+        if not self.matches:
+            return
+
+        position = bisect_right(self.matches, line)
+        return self.matches[position % len(self.matches)]
+
+    def previous(self, line):
+        """
+        Return the first match before ``line``, wrapping around the beginning.
+
+        Return ``None`` if there are no matches.
+        """
+        if not self.matches:
+            return
+
+        position = bisect_left(self.matches, line) - 1
+        return self.matches[position % len(self.matches)]
+
+    def first(self, line):
+        """Return the first match at or after ``line``, wrapping around."""
+        return self.next(line - 1)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.session
+~~~~~~~~~~~~~~
+
+The HTTP session used to talk to GitHub.
+"""
+
+import time
+import threading
+
+from requests.adapters import HTTPAdapter
+from requests.exceptions import Timeout
+from github3.session import GitHubSession
+
+from .scheduler import LIMITS
+
+
+# A connection for every request the scheduler may run at the same time, and
+# one for the UI thread
+POOL_SIZE = sum(LIMITS.values()) + 1
+
+# Seconds
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+
+# Retries of requests that failed to connect
+MAX_RETRIES = 2
+
+
+class SessionStats(object):
+    """Counters of the requests made by a ``Session``."""
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, error=None):
+        with self._lock:
+            self.requests += 1
+            self.seconds += seconds
+            self.slowest = max(self.slowest, seconds)
+            if isinstance(error, Timeout):
+                self.timeouts += 1
+            elif error is not None:
+                self.errors += 1
+
+    @property
+    def average(self):
+        return self.seconds / self.requests if self.requests else 0.0
+
+
+class Session(GitHubSession):
+    """
+    A GitHub session with a pool of keep-alive connections big enough for
+    the concurrency of the scheduler, compressed responses and timeouts on
+    every request.
+    """
+    def __init__(self, pool_size=POOL_SIZE, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, max_retries=MAX_RETRIES):
+        super(Session, self).__init__()
+
+        self.pool_size = pool_size
+        self.timeouts = (connect_timeout, read_timeout)
+        self.stats = SessionStats()
+
+        self.adapter = HTTPAdapter(pool_connections=1,
+                                   pool_maxsize=pool_size,
+                                   max_retries=max_retries)
+        self.mount("https://", self.adapter)
+        self.mount("http://", self.adapter)
+
+        self.headers.update({
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault("timeout", self.timeouts)
+
+        start = time.time()
+        error = None
+        try:
+            return super(Session, self).request(method, url, *args, **kwargs)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.stats.record(time.time() - start, error)
+
+    def pool_stats(self):
+        """
+        Return a list with a dictionary of statistics for each connection pool,
+        i.e. for every host we talked to.
+        """
+        pools = []
+        manager = self.adapter.poolmanager
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append({
+                "host": pool.host,
+                "size": self.pool_size,
+                "connections": pool.num_connections,
+                "requests": pool.num_requests,
+                "free": pool.pool.qsize() if pool.pool is not None else 0,
+            })
+        return pools
+
+    def report(self):
+        """Return a human readable report of the statistics of the session."""
+        stats = self.stats
+        lines = [
+            "requests: %s (%s errors, %s timeouts)" % (stats.requests,
+                                                      stats.errors,
+                                                      stats.timeouts),
+            "time: %.2fs average, %.2fs slowest" % (stats.average, stats.slowest),
+            "timeouts: %ss connect, %ss read" % self.timeouts,
+        ]
+        for pool in self.pool_stats():
+            lines.append("pool %(host)s: %(connections)s connections opened "
+                         "for %(requests)s requests, %(free)s free "
+                         "slots of %(size)s" % pool)
+        return "\n".join(lines)
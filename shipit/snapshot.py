@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.snapshot
+~~~~~~~~~~~~~~~
+
+The lists of the last run, shown right away while they are fetched again.
+"""
+
+import os
+import json
+import tempfile
+import threading
+
+from .config import data_path
+from .records import record_from_json
+
+# Snapshots of other versions are ignored
+VERSION = 1
+
+# Snapshots are saved from several threads
+_LOCK = threading.Lock()
+
+
+def snapshot_path(account, repo):
+    """
+    Return where the snapshot of ``repo`` is kept for ``account``, which
+    may not see what other accounts see of it.
+    """
+    return data_path("snapshots", account, str(repo.owner), "%s.json" % repo.name)
+
+
+def save(path, records):
+    """Save ``records`` to ``path``, for the next run."""
+    snapshot = {"version": VERSION, "records": [r.to_json() for r in records]}
+
+    with _LOCK:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(snapshot, f, separators=(",", ":"))
+            os.rename(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+
+def load(path, session):
+    """Return the records saved to ``path`` by the last run, if any."""
+    if not os.path.exists(path):
+        return []
+
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+        if snapshot.get("version") != VERSION:
+            return []
+        return [record_from_json(data, session) for data in snapshot["records"]]
+    except (ValueError, KeyError, TypeError, AttributeError):
+        # A corrupted snapshot isn't worth crashing for
+        return []
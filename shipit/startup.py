@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.startup
+~~~~~~~~~~~~~~
+
+Where the time goes until the list is on screen.
+"""
+
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile(object):
+    """
+    The time every phase of startup takes, in the order they happen, and the
+    time since the profile was created when ``finish`` is called.
+    """
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.started = self._last = clock()
+        self.phases = []
+        self.total = None
+
+    @contextmanager
+    def phase(self, name):
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self._last = self.clock()
+            self.phases.append((name, self._last - started))
+
+    def finish(self, name="first frame"):
+        """
+        Stop counting once the first frame is drawn, which is the last phase
+        ``name``.
+        """
+        if self.total is None:
+            now = self.clock()
+            self.phases.append((name, now - self._last))
+            self.total = now - self.started
+
+    def report(self):
+        """Return the time of every phase, and the total, in milliseconds."""
+        width = max([len(name) for name, _ in self.phases] + [len("total")])
+        lines = ["%s %6.1fms" % (name.ljust(width), seconds * 1000)
+                 for name, seconds in self.phases]
+        if self.total is not None:
+            lines.append("%s %6.1fms" % ("total".ljust(width), self.total * 1000))
+        return "\n".join(lines)
@@ -8,20 +8,36 @@ User interface elements.
 """
 
 import time
+import itertools
+from bisect import bisect_right
 from calendar import timegm
+from functools import partial
 
 import urwid
-from x256 import x256
 
 from .config import (
     DIVIDER,
 
     KEY_OPEN_ISSUE, KEY_REOPEN_ISSUE, KEY_CLOSE_ISSUE, KEY_BROWSER, KEY_DETAIL,
-    KEY_COMMENT, KEY_EDIT, KEY_QUIT, KEY_BACK, KEY_DIFF
+    KEY_COMMENT, KEY_EDIT, KEY_QUIT, KEY_BACK, KEY_DIFF, KEY_SEARCH,
+    KEY_SEARCH_NEXT, KEY_SEARCH_PREVIOUS, KEY_SELECT, KEY_LABEL, KEY_ASSIGN,
 )
-from .events import trigger
-from .models import is_issue, is_pull_request, is_comment, is_open
+from .events import trigger, on
+from .models import (
+    is_issue, is_pull_request, is_comment, is_open, is_closed, is_notification,
+    extract_issue, item_key, item_stamp,
+
+    DETAILS,
+)
+from .prefetch import Prefetcher
+from .registry import LABELS, Label, label_attr
 from .func import unlines
+from .search import LineIndex, Search
+from .cache import LRUCache, ViewCache
+from .highlight import parse_hunks, highlight_hunk
+from .workers import Worker
+from .scheduler import SCHEDULER, INTERACTIVE, PREFETCH
+from .git import diff as git_diff
 
 VI_KEYS = {
     'j': 'down',
@@ -40,8 +56,11 @@ ISSUE_LIST_KEYS = [
     (KEY_DETAIL, " View in detail "),
     (KEY_BROWSER, " Open in browser "),
     (KEY_OPEN_ISSUE, " Open issue "),
+    (KEY_SELECT, " Select "),
     (KEY_CLOSE_ISSUE, " Close "),
     (KEY_REOPEN_ISSUE, " Reopen "),
+    (KEY_LABEL, " Label "),
+    (KEY_ASSIGN, " Assign "),
     (KEY_COMMENT, " Comment "),
     (KEY_EDIT, " Edit "),
     (KEY_QUIT, " Quit "),
@@ -51,6 +70,8 @@ ISSUE_DETAIL_KEYS = [
     (KEY_BACK, " Go back "),
     (KEY_CLOSE_ISSUE, " Close issue "),
     (KEY_REOPEN_ISSUE, " Reopen issue "),
+    (KEY_LABEL, " Label "),
+    (KEY_ASSIGN, " Assign "),
     (KEY_COMMENT, " Comment on issue "),
     (KEY_EDIT, " Edit issue or comment "),
     (KEY_QUIT, " Quit "),
@@ -62,6 +83,19 @@ PR_DETAIL_KEYS = [
     (KEY_QUIT, " Quit "),
 ]
 
+# How keys that aren't printable are shown
+KEY_NAMES = {
+    " ": "space",
+}
+
+DIFF_KEYS = [
+    (KEY_BACK, " Go back "),
+    (KEY_SEARCH, " Search "),
+    (KEY_SEARCH_NEXT, " Next match "),
+    (KEY_SEARCH_PREVIOUS, " Previous match "),
+    (KEY_QUIT, " Quit "),
+]
+
 def issue_title(issue):
     text = urwid.Text([("title", issue.title)])
     return urwid.Padding(text, left=0, right=3)
@@ -78,11 +112,11 @@ def pull_request_number(pr):
 
 
 def issue_marker(issue):
-    return ('green_text', '☑') if issue.is_closed() else ('red_text', '☐')
+    return ('green_text', '☑') if is_closed(issue) else ('red_text', '☐')
 
 
 def pull_request_marker(pr):
-    return ('green_text', 'Y') if pr.is_merged() else ('red_text', 'o')
+    return ('green_text', 'Y') if pr.merged else ('red_text', 'o')
 
 
 def issue_comments(issue):
@@ -131,11 +165,11 @@ def pr_author(pr):
 
 
 def pr_comments(pr):
-    return issue_comments(pr.issue)
+    return issue_comments(extract_issue(pr))
 
 
 def pr_commits(pr):
-    commits = len([_ for _ in pr.iter_commits()])
+    commits = len(DETAILS.commits(pr))
     if commits == 1:
         text = "1 commit"
     else:
@@ -145,17 +179,21 @@ def pr_commits(pr):
 
 
 def pr_additions(pr):
-    additions = sum([file.additions for file in pr.iter_files()])
+    additions = sum(additions for additions, _ in DETAILS.file_stats(pr))
     return urwid.Text([("green_text", "+"), ("text", " %s additions" % additions)])
 
 
 def pr_deletions(pr):
-    deletions = sum([file.deletions for file in pr.iter_files()])
+    deletions = sum(deletions for _, deletions in DETAILS.file_stats(pr))
     return urwid.Text([("red_text", "-"), ("text", " %s deletions" % deletions)])
 
 
 def pr_diff(pr):
-    raw_diff = bytes.decode(pr.diff())[2:]
+    local_diff = git_diff(pr.base.sha, pr.head.sha)
+    if local_diff is not None:
+        return local_diff.rstrip('\n')
+
+    raw_diff = bytes.decode(SCHEDULER.call(pr.diff))[2:]
     return raw_diff[:-1]
 
 
@@ -194,9 +232,10 @@ def time_since(datetime):
 
 
 def create_label_attr(label):
-    # TODO: sensible foreground color
-    bg = "h%s" % x256.from_hex(label.color)
-    return urwid.AttrSpec("black", bg)
+    # Entries of the registry have it already
+    if isinstance(label, Label):
+        return label.attr
+    return label_attr(label.color)
 
 
 def create_label_widget(label):
@@ -233,25 +272,82 @@ class ViMotionListBox(urwid.ListBox):
         return self._selectable
 
 
+class Prompt(urwid.Edit):
+    """
+    A single line of input. ``on_change`` is called with the text on every
+    edit, ``on_done`` with the final text when the user presses enter and
+    ``on_cancel`` when the user presses escape.
+    """
+    def __init__(self, caption, on_change=None, on_done=None, on_cancel=None):
+        super(Prompt, self).__init__(("text", caption))
+        self.on_change = on_change
+        self.on_done = on_done
+        self.on_cancel = on_cancel
+
+        urwid.connect_signal(self, "change", self._on_edit)
+
+    def _on_edit(self, edit, text):
+        if callable(self.on_change):
+            self.on_change(text)
+
+    def keypress(self, size, key):
+        if key == "enter":
+            if callable(self.on_done):
+                self.on_done(self.get_edit_text())
+            return
+        elif key == KEY_BACK:
+            if callable(self.on_cancel):
+                self.on_cancel()
+            return
+
+        return super(Prompt, self).keypress(size, key)
+
+
 class Header(urwid.WidgetWrap):
-    def __init__(self, repo):
-        self.repo = repo
+    QUOTA_WIDTH = 22
+
+    def __init__(self, repos):
+        self.repos = repos
+        self.quota = urwid.Text("", align='right')
+        self.freshness = urwid.Text("")
         super(Header, self).__init__(urwid.Text("shipit"))
 
-    @staticmethod
-    def _make_text(text):
-        return urwid.Text(text, align='center')
+    def _make_text(self, text):
+        title = urwid.Text(text, align='center')
+        return urwid.Columns([(self.QUOTA_WIDTH, self.freshness),
+                              title,
+                              (self.QUOTA_WIDTH, self.quota)])
+
+    def stale(self, stale):
+        """Show whether the list is the one of the last run, being updated."""
+        self.freshness.set_text(("number", "updating...") if stale else "")
+
+    def rate_limit(self, rate_limit):
+        """Show what's left of the API quota."""
+        if rate_limit.remaining is None:
+            return
+
+        minutes = int(rate_limit.seconds_until_reset() // 60)
+        text = "API %s/%s, %sm" % (rate_limit.remaining, rate_limit.limit, minutes)
 
-    def _owner_and_repo(self):
-        owner = ("username", str(self.repo.owner))
-        repo = ("text", self.repo.name)
-        return [owner, " / ", repo]
+        scarce = not rate_limit.allows(PREFETCH)
+        self.quota.set_text(("red_text" if scarce else "number", text))
+
+    def _owner_and_repo(self, item=None):
+        if item is None and len(self.repos) > 1:
+            return [("text", "%s repositories" % len(self.repos))]
+        elif item is None:
+            owner, name = str(self.repos[0].owner), self.repos[0].name
+        else:
+            # Items of notifications can be from any repository
+            owner, name = item.html_url.split("/")[3:5]
+        return [("username", owner), " / ", ("text", name)]
 
     def issues_and_pulls(self):
         self._w = self._make_text(self._owner_and_repo())
 
     def issue(self, issue):
-        text = self._owner_and_repo()
+        text = self._owner_and_repo(issue)
         text.extend([" ─ ",
                      ("text", "Issue "),
                      ("number", "#%s" % issue.number),
@@ -260,7 +356,7 @@ class Header(urwid.WidgetWrap):
         self._w = self._make_text(text)
 
     def pull_request(self, pr):
-        text = self._owner_and_repo()
+        text = self._owner_and_repo(pr)
         text.extend([" ─ ",
                      ("text", "Pull Request "),
                      ("number", "#%s" % pr.number),
@@ -271,16 +367,39 @@ class Header(urwid.WidgetWrap):
 
 class Footer(urwid.WidgetWrap):
     def __init__(self):
-        super(Footer, self).__init__(urwid.Text(""))
+        self._keys = urwid.Text("")
+        super(Footer, self).__init__(self._keys)
 
     def issue_list(self):
-        self._w = self._build_widget(ISSUE_LIST_KEYS)
+        self._show_keys(ISSUE_LIST_KEYS)
 
     def issue_detail(self):
-        self._w = self._build_widget(ISSUE_DETAIL_KEYS)
+        self._show_keys(ISSUE_DETAIL_KEYS)
 
     def pr_detail(self):
-        self._w = self._build_widget(PR_DETAIL_KEYS)
+        self._show_keys(PR_DETAIL_KEYS)
+
+    def diff(self):
+        self._show_keys(DIFF_KEYS)
+
+    def _show_keys(self, key_description):
+        self._keys = self._build_widget(key_description)
+        self._w = self._keys
+
+    def prompt(self, prompt):
+        """Show the ``prompt`` widget until ``end_prompt`` is called."""
+        self._previous = self._w
+        self._w = urwid.Pile([make_divider("·"), prompt])
+
+    def end_prompt(self):
+        self._w = getattr(self, "_previous", self._w)
+
+    def message(self, text, attr="text"):
+        """
+        Show ``text`` above the keys until the mode changes or another message
+        is shown.
+        """
+        self._w = urwid.Pile([urwid.Text((attr, text), align="center"), self._keys])
 
     def _build_widget(self, key_description):
         text = self._build_text_list(key_description)
@@ -290,7 +409,7 @@ class Footer(urwid.WidgetWrap):
     def _build_text_list(self, key_description):
         text = []
         for key, description in key_description:
-            text.extend([("key", key), ("text", description)])
+            text.extend([("key", KEY_NAMES.get(key, key)), ("text", description)])
         return text
 
 
@@ -299,13 +418,24 @@ class UI(urwid.WidgetWrap):
     Creates a curses interface for the program, providing functions to draw
     all the components of the UI.
     """
-    def __init__(self, repo):
-        self.repo = repo
-        self.views = {}
-
-        header = Header(repo)
+    # Bounds of the cache of detail views
+    MAX_VIEWS = 32
+    MAX_VIEWS_SIZE = 32 * 1024 * 1024
+
+    def __init__(self, repos):
+        self.repos = repos
+        self.scope = None
+        self.list_view = None
+        self.views = ViewCache(max_entries=self.MAX_VIEWS,
+                               max_size=self.MAX_VIEWS_SIZE,
+                               sizeof=ThreadView.approximate_size)
+
+        header = Header(repos)
         footer = Footer()
 
+        on("rate_limit_changed", header.rate_limit)
+        on("list_stale", header.stale)
+
         # body
         body = urwid.Text("shipit")
 
@@ -348,6 +478,21 @@ class UI(urwid.WidgetWrap):
 
         return focused if focused_is_valid else None
 
+    def get_selected_items(self):
+        """Return the issues and pull requests selected in the list."""
+        if self.list_view is None:
+            return []
+        return [item for item in self.list_view.selected_items()
+                if is_issue(item) or is_pull_request(item)]
+
+    def toggle_selected(self):
+        if self.list_view is not None:
+            self.list_view.toggle_selected()
+
+    def clear_selection(self):
+        if self.list_view is not None:
+            self.list_view.clear_selection()
+
     def get_issue(self):
         """Return a issue if it's focused, otherwise return ``None``."""
         issue = self.get_focused_item(parent_over_comment=True)
@@ -361,9 +506,23 @@ class UI(urwid.WidgetWrap):
         item = self.get_focused_item(parent_over_comment=True)
         return item if is_issue(item) or is_pull_request(item) else None
 
+    def get_notification(self):
+        """Return a notification if it's focused, otherwise return ``None``."""
+        if not isinstance(self.frame.body, ListWidget):
+            return None
+        widget, _ = self.frame.body.issues.body.get_focus()
+        return widget.issue if isinstance(widget, NotificationListWidget) else None
+
     # -- Modes ----------------------------------------------------------------
 
+    def _enter(self, scope):
+        """Cancel the pending requests of the view that is being left."""
+        if self.scope is not None and self.scope != scope:
+            SCHEDULER.cancel_scope(self.scope)
+        self.scope = scope
+
     def issues_and_pulls(self, issues_and_pulls):
+        self._enter("issues")
         self.frame.header.issues_and_pulls()
         self.frame.footer.issue_list()
 
@@ -371,39 +530,163 @@ class UI(urwid.WidgetWrap):
             self.frame.body.reset_list(issues_and_pulls)
             return
 
-        if "issues" in self.views:
-            body = self.views["issues"]
-        else:
-            body = ListWidget(self.repo, issues_and_pulls)
-            self.views["issues"] = body
+        if self.list_view is None:
+            self.list_view = ListWidget(self.repos, issues_and_pulls)
 
-        self.frame.set_body(body)
+        self.frame.set_body(self.list_view)
+
+    def reset_list(self, issues_and_pulls):
+        """Update the list without showing it."""
+        if self.list_view is not None:
+            self.list_view.reset_list(issues_and_pulls)
+
+    def _detail(self, item, show, prepare=()):
+        """
+        Show the detail view of ``item`` with ``show`` once its ``github3``
+        object is there, and what every function of ``prepare`` fetches with
+        it, concurrently. There's a placeholder until then.
+        """
+        key = view_key(item)
+        self._enter(key)
+
+        def shown(hydrated):
+            # Unless another view was entered meanwhile
+            if self.scope == key:
+                show(hydrated)
+
+        def hydrated(hydrated):
+            if not prepare:
+                shown(hydrated)
+                return
+
+            prepared = []
+
+            def done(result):
+                prepared.append(result)
+                if len(prepared) == len(prepare):
+                    shown(hydrated)
+
+            for fetch in prepare:
+                SCHEDULER.submit(fetch, hydrated,
+                                 priority=INTERACTIVE,
+                                 scope=key,
+                                 callback=done,
+                                 errback=failed)
+
+        def failed(error):
+            if self.scope == key:
+                self.error("Couldn't load #{}: {}".format(item.number, error))
+
+        self.frame.set_body(loading_view())
+        DETAILS.hydrate_later(item, hydrated, failed, scope=key)
 
     def issue(self, issue):
+        """Show the detail view of ``issue``, without waiting for it."""
         self.frame.header.issue(issue)
         self.frame.footer.issue_detail()
+        self._detail(issue, self._issue)
 
-        key = "issue.%s" % issue.number
-        if key in self.views:
-            body = self.views[key]
-        else:
+    def _issue(self, issue):
+        key = view_key(issue)
+
+        self.frame.header.issue(issue)
+        self.frame.footer.issue_detail()
+
+        stamp = view_stamp(issue)
+
+        body = self.views.get(key, stamp)
+        if body is None:
             body = issue_detail(issue)
-            self.views[key] = body
+            self.views.put(key, body, stamp)
 
         self.frame.set_body(body)
 
     def pull_request(self, pr):
-        """Render a detail view for the `pr` pull request."""
+        """Render a detail view for the `pr` pull request, without waiting."""
         self.frame.header.pull_request(pr)
         self.frame.footer.pr_detail()
+        # The view shows them
+        self._detail(pr, self._pull_request,
+                     prepare=[DETAILS.commits, DETAILS.file_stats])
 
-        self.frame.body = pull_request_detail(pr)
-        self.frame.set_body(self.frame.body)
+    def _pull_request(self, pr):
+        key = view_key(pr)
+
+        self.frame.header.pull_request(pr)
+        self.frame.footer.pr_detail()
+
+        stamp = view_stamp(pr)
+
+        body = self.views.get(key, stamp)
+        if body is None:
+            body = pull_request_detail(pr)
+            self.views.put(key, body, stamp)
+
+        self.frame.set_body(body)
+
+    def invalidate(self, item):
+        """Discard the cached detail view of ``item``."""
+        if item is not None:
+            self.views.pop(view_key(item))
 
     def diff(self, pr):
+        self._enter("diff.%s" % item_key(pr))
+        self.frame.footer.diff()
+
         self.frame.body = Diff(pr)
         self.frame.set_body(self.frame.body)
 
+    def prompt(self, caption, on_change=None, on_done=None, on_cancel=None):
+        """
+        Ask the user for input in the footer, see ``Prompt`` for the meaning
+        of the callbacks. The prompt is dismissed on enter or escape.
+        """
+        def done(text):
+            self.end_prompt()
+            if callable(on_done):
+                on_done(text)
+
+        def cancel():
+            self.end_prompt()
+            if callable(on_cancel):
+                on_cancel()
+
+        prompt = Prompt(caption, on_change=on_change, on_done=done, on_cancel=cancel)
+        self.frame.footer.prompt(prompt)
+        self.frame.set_focus("footer")
+
+    def end_prompt(self):
+        self.frame.footer.end_prompt()
+        self.frame.set_focus("body")
+
+    def message(self, message):
+        self.frame.footer.message(message)
+
+    def error(self, message):
+        self.frame.footer.message(message, "red_text")
+
+    def search_diff(self):
+        """Search incrementally in the diff that is being shown."""
+        diff = self.frame.body
+        if not isinstance(diff, Diff):
+            return
+
+        origin = diff.focused_line()
+
+        def cancel():
+            diff.search("")
+            diff.set_focus(origin)
+
+        self.prompt("/", on_change=diff.search, on_cancel=cancel)
+
+    def search_diff_next(self):
+        if isinstance(self.frame.body, Diff):
+            self.frame.body.search_next()
+
+    def search_diff_previous(self):
+        if isinstance(self.frame.body, Diff):
+            self.frame.body.search_previous()
+
 
 class IssueListWidget(urwid.WidgetWrap):
     """
@@ -451,6 +734,9 @@ class IssueListWidget(urwid.WidgetWrap):
         label_widgets = [create_label_widget(label) for label in issue.labels]
         return urwid.Pile(label_widgets)
 
+    def set_selected(self, selected):
+        self._w.set_attr_map({None: "selected" if selected else "line"})
+
     def selectable(self):
         return True
 
@@ -489,11 +775,173 @@ class PRListWidget(IssueListWidget):
         return box(widget)
 
 
-def issue_detail(issue):
-    comments = [IssueCommentWidget(issue, comment) for comment in issue.iter_comments()]
-    comments.insert(0, IssueDetailWidget(issue))
+class NotificationListWidget(IssueListWidget):
+    """
+    Widget containing what a notification is about, meant to be rendered on
+    a list. The issue or pull request isn't fetched until it's opened.
+    """
+    MARKERS = {"Issue": "I", "PullRequest": "P"}
+
+    @classmethod
+    def _build_widget(cls, notification):
+        """Return a widget for the ``notification``."""
+        subject = notification.subject
+        title = urwid.Padding(urwid.Text([("title", subject.get("title", ""))]),
+                              left=0, right=3)
+
+        repo = urwid.Text([("username", notification.repository.full_name),
+                           ("text", " " + notification.reason.replace("_", " "))])
+        time = urwid.Text([("time", time_since(notification.updated_at))],
+                          align='right')
+
+        marker = cls.MARKERS.get(subject.get("type"), "·")
+        unread = ('red_text', marker) if notification.unread else ('number', marker)
+        pile = urwid.Pile([title, urwid.Columns([repo, time])])
+
+        return box(urwid.Columns([(3, urwid.Text(unread)), pile]))
+
+
+class CommentThreadWalker(urwid.ListWalker):
+    """
+    A list walker over an issue or pull request followed by its comments.
+
+    The first widget is available right away, the comments are fetched a page
+    at a time when the focus gets close to the last loaded comment. Only the
+    widgets of the ``WINDOW`` most recently visited comments are kept around.
+    """
+    # How close to the last loaded comment we fetch the next page
+    MARGIN = 10
+    WINDOW = 100
+
+    def __init__(self, detail_widget, comments, comment_widget, scope=None):
+        self.detail_widget = detail_widget
+        self.comments = comments
+        self.comment_widget = comment_widget
+        self.scope = scope
+        self.focus = 0
+        self._widgets = LRUCache(max_entries=self.WINDOW)
+        self._loading = None
+        self._placeholder = urwid.Text(("number", "Loading comments..."),
+                                       align="center")
+        self._load_more(0)
+
+    def _load_more(self, position):
+        if self.comments.exhausted or self._loading is not None:
+            return
 
-    thread = ViMotionListBox(urwid.SimpleListWalker(comments))
+        wanted = position + self.MARGIN + 1
+        if wanted > len(self.comments):
+            self._loading = SCHEDULER.submit(self.comments.ensure,
+                                             wanted,
+                                             priority=INTERACTIVE,
+                                             scope=self.scope,
+                                             callback=self._on_page,
+                                             errback=self._on_error)
+
+    @property
+    def built_widgets(self):
+        return len(self._widgets)
+
+    def _on_page(self, page):
+        self._loading = None
+        self._modified()
+
+    def _on_error(self, error):
+        # Try again the next time the comments are needed, e.g. when the view
+        # we left is shown again
+        self._loading = None
+
+    def _last_position(self):
+        # The placeholder goes after the comments while there are more
+        last = len(self.comments)
+        return last if self.comments.exhausted else last + 1
+
+    def _widget_at(self, position):
+        if position == 0:
+            return self.detail_widget
+
+        if position > len(self.comments):
+            return self._placeholder
+
+        widget = self._widgets.get(position)
+        if widget is None:
+            widget = self.comment_widget(self.comments[position - 1])
+            self._widgets.put(position, widget)
+        return widget
+
+    def get_focus(self):
+        return self._widget_at(self.focus), self.focus
+
+    def set_focus(self, position):
+        self.focus = position
+        self._load_more(position)
+        self._modified()
+
+    def get_next(self, position):
+        if position >= self._last_position():
+            return None, None
+        self._load_more(position + 1)
+        return self._widget_at(position + 1), position + 1
+
+    def get_prev(self, position):
+        if position <= 0:
+            return None, None
+        return self._widget_at(position - 1), position - 1
+
+
+def view_key(item):
+    """
+    Return the key of the detail view of ``item`` in ``UI.views``.
+
+    Numbers repeat across repositories, so the key is built from the URL of
+    ``item``.
+    """
+    if is_pull_request(item):
+        return "pr.%s" % item_key(item)
+    return "issue.%s" % item_key(item)
+
+
+view_stamp = item_stamp
+
+
+class ThreadView(urwid.Columns):
+    """
+    The detail view of an issue or pull request: the comment ``thread`` along
+    with an ``info`` sidebar.
+    """
+    # Rough memory cost of a built widget, in bytes
+    WIDGET_SIZE = 2048
+
+    def __init__(self, thread, info):
+        self.thread = thread
+        self.info = info
+
+        vertical_divider = make_vertical_divider()
+
+        super(ThreadView, self).__init__([('weight', 0.8, thread),
+                                          (3, vertical_divider),
+                                          ('weight', 0.2, info)])
+
+    def approximate_size(self):
+        """Return an estimate of the memory used by the view, in bytes."""
+        walker = self.thread.body
+        text = sum(len(comment.body_text or "") for comment in walker.comments.loaded)
+        widgets = walker.built_widgets + len(self.info.body) + 1
+        return text + widgets * self.WIDGET_SIZE
+
+
+def loading_view():
+    """What is shown while the data of a detail view is fetched."""
+    text = urwid.Text(("number", "Loading..."), align="center")
+    return urwid.Columns([urwid.ListBox(urwid.SimpleListWalker([text]))])
+
+
+def issue_detail(issue):
+    thread = ViMotionListBox(
+        CommentThreadWalker(IssueDetailWidget(issue),
+                            DETAILS.comments(issue),
+                            partial(IssueCommentWidget, issue),
+                            scope=view_key(issue)))
 
     info_widgets = []
     if is_open(issue):
@@ -511,20 +959,16 @@ def issue_detail(issue):
 
     info = ViMotionListBox(urwid.SimpleListWalker(info_widgets),
                            selectable=False)
-    vertical_divider = make_vertical_divider()
-
-    widget = urwid.Columns([('weight', 0.8, thread),
-                            (3, vertical_divider),
-                            ('weight', 0.2, info)])
 
-    return widget
+    return ThreadView(thread, info)
 
 
 def pull_request_detail(pr):
-    comments = [PRCommentWidget(pr, comment) for comment in pr.issue.iter_comments()]
-    comments.insert(0, PRDetailWidget(pr))
-
-    thread = ViMotionListBox(urwid.SimpleListWalker(comments))
+    thread = ViMotionListBox(
+        CommentThreadWalker(PRDetailWidget(pr),
+                            DETAILS.comments(pr.issue),
+                            partial(PRCommentWidget, pr),
+                            scope=view_key(pr)))
 
     info_widgets = []
     if is_open(pr):
@@ -544,13 +988,7 @@ def pull_request_detail(pr):
     info = ViMotionListBox(urwid.SimpleListWalker(info_widgets),
                            selectable=False)
 
-    vertical_divider = make_vertical_divider()
-
-    widget = urwid.Columns([('weight', 0.8, thread),
-                            (3, vertical_divider),
-                            ('weight', 0.2, info)])
-
-    return widget
+    return ThreadView(thread, info)
 
 
 def issue_list(issues):
@@ -559,6 +997,8 @@ def issue_list(issues):
             yield IssueListWidget(issue)
         elif is_pull_request(issue):
             yield PRListWidget(issue)
+        elif is_notification(issue):
+            yield NotificationListWidget(issue)
 
 
 class ListWidget(urwid.Columns):
@@ -566,12 +1006,15 @@ class ListWidget(urwid.Columns):
     A widget that represents a list of issues and Pull Requests, along with
     controls for sorting and filtering the aforementioned entities.
     """
-    def __init__(self, repo, items):
+    def __init__(self, repos, items):
         issue_widgets = [w for w in issue_list(items)]
 
         self.issues = ViMotionListBox(urwid.SimpleListWalker(issue_widgets))
+        self.selected = set()
+        self.prefetcher = Prefetcher(DETAILS.warm)
+        urwid.connect_signal(self.issues.body, "modified", self.on_focus_change)
         vertical_divider = make_vertical_divider()
-        self.controls = Controls(repo, items)
+        self.controls = Controls(repos, items)
 
         super(ListWidget, self).__init__(
             [('weight', 0.8, self.issues),
@@ -584,11 +1027,48 @@ class ListWidget(urwid.Columns):
         del list_walker[:]
         list_walker.extend(widgets)
 
+        for widget in widgets:
+            if item_key(widget.issue) in self.selected:
+                widget.set_selected(True)
+
+    def toggle_selected(self):
+        widget, _ = self.issues.body.get_focus()
+        if widget is None:
+            return
+
+        key = item_key(widget.issue)
+        if key in self.selected:
+            self.selected.remove(key)
+        else:
+            self.selected.add(key)
+        widget.set_selected(key in self.selected)
+
+    def selected_items(self):
+        return [w.issue for w in self.issues.body if item_key(w.issue) in self.selected]
+
+    def clear_selection(self):
+        self.selected.clear()
+        for widget in self.issues.body:
+            widget.set_selected(False)
+
+    def on_focus_change(self):
+        """Prefetch the details of the focused item and its neighbours."""
+        walker = self.issues.body
+        _, position = walker.get_focus()
+        if position is None:
+            return
+
+        neighbours = self.prefetcher.NEIGHBOURS
+        start = max(position - neighbours, 0)
+        window = [w.issue for w in walker[start:position + neighbours + 1]]
+
+        self.prefetcher.focus(window, position - start)
+
 
 class Controls(ViMotionListBox):
     # TODO: Milestone filter
-    def __init__(self, repo, issues):
-        self.repo = repo
+    def __init__(self, repos, issues):
+        self.repos = repos
         self.issues = issues
 
         widgets = self._build_widgets()
@@ -602,21 +1082,30 @@ class Controls(ViMotionListBox):
         controls.extend([OpenIssuesFilter(state_filters),
                          ClosedIssuesFilter(state_filters),
                          PullRequestsFilter(state_filters),
+                         NotificationsFilter(state_filters),
                          make_divider()])
         # Assignation filters
         filters = []
         controls.extend([Legend("Show"),
-                         br,
+                         br(),
                          AllFilter(filters),
                          CreatedFilter(filters),
                          AssignedFilter(filters),
                          MentioningFilter(filters),])
         # Labels
-        labels = LabelFiltersWidget(label for label in self.repo.iter_labels())
-        controls.extend([br, labels])
+        labels = LabelFiltersWidget(self._labels())
+        controls.extend([br(), labels])
 
         return controls
 
+    def _labels(self):
+        """Return the labels of every repository, one of each name."""
+        labels = SCHEDULER.map(lambda repo: list(repo.iter_labels()), self.repos)
+        by_name = {}
+        for label in itertools.chain.from_iterable(labels):
+            by_name.setdefault(label.name, LABELS.get(label._json_data))
+        return sorted(by_name.values(), key=lambda label: label.name.lower())
+
     def get_focused(self):
         pass
 
@@ -704,6 +1193,14 @@ class PullRequestsFilter(RadioButtonWrap):
         trigger("show_pull_requests")
 
 
+class NotificationsFilter(RadioButtonWrap):
+    def __init__(self, filters):
+        super(NotificationsFilter, self).__init__(filters, "Notifications")
+
+    def on_check(self):
+        trigger("show_notifications")
+
+
 class LabelWidget(urwid.WidgetWrap):
     """Represent a label."""
     def __init__(self, label):
@@ -728,7 +1225,7 @@ class LabelFiltersWidget(urwid.WidgetWrap):
     """
     def __init__(self, labels):
         # Legend
-        widgets = [Legend("Filter by label"), br]
+        widgets = [Legend("Filter by label"), br()]
         # Checkboxes
         self.label_widgets = [LabelWidget(label) for label in labels]
         widgets.extend(self.label_widgets)
@@ -957,18 +1454,123 @@ class PRCommentWidget(IssueCommentWidget):
         super(PRCommentWidget, self).__init__(pr.issue, comment)
 
 
+# Highlighted hunks, keyed by ``Hunk.key``
+HIGHLIGHTS = LRUCache(max_entries=1024)
+
+HIGHLIGHTER = Worker("shipit-highlight")
+
+
 class Diff(ViMotionListBox):
+    """
+    A diff, coloured by line prefix when it's opened. The hunks that enter the
+    viewport are highlighted in the background and repainted when ready.
+    """
     def __init__(self, pr):
         self.pr = pr
         self.diff = pr_diff(pr)
+        self.lines = unlines(self.diff)
+        self._search = None
+        self._hunks = None
+        self._hunk_starts = None
+        self._highlighted = set()
+        self._pending = {}
         super(Diff, self).__init__(
             urwid.SimpleListWalker(
                 [l for l in self._build_lines(self.diff)]))
 
+    def render(self, size, focus=False):
+        self._highlight_visible(size)
+        return super(Diff, self).render(size, focus)
+
+    def _visible_hunks(self, size):
+        if self._hunks is None:
+            self._hunks = parse_hunks(self.lines)
+            self._hunk_starts = [hunk.start for hunk in self._hunks]
+
+        # Every line takes at least a row, so the viewport is within a screen
+        # height of the focused line
+        rows = size[1] if len(size) > 1 else 0
+        line = self.focused_line()
+        first, last = line - rows, line + rows
+
+        position = max(bisect_right(self._hunk_starts, first) - 1, 0)
+        visible = []
+        for hunk in self._hunks[position:]:
+            if hunk.start > last:
+                break
+            if hunk.end > first:
+                visible.append(hunk)
+        return visible
+
+    def _highlight_visible(self, size):
+        visible = self._visible_hunks(size)
+
+        # Don't waste time on hunks that were scrolled past
+        for hunk, job in list(self._pending.items()):
+            if hunk not in visible:
+                job.cancel()
+                del self._pending[hunk]
+
+        for hunk in visible:
+            if hunk in self._highlighted or hunk in self._pending:
+                continue
+
+            markup = HIGHLIGHTS.get(hunk.key(self.lines))
+            if markup is not None:
+                self._paint(hunk, markup)
+            else:
+                job = HIGHLIGHTER.submit(highlight_hunk,
+                                         hunk.filename,
+                                         hunk.lines(self.lines),
+                                         callback=partial(self._on_highlighted, hunk))
+                self._pending[hunk] = job
+
+    def _on_highlighted(self, hunk, markup):
+        self._pending.pop(hunk, None)
+        HIGHLIGHTS.put(hunk.key(self.lines), markup)
+        self._paint(hunk, markup)
+
+    def _paint(self, hunk, markup):
+        self._highlighted.add(hunk)
+        for widget, line_markup in zip(self.body[hunk.start:hunk.end], markup):
+            widget.set_text(line_markup)
+
+    def focused_line(self):
+        _, position = self.get_focus()
+        return position if position is not None else 0
+
+    def _searcher(self):
+        # The index is built on the first search, not when opening the diff
+        if self._search is None:
+            self._search = Search(LineIndex(self.lines))
+        return self._search
+
+    def search(self, query):
+        """
+        Search ``query`` incrementally and focus the first match at or after
+        the focused line.
+        """
+        search = self._searcher()
+        search.update(query)
+        self._focus_line(search.first(self.focused_line()))
+
+    def search_next(self):
+        if self._search is not None:
+            self._focus_line(self._search.next(self.focused_line()))
+
+    def search_previous(self):
+        if self._search is not None:
+            self._focus_line(self._search.previous(self.focused_line()))
+
+    def _focus_line(self, line):
+        if line is not None:
+            self.set_focus(line)
+            self.set_focus_valign("middle")
+
     @staticmethod
     def _build_lines(diff):
         for line in unlines(diff):
-            if line.startswith("ff"):
+            if line.startswith("diff") or line.startswith("ff"):
                 yield urwid.Text(("text", line))
             elif line.startswith("index"):
                 yield urwid.Text(("text", line))
@@ -986,4 +1588,5 @@ class Diff(ViMotionListBox):
                 yield urwid.Text(("code", line))
 
 
-br = Legend("")
+def br():
+    return Legend("")
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.workers
+~~~~~~~~~~~~~~
+
+Background work, and a way to hand its results back to the UI thread.
+"""
+
+import os
+import logging
+import threading
+from queue import Queue, Empty
+
+
+log = logging.getLogger(__name__)
+
+# Callbacks waiting to be run in the UI thread
+_PENDING = Queue()
+
+# File descriptor that wakes up the main loop, see ``attach``
+_WAKE_UP_FD = None
+
+# Whether there is no UI thread, see ``run_inline``
+_INLINE = False
+
+
+def attach(loop):
+    """
+    Make ``call_in_main_thread`` run its callbacks in the thread of the urwid
+    ``loop``. The ones scheduled before it's called are run once it starts.
+    """
+    global _WAKE_UP_FD
+    _WAKE_UP_FD = loop.watch_pipe(_run_pending)
+    if not _PENDING.empty():
+        os.write(_WAKE_UP_FD, b".")
+
+
+def run_inline(inline=True):
+    """
+    Make ``call_in_main_thread`` run its callbacks right away in the calling
+    thread, for running without a UI, like the daemon does. Their errors are
+    logged instead of taking the calling thread down.
+    """
+    global _INLINE
+    _INLINE = inline
+
+
+def _run_pending(data=None):
+    while True:
+        try:
+            func, args, kwargs = _PENDING.get_nowait()
+        except Empty:
+            break
+        func(*args, **kwargs)
+
+    # Keep the pipe open
+    return True
+
+
+def call_in_main_thread(func, *args, **kwargs):
+    """
+    Schedule ``func`` to be called in the UI thread, or call it right away
+    if there is none (see ``run_inline``).
+    """
+    if _INLINE:
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            log.exception("%r failed", func)
+        return
+
+    _PENDING.put((func, args, kwargs))
+    if _WAKE_UP_FD is not None:
+        os.write(_WAKE_UP_FD, b".")
+
+
+class Job(object):
+    """A unit of work submitted to a ``Worker``."""
+    def __init__(self, func, args, kwargs, callback=None, errback=None):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.callback = callback
+        self.errback = errback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        if self.cancelled:
+            return
+
+        try:
+            result = self.func(*self.args, **self.kwargs)
+        except Exception as error:
+            if not callable(self.errback):
+                raise
+            call_in_main_thread(self.errback, error)
+            return
+
+        if callable(self.callback) and not self.cancelled:
+            call_in_main_thread(self.callback, result)
+
+
+class Worker(object):
+    """
+    A daemon thread that runs jobs one after the other. The result of every
+    job is passed to its callback in the UI thread.
+    """
+    def __init__(self, name="shipit-worker"):
+        self.name = name
+        self.jobs = Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Run ``func`` with the given arguments in the background. The keyword
+        arguments ``callback`` and ``errback`` receive the result or the
+        exception in the UI thread; without ``errback`` it's logged.
+
+        Return the ``Job``, which can be cancelled until it starts.
+        """
+        job = Job(func, args, kwargs,
+                  callback=kwargs.pop("callback", None),
+                  errback=kwargs.pop("errback", None))
+
+        self._ensure_started()
+        self.jobs.put(job)
+
+        return job
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name)
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                job.run()
+            except Exception:
+                # A failing job mustn't take the worker down with it
+                log.exception("%r failed", job.func)
+            finally:
+                self.jobs.task_done()
+
+    def join(self):
+        """Block until all the submitted jobs are done."""
+        self.jobs.join()
@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+
+"""
+shipit.writes
+~~~~~~~~~~~~~
+
+Changes to GitHub made in the background, in order, surviving restarts.
+"""
+
+import os
+import json
+import uuid
+import fcntl
+import tempfile
+import threading
+import itertools
+from collections import deque
+
+from requests.exceptions import ConnectionError, Timeout
+
+from .scheduler import SCHEDULER, INTERACTIVE, LIMITS
+from .workers import call_in_main_thread
+
+
+# Seconds to wait before sending again when GitHub can't be reached
+RETRY_SECONDS = 30
+
+
+class Write(object):
+    """
+    A change to make on GitHub: a ``method`` request to ``url`` with a JSON
+    ``payload``, and a human readable ``description`` of it.
+    """
+    def __init__(self, method, url, payload, description, id=None):
+        self.method = method
+        self.url = url
+        self.payload = payload
+        self.description = description
+        self.id = uuid.uuid4().hex if id is None else id
+
+    @classmethod
+    def close(cls, issue):
+        return cls("PATCH", issue._api, {"state": "closed"},
+                   "close #%s" % issue.number)
+
+    @classmethod
+    def reopen(cls, issue):
+        return cls("PATCH", issue._api, {"state": "open"},
+                   "reopen #%s" % issue.number)
+
+    @classmethod
+    def edit(cls, issue, title, body):
+        return cls("PATCH", issue._api, {"title": title, "body": body},
+                   "edit #%s" % issue.number)
+
+    @classmethod
+    def edit_comment(cls, comment, body):
+        return cls("PATCH", comment._api, {"body": body}, "edit comment")
+
+    @classmethod
+    def add_label(cls, issue, label):
+        return cls("POST", issue._api + "/labels", [label],
+                   "label #%s" % issue.number)
+
+    @classmethod
+    def assign(cls, issue, login):
+        return cls("PATCH", issue._api, {"assignee": login},
+                   "assign #%s" % issue.number)
+
+    @classmethod
+    def comment(cls, issue, body):
+        return cls("POST", issue._api + "/comments", {"body": body},
+                   "comment on #%s" % issue.number)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "method": self.method,
+            "url": self.url,
+            "payload": self.payload,
+            "description": self.description,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["method"], data["url"], data["payload"],
+                   data["description"], id=data["id"])
+
+
+def send(session, write):
+    """Send ``write`` and return the JSON of the response."""
+    response = session.request(write.method, write.url,
+                               data=json.dumps(write.payload))
+    response.raise_for_status()
+    return response.json() if response.content else None
+
+
+def is_transient(error):
+    """
+    Whether sending a write failed for reasons that have nothing to do with
+    the write: GitHub couldn't be reached or had an error of its own.
+    """
+    if isinstance(error, (ConnectionError, Timeout)):
+        return True
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code >= 500
+
+
+class WriteQueue(object):
+    """
+    Sends writes with ``session`` one at a time, in the order they were
+    pushed, without blocking the UI.
+
+    The pending writes are saved to ``path`` so they are sent even if shipit
+    crashes or is closed before they are; writes that can't be sent because
+    GitHub can't be reached, or has an error of its own, are retried later.
+
+    Every queue locks the file it saves to while it's open. Other shipit
+    running at the same time use ``path.1``, ``path.2``... so writes are only
+    ever sent by one of them, and whoever finds a file unlocked sends what
+    was left in it.
+
+    ``on_error`` is called with every write that GitHub rejects and the
+    exception, including the ones saved by a previous run.
+    """
+    def __init__(self, session, path=None, scheduler=None, on_error=None):
+        self.session = session
+        self.path = path
+        self.scheduler = SCHEDULER if scheduler is None else scheduler
+        self.on_error = on_error
+        self.pending = []
+        self._callbacks = {}
+        self._sending = False
+        self._lock = threading.Lock()
+        self._claimed = None
+
+        self._claim()
+        self._load()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def _claim(self):
+        """Lock the first queue file at ``path`` that no one else has."""
+        if self.path is None:
+            return
+
+        base = self.path
+        for n in itertools.count():
+            path = base if n == 0 else "%s.%s" % (base, n)
+            lock = open(path + ".lock", "a")
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except (IOError, OSError):
+                # Another shipit sends these
+                lock.close()
+                continue
+
+            self.path = path
+            self._claimed = lock
+            return
+
+    def close(self):
+        """Leave the pending writes to the next one that opens the queue."""
+        if self._claimed is not None:
+            self._claimed.close()
+            self._claimed = None
+
+    def _load(self):
+        if self.path is None or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path) as f:
+                self.pending = [Write.from_dict(w) for w in json.load(f)]
+        except (ValueError, KeyError):
+            # A corrupted queue isn't worth crashing for
+            self.pending = []
+
+    def _save(self):
+        if self.path is None:
+            return
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump([w.to_dict() for w in self.pending], f)
+            os.rename(tmp_path, self.path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def push(self, write, on_done=None, on_error=None):
+        """
+        Queue ``write``. When it's sent, ``on_done`` is called with the JSON of
+        the response; if GitHub rejects it ``on_error`` is called with the
+        exception. Both are called in the UI thread.
+        """
+        with self._lock:
+            self.pending.append(write)
+            self._callbacks[write.id] = (on_done, on_error)
+            self._save()
+
+        self.flush()
+
+    def flush(self):
+        """Send the next pending write if nothing is being sent."""
+        with self._lock:
+            if self._sending or not self.pending:
+                return
+            self._sending = True
+            write = self.pending[0]
+
+        self.scheduler.submit(self._send, write,
+                              priority=INTERACTIVE,
+                              callback=lambda result: self._sent(write, result),
+                              errback=lambda error: self._failed(write, error))
+
+    def _send(self, write):
+        return send(self.session, write)
+
+    def _done(self, write):
+        with self._lock:
+            self._sending = False
+            self.pending.remove(write)
+            self._save()
+            return self._callbacks.pop(write.id, (None, None))
+
+    def _sent(self, write, result):
+        on_done, _ = self._done(write)
+        if callable(on_done):
+            on_done(result)
+        self.flush()
+
+    def _failed(self, write, error):
+        if is_transient(error):
+            # We're offline or GitHub is having trouble, try again later
+            with self._lock:
+                self._sending = False
+            timer = threading.Timer(RETRY_SECONDS, call_in_main_thread, [self.flush])
+            timer.daemon = True
+            timer.start()
+            return
+
+        _, on_error = self._done(write)
+        if callable(on_error):
+            on_error(error)
+        if callable(self.on_error):
+            self.on_error(write, error)
+        self.flush()
+
+
+class Bulk(object):
+    """
+    The same change made to many items at once. The user is waiting for
+    them, so the writes are sent as ``INTERACTIVE``, but no more than
+    ``concurrency`` at the same time to leave a couple of slots for
+    everything else.
+
+    ``on_item_done`` is called with every item, its write and the JSON of the
+    response when it's sent, and ``on_progress`` with the ``Bulk`` itself
+    every time a write is sent or fails. Both are called in the UI thread.
+    """
+    CONCURRENCY = LIMITS[INTERACTIVE] - 2
+
+    def __init__(self, session, items, make_write, scheduler=None,
+                 on_item_done=None, on_progress=None, concurrency=CONCURRENCY):
+        self.session = session
+        self.scheduler = SCHEDULER if scheduler is None else scheduler
+        self.writes = [(item, make_write(item)) for item in items]
+        self.concurrency = concurrency
+        self._unsent = deque(self.writes)
+        self.on_item_done = on_item_done
+        self.on_progress = on_progress
+        self.done = []
+        self.failed = []
+        # Writes finish in several threads at the same time
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.writes)
+
+    @property
+    def finished(self):
+        return len(self.done) + len(self.failed) == len(self.writes)
+
+    def start(self):
+        for _ in range(self.concurrency):
+            self._send_next()
+        return self
+
+    def _send_next(self):
+        try:
+            item, write = self._unsent.popleft()
+        except IndexError:
+            return
+
+        self.scheduler.submit(send, self.session, write,
+                              priority=INTERACTIVE,
+                              callback=self._callback(self._done, item, write),
+                              errback=self._callback(self._failed, item, write))
+
+    @staticmethod
+    def _callback(method, item, write):
+        return lambda result: method(item, write, result)
+
+    def _done(self, item, write, result):
+        with self._lock:
+            self.done.append(item)
+            if callable(self.on_item_done):
+                self.on_item_done(item, write, result)
+            self._progress()
+
+    def _failed(self, item, write, error):
+        with self._lock:
+            self.failed.append((item, error))
+            self._progress()
+
+    def _progress(self):
+        self._send_next()
+        if callable(self.on_progress):
+            self.on_progress(self)
@@ -0,0 +1,11 @@
+import pytest
+
+from shipit import workers
+
+
+@pytest.fixture(autouse=True)
+def inline_callbacks():
+    """There is no UI thread in tests, callbacks run where they're called."""
+    workers.run_inline()
+    yield
+    workers.run_inline(False)
@@ -0,0 +1,113 @@
+from shipit.bootstrap import Bootstrap
+
+
+class Object(object):
+    def __init__(self, json, session=None):
+        self._json_data = json
+        self.has_issues = json.get("has_issues", True)
+        self.fork = json.get("fork", False)
+        self.parent = Object(json["parent"]) if "parent" in json else None
+
+
+class Response(object):
+    def __init__(self, json):
+        self._json = json
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._json
+
+
+class Session(object):
+    def __init__(self, requests, pulls):
+        self.requests = requests
+        self.pulls = pulls
+
+    def get(self, url, params=None):
+        self.requests.append((url, params["head"]))
+        return Response(self.pulls)
+
+
+class API(object):
+    def __init__(self, pulls=()):
+        self.requests = []
+        self._session = Session(self.requests, list(pulls))
+
+    def user(self):
+        self.requests.append("user")
+        return Object({"login": "dialelo"})
+
+    def repository(self, owner, name):
+        self.requests.append("%s/%s" % (owner, name))
+        parent = {"full_name": "alejandrogomez/shipit"}
+        return Object({"full_name": "dialelo/shipit", "has_issues": False,
+                       "fork": True, "parent": parent})
+
+
+class Cached(Bootstrap):
+    USER = REPOSITORY = Object
+
+
+def test_user_and_repositories_are_fetched_once(tmpdir):
+    api, path = API(), str(tmpdir.join("bootstrap.json"))
+    now = [0]
+
+    bootstrap = Cached(api, path, ttl=60, clock=lambda: now[0])
+    assert bootstrap.user()._json_data["login"] == "dialelo"
+    # Forks without issue tracker are resolved to their parent
+    repository = bootstrap.repository("dialelo", "shipit")
+    assert repository._json_data["full_name"] == "alejandrogomez/shipit"
+    assert api.requests == ["user", "dialelo/shipit"]
+
+    # The next run
+    bootstrap = Cached(api, path, ttl=60, clock=lambda: now[0])
+    assert bootstrap.user()._json_data["login"] == "dialelo"
+    repository = bootstrap.repository("dialelo", "shipit")
+    assert repository._json_data["full_name"] == "alejandrogomez/shipit"
+    assert api.requests == ["user", "dialelo/shipit"]
+    assert tmpdir.listdir() == [tmpdir.join("bootstrap.json")]
+
+    # They're fetched again once they are too old
+    now[0] = 60
+    bootstrap.user()
+    assert api.requests == ["user", "dialelo/shipit", "user"]
+
+
+def test_corrupted_caches_are_ignored(tmpdir):
+    path = tmpdir.join("bootstrap.json")
+    path.write("{")
+    api = API()
+
+    Cached(api, str(path)).user()
+    assert api.requests == ["user"]
+
+
+def pull(number, sha):
+    api = "https://api.github.com/repos/dialelo/shipit"
+    return {
+        "id": number, "number": number, "title": "Fix", "state": "open",
+        "user": {"login": "dialelo", "id": 1}, "labels": [],
+        "head": {"sha": sha, "ref": "fix"},
+        "html_url": "https://github.com/dialelo/shipit/pull/%s" % number,
+        "url": "%s/pulls/%s" % (api, number),
+        "issue_url": "%s/issues/%s" % (api, number),
+    }
+
+
+def test_pull_request_of_a_branch_is_fetched_again_when_it_moves(tmpdir):
+    api = API(pulls=[pull(2, "bbb"), pull(1, "aaa")])
+    repo = Object({})
+    repo.full_name = "dialelo/shipit"
+    repo._api = "https://api.github.com/repos/dialelo/shipit"
+    bootstrap = Cached(api, str(tmpdir.join("bootstrap.json")))
+
+    assert bootstrap.pull_request(repo, "dialelo:fix", "aaa").number == 1
+    assert bootstrap.pull_request(repo, "dialelo:fix", "aaa").number == 1
+    assert len(api.requests) == 1
+    assert api.requests[0] == (repo._api + "/pulls", "dialelo:fix")
+
+    # The latest one, when none is at the commit
+    assert bootstrap.pull_request(repo, "dialelo:fix", "ccc").number == 2
+    assert len(api.requests) == 2
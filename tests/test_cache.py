@@ -0,0 +1,50 @@
+from shipit.cache import LRUCache, ViewCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    # Using "a" makes "b" the least recently used
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.keys() == ["a", "c"]
+
+
+def test_lru_evicts_over_size_budget():
+    cache = LRUCache(max_entries=10, max_size=10, sizeof=len)
+    cache.put("a", "x" * 4)
+    cache.put("b", "x" * 4)
+    cache.put("c", "x" * 4)
+
+    assert cache.keys() == ["b", "c"]
+    assert cache.size == 8
+
+    # Values that don't fit on their own are kept while they're in use
+    cache.put("d", "x" * 20)
+    assert cache.keys() == ["d"]
+    assert cache.size == 20
+
+
+def test_lru_notices_values_that_grow():
+    cache = LRUCache(max_entries=10, max_size=10, sizeof=len)
+    first, second = ["x"], ["x"]
+    cache.put("first", first)
+    cache.put("second", second)
+
+    second.extend(["x"] * 9)
+    cache.get("second")
+
+    assert cache.keys() == ["second"]
+
+
+def test_view_cache_invalidates_stale_views():
+    cache = ViewCache()
+    cache.put("issue.1", "view", stamp=("2013-01-01", 3))
+
+    assert cache.get("issue.1", stamp=("2013-01-01", 3)) == "view"
+    assert cache.get("issue.1", stamp=("2013-01-01", 4)) is None
+    assert "issue.1" not in cache
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from shipit.coalesce import SingleFlight, coalesce_gets
+
+
+def test_concurrent_calls_share_a_result():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "result"
+
+    def follower():
+        results.append(flights.do("key", fetch))
+
+    leader = threading.Thread(target=follower)
+    leader.start()
+    started.wait()
+
+    followers = [threading.Thread(target=follower) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flights.shared < 3:
+        time.sleep(0.01)
+
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["result"] * 4
+
+
+def test_calls_after_completion_are_made_again():
+    flights = SingleFlight()
+    calls = []
+
+    flights.do("key", calls.append, 1)
+    flights.do("key", calls.append, 2)
+
+    assert calls == [1, 2]
+
+
+def test_errors_are_raised():
+    flights = SingleFlight()
+
+    with pytest.raises(ValueError):
+        flights.do("key", int, "not a number")
+
+
+class Response(object):
+    def __init__(self):
+        self.parsed = 0
+
+    def json(self):
+        self.parsed += 1
+        return {"parsed": self.parsed}
+
+
+class Session(object):
+    def __init__(self):
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url))
+        return Response()
+
+
+def test_only_gets_are_coalesced():
+    session = Session()
+    coalesce_gets(session)
+
+    response = session.request("GET", "https://api.github.com/x", params={"a": 1})
+    assert response.json() == response.json() == {"parsed": 1}
+
+    session.request("PATCH", "https://api.github.com/x")
+    assert session.requests == [("GET", "https://api.github.com/x"),
+                                ("PATCH", "https://api.github.com/x")]
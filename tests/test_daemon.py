@@ -0,0 +1,117 @@
+import os
+import socket
+import threading
+
+from shipit import daemon as shipit_daemon
+from shipit.daemon import Daemon, DaemonClient, RepositoryStore, connect
+from shipit.poller import Updates
+from shipit.records import record_from_json
+
+
+class Repository(object):
+    full_name = "dialelo/shipit"
+    _api = "https://api.github.com/repos/dialelo/shipit"
+    _session = None
+
+
+def issue(number, state="open"):
+    return record_from_json({
+        "id": number, "number": number, "title": "Crash", "state": state,
+        "user": {"login": "dialelo", "id": 1}, "labels": [], "comments": 0,
+        "html_url": "https://github.com/dialelo/shipit/issues/%s" % number,
+        "url": "https://api.github.com/repos/dialelo/shipit/issues/%s" % number,
+    }, None)
+
+
+def test_clients_get_the_records_and_their_changes(tmpdir):
+    repo = Repository()
+    store = RepositoryStore(repo)
+    store.fetched([issue(1), issue(2)])
+
+    daemon = Daemon(bootstrap=None, path=str(tmpdir.join("daemon.sock")), account="me")
+    daemon.stores[repo.full_name] = store
+    serving = threading.Thread(target=daemon.serve_forever)
+    serving.start()
+
+    updated = threading.Event()
+    updates = []
+
+    def on_update(repo, update):
+        updates.append((repo, update))
+        updated.set()
+
+    try:
+        # Wait for it to listen
+        sock = None
+        while sock is None:
+            sock = connect(daemon.path)
+        assert os.stat(daemon.path).st_mode & 0o777 == 0o600
+
+        client = DaemonClient(sock, [repo], None, on_update=on_update)
+        [(snapshot_repo, records, stale)] = client.subscribe()
+        assert snapshot_repo is repo
+        assert [r.number for r in records] == [2, 1]
+        assert not stale
+
+        client.start()
+        store.apply(Updates(issues=[issue(1, state="closed")]))
+        assert updated.wait(5)
+
+        [(update_repo, update)] = updates
+        assert update_repo is repo
+        assert [(i.number, i.state) for i in update.issues] == [(1, "closed")]
+        # Closed ones aren't kept
+        assert list(store.records) == [2]
+
+        client.close()
+    finally:
+        daemon.shutdown()
+        serving.join(5)
+
+
+def test_updates_received_while_subscribing_are_kept():
+    class Other(Repository):
+        full_name = "dialelo/other"
+
+    repo, other = Repository(), Other()
+    ours, theirs = socket.socketpair()
+    for message in [{"type": "snapshot", "repo": repo.full_name, "stale": False,
+                     "records": [issue(1).to_json()]},
+                    {"type": "update", "repo": repo.full_name,
+                     "issues": [issue(1, state="closed").to_json()], "pulls": []},
+                    {"type": "snapshot", "repo": "someone/else", "stale": False,
+                     "records": []},
+                    {"type": "snapshot", "repo": other.full_name, "stale": True,
+                     "records": []}]:
+        theirs.sendall(shipit_daemon.encode(message))
+
+    updates = []
+    client = DaemonClient(ours, [repo, other], None,
+                          on_update=lambda repo, update: updates.append(update))
+    snapshots = client.subscribe()
+    assert sorted((r.full_name, len(records), stale) for r, records, stale in snapshots) == \
+        [("dialelo/other", 0, True), ("dialelo/shipit", 1, False)]
+
+    theirs.close()
+    client.start()
+    client._thread.join(5)
+    [update] = updates
+    assert [(i.number, i.state) for i in update.issues] == [(1, "closed")]
+
+
+def test_clients_that_do_not_read_are_hung_up_on(monkeypatch):
+    monkeypatch.setattr(shipit_daemon, "MAX_PENDING", 2)
+    ours, theirs = socket.socketpair()
+    subscriber = shipit_daemon.Subscriber(ours, ours.makefile("wb"))
+    message = {"type": "update", "records": ["x" * 1024 * 1024]}
+
+    store = RepositoryStore(Repository())
+    store.subscribers.append(subscriber)
+    for _ in range(10):
+        # Doesn't wait for them to be read
+        store._broadcast(message)
+
+    assert not subscriber.connected
+    store._broadcast(message)
+    assert store.subscribers == []
+    theirs.close()
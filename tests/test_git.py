@@ -0,0 +1,171 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+import pytest
+
+from shipit import git as shipit_git
+from shipit.git import (has_commits, diff, diff_stats, get_remotes, read_remotes,
+                        current_branch, ConfigReader)
+
+
+def git(repo, *args):
+    command = ['git', '-c', 'user.name=shipit', '-c', 'user.email=shipit@localhost']
+    out = subprocess.check_output(command + list(args), cwd=repo)
+    return out.decode().strip()
+
+
+def commit_file(repo, name, contents):
+    with open(os.path.join(repo, name), 'w') as f:
+        f.write(contents)
+    git(repo, 'add', name)
+    git(repo, 'commit', '-q', '-m', name)
+    return git(repo, 'rev-parse', 'HEAD')
+
+
+def make_repo():
+    repo = tempfile.mkdtemp()
+    git(repo, 'init', '-q')
+    return repo
+
+
+def test_local_diff():
+    repo = make_repo()
+    try:
+        base = commit_file(repo, 'a.txt', 'one\ntwo\n')
+        head = commit_file(repo, 'a.txt', 'one\nthree\nfour\n')
+
+        assert has_commits(base, head, cwd=repo)
+
+        text = diff(base, head, cwd=repo)
+        assert '-two' in text
+        assert '+three' in text
+
+        assert diff_stats(base, head, cwd=repo) == [(2, 1, 'a.txt')]
+    finally:
+        shutil.rmtree(repo)
+
+
+def test_local_diff_of_missing_commits():
+    repo = make_repo()
+    try:
+        base = commit_file(repo, 'a.txt', 'one\n')
+        missing = 'f' * 40
+
+        assert not has_commits(base, missing, cwd=repo)
+        assert diff(base, missing, cwd=repo) is None
+        assert diff_stats(missing, base, cwd=repo) is None
+    finally:
+        shutil.rmtree(repo)
+
+
+@pytest.fixture
+def home(tmpdir, monkeypatch):
+    """A home without git configuration, for git and shipit."""
+    monkeypatch.setenv('HOME', str(tmpdir))
+    monkeypatch.setenv('GIT_CONFIG_NOSYSTEM', '1')
+    monkeypatch.delenv('XDG_CONFIG_HOME', raising=False)
+    return tmpdir
+
+
+def git_remotes(cwd):
+    output = git(cwd, 'remote', '-v')
+    return dict((line.split()[0], line.split()[1]) for line in output.splitlines())
+
+
+def test_remotes_are_read_like_git_does(home):
+    repo = make_repo()
+    try:
+        git(repo, 'remote', 'add', 'origin', 'gh:dialelo/shipit.git')
+        git(repo, 'remote', 'add', 'upstream', 'https://github.com/alejandrogomez/shipit.git')
+        home.join('.gitconfig').write('[url "git@github.com:"]\n\tinsteadOf = gh:\n')
+
+        # Included only for repositories in the temporary directory
+        included = home.join('fork.gitconfig')
+        included.write('[remote "fork"]\n\turl = "git@github.com:me/shipit.git" ; mine\n')
+        git(repo, 'config', 'includeIf.gitdir:%s/.git.path' % os.path.realpath(repo),
+            str(included))
+
+        assert read_remotes(repo) == git_remotes(repo)
+        assert 'fork' in read_remotes(repo)
+        assert read_remotes(os.path.join(repo, 'subdirectory')) == git_remotes(repo)
+        assert get_remotes(repo)['origin'] == 'git@github.com:dialelo/shipit.git'
+    finally:
+        shutil.rmtree(repo)
+
+
+def test_remotes_of_worktrees(home):
+    repo = make_repo()
+    worktree = tempfile.mkdtemp()
+    try:
+        commit_file(repo, 'a.txt', 'one\n')
+        git(repo, 'remote', 'add', 'origin', 'git@github.com:dialelo/shipit.git')
+        git(repo, 'worktree', 'add', '-q', os.path.join(worktree, 'branch'))
+
+        path = os.path.join(worktree, 'branch')
+        assert read_remotes(path) == git_remotes(path) == git_remotes(repo)
+    finally:
+        shutil.rmtree(repo)
+        shutil.rmtree(worktree)
+
+
+def test_remotes_are_read_again_when_the_config_changes(home, monkeypatch):
+    repo = make_repo()
+    try:
+        git(repo, 'remote', 'add', 'origin', 'git@github.com:dialelo/shipit.git')
+        reads = []
+        read = ConfigReader.read
+        monkeypatch.setattr(ConfigReader, 'read',
+                            lambda self: reads.append(self) or read(self))
+
+        read_remotes(repo)
+        read_remotes(repo)
+        assert len(reads) == 1
+
+        git(repo, 'remote', 'add', 'upstream', 'git@github.com:alejandrogomez/shipit.git')
+        config = os.path.join(repo, '.git', 'config')
+        os.utime(config, (0, os.stat(config).st_mtime + 1))
+
+        assert set(read_remotes(repo)) == set(['origin', 'upstream'])
+        assert len(reads) == 2
+    finally:
+        shutil.rmtree(repo)
+
+
+def test_git_reads_what_shipit_can_not(home, monkeypatch):
+    repo = make_repo()
+    try:
+        git(repo, 'remote', 'add', 'origin', 'git@github.com:dialelo/shipit.git')
+        git(repo, 'config', 'includeIf.hasconfig:remote.*.url:*.path', 'other')
+        monkeypatch.setattr(shipit_git, '_git_remotes',
+                            lambda cwd=None: {'origin': 'git@github.com:from/git.git'})
+
+        assert get_remotes(repo) == {'origin': 'git@github.com:from/git.git'}
+    finally:
+        shutil.rmtree(repo)
+
+
+def test_current_branch_and_where_it_is_pushed(home):
+    repo = make_repo()
+    try:
+        sha = commit_file(repo, 'a.txt', 'one\n')
+        git(repo, 'checkout', '-q', '-b', 'fix-crash')
+        git(repo, 'remote', 'add', 'fork', 'git@github.com:me/shipit.git')
+
+        branch = current_branch(repo)
+        assert (branch.name, branch.sha) == ('fix-crash', sha)
+        assert (branch.remote, branch.remote_branch) == ('origin', 'fix-crash')
+
+        git(repo, 'config', 'branch.fix-crash.remote', 'fork')
+        git(repo, 'config', 'branch.fix-crash.merge', 'refs/heads/crash')
+        git(repo, 'pack-refs', '--all')
+
+        branch = current_branch(repo)
+        assert branch.sha == sha
+        assert (branch.remote, branch.remote_branch) == ('fork', 'crash')
+
+        git(repo, 'checkout', '-q', '--detach')
+        assert current_branch(repo) is None
+    finally:
+        shutil.rmtree(repo)
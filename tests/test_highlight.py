@@ -0,0 +1,52 @@
+from shipit.highlight import parse_hunks, intraline_changes, highlight_hunk
+
+
+DIFF = [
+    "diff --git a/shipit/func.py b/shipit/func.py",
+    "index 1111111..2222222 100644",
+    "--- a/shipit/func.py",
+    "+++ b/shipit/func.py",
+    "@@ -1,2 +1,2 @@",
+    "-def lines(line_list):",
+    "+def lines(items):",
+    " pass",
+    "@@ -10,1 +10,1 @@",
+    "--- not a header",
+    "diff --git a/README.md b/README.md",
+    "@@ -1 +1 @@",
+    "+shipit",
+]
+
+
+def test_parse_hunks():
+    hunks = parse_hunks(DIFF)
+
+    assert [(h.filename, h.start, h.end) for h in hunks] == [
+        ("shipit/func.py", 4, 8),
+        ("shipit/func.py", 8, 10),
+        ("README.md", 11, 13),
+    ]
+
+
+def test_hunk_keys_depend_on_contents():
+    first, second, _ = parse_hunks(DIFF)
+
+    assert first.key(DIFF) == parse_hunks(DIFF)[0].key(DIFF)
+    assert first.key(DIFF) != second.key(DIFF)
+
+
+def test_intraline_changes_pair_removed_and_added_lines():
+    changes = intraline_changes(["-def lines(line_list):",
+                                 "+def lines(items):",
+                                 " pass"])
+
+    assert changes == {0: [(10, 19)], 1: [(10, 15)]}
+
+
+def test_highlight_hunk_marks_changed_words():
+    markup = highlight_hunk("unknown", ["@@ -1 +1 @@", "-a = 1", "+a = 2"])
+
+    assert markup[0] == ("cyan_text", "@@ -1 +1 @@")
+    assert ("removed_word", "1") in markup[1]
+    assert ("added_word", "2") in markup[2]
+    assert "".join(text for _, text in markup[2]) == "+a = 2"
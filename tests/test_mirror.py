@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+from shipit.mirror import Mirror
+from shipit.scheduler import Scheduler
+
+API = "https://api.github.com/repos/dialelo/shipit"
+
+
+class Page(object):
+    def __init__(self, json, next=None):
+        self._json = json
+        self.links = {"next": {"url": next}} if next else {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._json
+
+
+class PagedSession(object):
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def get(self, url, params=None):
+        self.requests.append((url, params))
+        return self.pages[url]
+
+
+class Repository(object):
+    def __init__(self, session):
+        self._session = session
+        self._api = API
+
+
+class Interrupted(Exception):
+    pass
+
+
+def listed(number, **fields):
+    json = {"id": number * 10, "number": number, "title": "Crash", "comments": 1,
+            "url": API + "/issues/%s" % number,
+            "comments_url": API + "/issues/%s/comments" % number}
+    json.update(fields)
+    return json
+
+
+def comment(id):
+    return {"id": id, "body": "Same here"}
+
+
+def make_session():
+    pull = {"url": API + "/pulls/2"}
+    return PagedSession({
+        API + "/issues": Page([listed(1), listed(2, pull_request=pull)],
+                              next=API + "/issues?page=2"),
+        API + "/issues?page=2": Page([listed(3, comments=0)]),
+        API + "/issues/1/comments": Page([comment(100)], next=API + "/issues/1/comments?page=2"),
+        API + "/issues/1/comments?page=2": Page([comment(101)]),
+        API + "/issues/2/comments": Page([comment(200)]),
+        API + "/pulls/2/comments": Page([comment(201)]),
+    })
+
+
+def read(path):
+    with open(str(path)) as f:
+        return [json.loads(line) for line in f]
+
+
+def mirrored(lines):
+    return [(line["type"], line.get("issue"), line["data"]["id"]) for line in lines]
+
+
+def test_everything_is_mirrored_page_by_page(tmpdir):
+    session = make_session()
+    path = tmpdir.join("shipit.ndjson")
+    progress = []
+
+    mirror = Mirror(Repository(session), str(path), Scheduler(), progress.append)
+    assert mirror.run() == 3
+
+    assert mirrored(read(path)) == [("issue", None, 10),
+                                    ("comment", 1, 100),
+                                    ("comment", 1, 101),
+                                    ("issue", None, 20),
+                                    ("comment", 2, 200),
+                                    ("review_comment", 2, 201),
+                                    ("issue", None, 30)]
+    assert progress == [2, 3]
+    assert session.requests[0][1]["state"] == "all"
+    assert not tmpdir.join("shipit.ndjson.checkpoint").exists()
+
+
+def test_an_interrupted_mirror_goes_on_from_the_last_page(tmpdir):
+    session = make_session()
+    path = tmpdir.join("shipit.ndjson")
+
+    def interrupt(issues):
+        # Half written, after the first page was checkpointed
+        path.write("{\"type\": \"iss", mode="a")
+        raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        Mirror(Repository(session), str(path), Scheduler(), interrupt).run()
+    assert tmpdir.join("shipit.ndjson.checkpoint").exists()
+
+    session.requests = []
+    assert Mirror(Repository(session), str(path), Scheduler()).run() == 3
+
+    assert [line["data"]["number"] for line in read(path) if line["type"] == "issue"] == [1, 2, 3]
+    assert session.requests == [(API + "/issues?page=2", None)]
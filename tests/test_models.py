@@ -1,4 +1,7 @@
-from shipit.models import DataSource, DataFilter
+from shipit import models
+from shipit.models import DataSource, DataFilter, Comments, PullRequestSource
+from shipit.poller import Updates
+from shipit.records import record_from_json
 
 
 class DummyDataSource(DataSource):
@@ -44,3 +47,188 @@ def test_data_filter():
     composed = DataFilter.compose(even_filter, greater_than_filter)
     for x in composed(iter(ds)):
         assert x > limit and is_even(x)
+
+
+class DummyIssue(object):
+    def __init__(self, comments):
+        self.comments = comments
+        self.pages_requested = 0
+
+    def iter_comments(self):
+        for i in range(self.comments):
+            if i % Comments.PAGE_SIZE == 0:
+                self.pages_requested += 1
+            yield i
+
+
+def test_comments_are_fetched_a_page_at_a_time():
+    issue = DummyIssue(Comments.PAGE_SIZE + 5)
+    comments = Comments(issue)
+
+    assert len(comments) == 0
+    assert issue.pages_requested == 0
+
+    comments.fetch_page()
+    assert len(comments) == Comments.PAGE_SIZE
+    assert issue.pages_requested == 1
+    assert not comments.exhausted
+
+    comments.fetch_page()
+    assert len(comments) == Comments.PAGE_SIZE + 5
+    assert comments.exhausted
+    assert comments.fetch_page() == []
+
+
+def test_issue_without_comments_is_not_fetched():
+    comments = Comments(DummyIssue(0))
+
+    assert comments.exhausted
+    assert comments.fetch_page() == []
+
+
+
+def pull_request(number, state="open", title="Fix"):
+    return {
+        "id": number, "number": number, "title": title, "state": state,
+        "user": {"login": "dialelo", "id": 1}, "labels": [], "comments": 0,
+        "html_url": "https://github.com/dialelo/shipit/pull/%s" % number,
+        "url": "https://api.github.com/repos/dialelo/shipit/issues/%s" % number,
+        "pull_request": {
+            "url": "https://api.github.com/repos/dialelo/shipit/pulls/%s" % number,
+        },
+    }
+
+
+def test_pull_requests_are_updated_in_place():
+    source = PullRequestSource(repo=None)
+    pr = record_from_json(pull_request(1, title="Old"), None)
+    source.pulls.append(pr)
+
+    assert source.upsert(record_from_json(pull_request(1, title="New"), None)) is pr
+    assert pr.title == "New"
+
+    assert source.upsert(record_from_json(pull_request(2), None)) in source.pulls
+
+    # Closed pull requests aren't tracked anymore
+    source.upsert(record_from_json(pull_request(1, state="closed"), None))
+    assert [p.number for p in source.pulls] == [2]
+
+
+def test_pull_requests_of_the_last_run_are_replaced_when_fetched(monkeypatch):
+    source = PullRequestSource(repo=None)
+    old = record_from_json(pull_request(1, title="Old"), None)
+    source.restore([old, record_from_json(pull_request(2), None)])
+    assert source.stale
+
+    fetched = [record_from_json(pull_request(1, title="New"), None),
+               record_from_json(pull_request(3), None)]
+    monkeypatch.setattr(models, "fetch_issue_records", lambda repo, state: fetched)
+
+    assert [p.number for p in source] == [1, 3]
+    assert source.pulls[0] is old and old.title == "New"
+    assert not source.stale
+
+
+def test_a_failed_load_is_reported_and_tried_again(monkeypatch):
+    class Repository(object):
+        full_name = "dialelo/shipit"
+
+    class Scheduler(object):
+        def submit(self, func, priority, callback, errback):
+            try:
+                callback(func())
+            except IOError as error:
+                errback(error)
+
+    monkeypatch.setattr(models, "SCHEDULER", Scheduler())
+    monkeypatch.setattr(models, "trigger", lambda *args: None)
+
+    def unreachable(repo, state):
+        raise IOError("timeout")
+
+    monkeypatch.setattr(models, "fetch_issue_records", unreachable)
+    errors = []
+    repo = Repository()
+    issues_and_prs = models.IssuesAndPullRequests([repo], writes=None,
+                                                  on_error=lambda *args: errors.append(args))
+
+    issues_and_prs.show_pull_requests()
+    assert [(r, str(e)) for r, e in errors] == [(repo, "timeout")]
+    assert not issues_and_prs._prs_sources[0].bootstrapped
+
+    monkeypatch.setattr(models, "fetch_issue_records",
+                        lambda repo, state: [record_from_json(pull_request(1), None)])
+    issues_and_prs.show_pull_requests()
+    assert [pr.number for pr in issues_and_prs] == [1]
+    assert len(errors) == 1
+
+
+def test_pull_requests_are_fetched_again_when_events_were_missed(monkeypatch):
+    class Repository(object):
+        full_name = "dialelo/shipit"
+
+    class Scheduler(object):
+        def submit(self, func, priority, callback, errback):
+            callback(func())
+
+    monkeypatch.setattr(models, "SCHEDULER", Scheduler())
+    monkeypatch.setattr(models, "trigger", lambda *args: None)
+    fetched = [record_from_json(pull_request(1), None), record_from_json(pull_request(2), None)]
+    monkeypatch.setattr(models, "fetch_issue_records", lambda repo, state: fetched)
+
+    repo = Repository()
+    issues_and_prs = models.IssuesAndPullRequests([repo], writes=None)
+    issues_and_prs.show_pull_requests()
+    assert [pr.number for pr in issues_and_prs] == [1, 2]
+
+    # #1 was closed while the feed went past the last event we saw
+    fetched = [record_from_json(pull_request(2), None), record_from_json(pull_request(3), None)]
+    issues_and_prs.update(Updates(missed=True), repo)
+    assert [pr.number for pr in issues_and_prs] == [2, 3]
+    assert not issues_and_prs.stale
+
+
+def test_mentions_are_found_in_bodies_and_fetched_comments(monkeypatch):
+    class Comment(object):
+        def __init__(self, body_text):
+            self.body_text = body_text
+
+    class Loaded(object):
+        loaded = [Comment("ping @dialelo please")]
+
+    details = models.DetailStore()
+    monkeypatch.setattr(models, "DETAILS", details)
+    mentioned = record_from_json(pull_request(1), None)
+    in_body = record_from_json(dict(pull_request(2), body="Thanks @dialelo for this"), None)
+    other = record_from_json(pull_request(3), None)
+    details._comments.put(models.item_key(mentioned), (None, Loaded()))
+
+    # Records have no session to make requests with
+    items = [mentioned, in_body, other]
+    assert list(models.MentioningFilter("dialelo").filter(items)) == [mentioned, in_body]
+
+
+def test_pull_requests_are_hydrated_with_their_issue_concurrently(monkeypatch):
+    submitted = []
+
+    class Scheduler(object):
+        def submit(self, func, session, url, priority, scope, callback, errback):
+            submitted.append((url, callback))
+
+    monkeypatch.setattr(models, "SCHEDULER", Scheduler())
+    monkeypatch.setattr(models, "make_object",
+                        lambda record, issue, pr=None: (issue, pr))
+    details = models.DetailStore()
+    pr = record_from_json(pull_request(1), None)
+    hydrated = []
+
+    details.hydrate_later(pr, hydrated.append)
+    assert [url for url, _ in submitted] == [pr._api, pr.pull_api]
+
+    for url, callback in reversed(submitted):
+        callback(url)
+    assert hydrated == [(pr._api, pr.pull_api)]
+
+    # Fetched once for every version
+    details.hydrate_later(pr, hydrated.append)
+    assert len(submitted) == 2 and len(hydrated) == 2
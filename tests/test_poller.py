@@ -0,0 +1,151 @@
+from shipit.poller import ConditionalPoller, RepositoryEvents
+from shipit.records import PER_PAGE
+
+
+class Response(object):
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class Session(object):
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def get(self, url, params=None, headers=None):
+        self.sent.append(headers)
+        return self.responses.pop(0)
+
+
+def event(id, type, **payload):
+    return {"id": id, "type": type, "payload": payload}
+
+
+def test_polls_are_conditional_and_honour_the_poll_interval():
+    session = Session(Response(200, [], {"ETag": '"abc"', "X-Poll-Interval": "90"}),
+                      Response(304, headers={"X-Poll-Interval": "120"}))
+    poller = ConditionalPoller(session, "/events", on_change=None)
+
+    assert poller.poll() == []
+    assert poller.interval == 90
+    assert poller.poll() is None
+    assert poller.interval == 120
+    assert session.sent == [{}, {"If-None-Match": '"abc"'}]
+
+
+def test_events_are_mapped_to_the_latest_version_of_each_item():
+    events = RepositoryEvents(None, make_record=lambda json: json)
+    pull = {"number": 7, "head": {}}
+
+    # The first page tells where we are
+    assert not events([event("1", "IssuesEvent", issue={"number": 1})])
+
+    updates = events([
+        event("4", "PullRequestEvent", action="opened", pull_request=pull),
+        event("3", "IssueCommentEvent", issue={"number": 2, "comments": 2}),
+        event("2", "IssuesEvent", issue={"number": 2, "comments": 1}),
+        event("1", "IssuesEvent", issue={"number": 1}),
+    ])
+
+    # The dicts aren't records, so they're all taken for issues
+    assert sorted(updates.issues, key=lambda json: json["number"]) == [
+        {"number": 2, "comments": 2}, pull]
+    assert not events([event("4", "PullRequestEvent")])
+
+
+class Page(object):
+    def __init__(self, payload, next=None):
+        self.payload = payload
+        self.links = {"next": {"url": next}} if next else {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class PagedSession(object):
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def get(self, url, params=None):
+        self.requests.append((url, params))
+        return self.pages.pop(0)
+
+
+def test_pages_are_followed_until_the_last_event_seen():
+    def comments(start):
+        return [event(str(id), "IssueCommentEvent", issue={"number": id})
+                for id in range(start, start - PER_PAGE, -1)]
+
+    first, second = comments(250), comments(150)
+    session = PagedSession([Page(second, next="/events?page=3"),
+                            Page([event("50", "IssuesEvent", issue={"number": 50}),
+                                  event("49", "IssuesEvent", issue={"number": 49})])])
+    events = RepositoryEvents(session, make_record=lambda json: json, url="/events")
+    events.last_seen = "50"
+
+    updates = events(first)
+    assert len(updates.issues) == 200 and not updates.missed
+    assert session.requests == [("/events", {"per_page": PER_PAGE, "page": 2}),
+                                ("/events?page=3", None)]
+    assert events.last_seen == "250"
+
+    # Older than the whole feed
+    session.pages = [Page(second)]
+    events.last_seen = "1"
+    assert events(first).missed
+
+
+def test_pull_requests_become_records_of_pull_requests():
+    events = RepositoryEvents(None)
+    events.last_seen = "1"
+
+    updates = events([event("2", "PullRequestEvent", pull_request={
+        "id": 70, "number": 7, "title": "Fix", "state": "open",
+        "user": {"login": "dialelo", "id": 1}, "labels": [], "comments": 3,
+        "head": {}, "merged_at": None,
+        "html_url": "https://github.com/dialelo/shipit/pull/7",
+        "url": "https://api.github.com/repos/dialelo/shipit/pulls/7",
+        "issue_url": "https://api.github.com/repos/dialelo/shipit/issues/7",
+    })])
+
+    [pr] = updates.pulls
+    assert pr._api.endswith("/issues/7") and pr.pull_api.endswith("/pulls/7")
+    assert (pr.comments, pr.merged) == (3, False)
+
+
+def test_polls_since_the_last_modification():
+    modified = "Thu, 01 Oct 2026 10:00:00 GMT"
+    session = Session(Response(200, [{"id": "1"}], {"Last-Modified": modified}),
+                      Response(304))
+    poller = ConditionalPoller(session, "/notifications", on_change=None)
+
+    assert poller.poll() == [{"id": "1"}]
+    assert poller.poll() is None
+    assert session.sent[1] == {"If-Modified-Since": modified}
+
+
+def test_polling_goes_on_when_the_changes_can_not_be_applied():
+    def on_change(changes):
+        raise OSError("disk full")
+
+    poller = ConditionalPoller(None, "/events", on_change=on_change)
+    scheduled = []
+    poller._schedule = scheduled.append
+
+    try:
+        poller._on_poll([event(1, "IssuesEvent")])
+    except OSError:
+        pass
+    assert scheduled == [poller.interval]
@@ -0,0 +1,75 @@
+from shipit.prefetch import Prefetcher
+from shipit.records import record_from_json
+from shipit.scheduler import Scheduler, Request
+
+
+def issue(number, **fields):
+    json = {"id": number, "number": number, "title": "Crash", "state": "open",
+            "comments": 0, "updated_at": "2014-01-21T10:00:00Z",
+            "html_url": "https://github.com/shipit/shipit/issues/%s" % number,
+            "url": "https://api.github.com/repos/shipit/shipit/issues/%s" % number}
+    json.update(fields)
+    return record_from_json(json, None)
+
+
+def test_neighbourhood_is_ordered_by_distance():
+    items = list(range(10))
+
+    assert Prefetcher.neighbourhood(items, 5) == [5, 6, 4, 7, 3]
+    assert Prefetcher.neighbourhood(items, 0) == [0, 1, 2]
+
+
+def test_items_are_warmed_once():
+    warmed = []
+    scheduler = Scheduler()
+    prefetcher = Prefetcher(warmed.append, scheduler)
+    items = [issue(n) for n in range(10)]
+
+    prefetcher.focus(items, 5)
+    scheduler.join()
+    prefetcher.focus(items, 6)
+    scheduler.join()
+
+    assert warmed == [items[n] for n in [5, 6, 4, 7, 3, 8]]
+
+
+def test_updated_items_are_warmed_again():
+    warmed = []
+    scheduler = Scheduler()
+    prefetcher = Prefetcher(warmed.append, scheduler)
+    items = [issue(1)]
+
+    prefetcher.focus(items, 0)
+    scheduler.join()
+    prefetcher.focus(items, 0)
+    scheduler.join()
+    assert len(warmed) == 1
+
+    items = [issue(1, comments=1)]
+    prefetcher.focus(items, 0)
+    scheduler.join()
+    assert warmed == [warmed[0], items[0]]
+    assert not prefetcher._jobs
+
+
+class IdleScheduler(object):
+    """A scheduler that never runs its requests."""
+    def __init__(self):
+        self.requests = []
+
+    def submit(self, func, *args, **kwargs):
+        request = Request(func, args, kwargs, kwargs.pop("priority"))
+        self.requests.append(request)
+        return request
+
+
+def test_moving_the_focus_cancels_pending_work():
+    scheduler = IdleScheduler()
+    prefetcher = Prefetcher(lambda item: None, scheduler)
+    items = [issue(n) for n in range(10)]
+
+    prefetcher.focus(items, 0)
+    prefetcher.focus(items, 9)
+
+    cancelled = [request.cancelled for request in scheduler.requests]
+    assert cancelled == [True] * 3 + [False] * 3
@@ -0,0 +1,49 @@
+from shipit.ratelimit import RateLimit, RESERVE
+from shipit.scheduler import INTERACTIVE, VISIBLE_REFRESH, PREFETCH, BULK
+
+
+NOW = 1000000
+
+
+def rate_limit(remaining, limit=5000, reset_in=3600):
+    rl = RateLimit()
+    rl.update({
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(NOW + reset_in),
+    })
+    return rl
+
+
+def test_unknown_rate_limit_allows_everything():
+    rl = RateLimit()
+    rl.update({})
+
+    assert rl.remaining is None
+    assert all(rl.allows(p) for p in [INTERACTIVE, PREFETCH, BULK])
+    assert rl.delay(BULK, now=NOW) == 0
+
+
+def test_plenty_of_quota_doesnt_slow_anything_down():
+    rl = rate_limit(4000)
+    rl.started(BULK, now=NOW)
+
+    assert rl.delay(BULK, now=NOW) == 0
+    assert rl.delay(PREFETCH, now=NOW) == 0
+
+
+def test_background_requests_are_spaced_out_as_quota_shrinks():
+    rl = rate_limit(1000)
+    rl.started(PREFETCH, now=NOW)
+
+    # 1000 - 100 (reserve) - 500 (10%) requests left for an hour
+    assert rl.delay(PREFETCH, now=NOW) == 3600 / 400.0
+    assert rl.delay(INTERACTIVE, now=NOW) == 0
+
+
+def test_reserve_is_kept_for_interactive_requests():
+    rl = rate_limit(RESERVE, reset_in=600)
+
+    assert rl.delay(VISIBLE_REFRESH, now=NOW) == 600
+    assert rl.delay(INTERACTIVE, now=NOW) == 0
+    assert rl.allows(INTERACTIVE)
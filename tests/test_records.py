@@ -0,0 +1,90 @@
+import sys
+from datetime import datetime
+
+from shipit.records import (IssueRecord, PullRequestRecord, record_from_json,
+                            fetch_records)
+
+
+def issue(number, **fields):
+    json = {
+        "id": number * 10, "number": number, "title": "Crash", "state": "open",
+        "user": {"login": "dialelo", "id": 1}, "assignee": None, "milestone": None,
+        "labels": [], "comments": 1,
+        "created_at": "2014-01-20T10:00:00Z", "updated_at": "2014-01-21T10:00:00Z",
+        "closed_at": None,
+        "html_url": "https://github.com/dialelo/shipit/issues/%s" % number,
+        "url": "https://api.github.com/repos/dialelo/shipit/issues/%s" % number,
+    }
+    json.update(fields)
+    return json
+
+
+def test_records_keep_what_lists_show():
+    milestone = {"id": 5, "number": 1, "title": "1.0"}
+    record = record_from_json(issue(1, milestone=milestone), None)
+
+    assert isinstance(record, IssueRecord)
+    assert not isinstance(record, PullRequestRecord)
+    assert (record.number, str(record.user), record.milestone.title) == (1, "dialelo", "1.0")
+    assert record.updated_at == datetime(2014, 1, 21, 10)
+    assert not hasattr(record, "__dict__")
+
+
+def test_records_share_strings_and_entries():
+    one = record_from_json(issue(1), None)
+    other = record_from_json(issue(2), None)
+
+    assert one.user is other.user
+    assert one.state is other.state is sys.intern("open")
+
+
+def test_issues_of_pull_requests_are_pull_request_records():
+    pulls = {"url": "https://api.github.com/repos/dialelo/shipit/pulls/3",
+             "merged_at": "2014-01-22T10:00:00Z"}
+    record = record_from_json(issue(3, pull_request=pulls), None)
+
+    assert isinstance(record, PullRequestRecord)
+    assert record.pull_api == pulls["url"]
+    assert record.merged
+
+
+def test_records_are_updated_with_newer_records():
+    record = record_from_json(issue(1), None)
+    record.update(record_from_json(issue(1, state="closed", comments=2), None))
+
+    assert (record.state, record.comments) == ("closed", 2)
+
+
+class Page(object):
+    def __init__(self, json, next=None):
+        self._json = json
+        self.links = {"next": {"url": next}} if next else {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._json
+
+
+class PagedSession(object):
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def get(self, url, params=None):
+        self.requests.append((url, params))
+        return self.pages[url]
+
+
+def test_records_are_fetched_from_every_page():
+    session = PagedSession({
+        "/issues": Page([issue(1), issue(2)], next="/issues?page=2"),
+        "/issues?page=2": Page([issue(3)]),
+    })
+
+    records = fetch_records(session, "/issues", {"state": "open"})
+
+    assert [record.number for record in records] == [1, 2, 3]
+    assert session.requests == [("/issues", {"state": "open", "per_page": 100}),
+                                ("/issues?page=2", None)]
@@ -0,0 +1,32 @@
+from shipit.registry import Registry, Label, User
+
+
+def label(id, name="bug", color="fc2929"):
+    return {"id": id, "name": name, "color": color}
+
+
+def test_registry_keeps_an_entry_for_every_id():
+    registry = Registry(User)
+    first = registry.get({"id": 1, "login": "alejandrogomez"})
+
+    assert registry.get({"id": 1, "login": "alejandrogomez"}) is first
+    assert registry.get({"id": 2, "login": "dialelo"}) is not first
+    assert registry.get(None) is None
+    assert len(registry) == 2
+
+
+def test_labels_have_their_attribute():
+    registry = Registry(Label)
+    bug = registry.get(label(1))
+
+    assert bug.attr.foreground == "black"
+    assert registry.get(label(1)).attr is bug.attr
+
+
+def test_entries_are_updated_in_place():
+    registry = Registry(Label)
+    bug = registry.get(label(1, color="ffffff"))
+
+    assert registry.get(label(1, name="crash", color="fc2929")) is bug
+    assert (bug.name, bug.color) == ("crash", "fc2929")
+    assert bug.attr.background == registry.get(label(2, color="fc2929")).attr.background
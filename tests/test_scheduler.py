@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+
+from shipit.scheduler import (
+    Scheduler, Cancelled, OverBudget,
+
+    INTERACTIVE, VISIBLE_REFRESH, PREFETCH, BULK,
+)
+
+
+ONE_AT_A_TIME = {INTERACTIVE: 1, VISIBLE_REFRESH: 1, PREFETCH: 1, BULK: 1}
+
+
+def test_call_runs_in_the_calling_thread():
+    scheduler = Scheduler()
+
+    assert scheduler.call(threading.current_thread) is threading.current_thread()
+    assert scheduler.call(pow, 2, 3, priority=BULK) == 8
+
+
+def test_submit_runs_in_the_background():
+    scheduler = Scheduler()
+    results = []
+
+    scheduler.submit(pow, 2, 3, callback=results.append)
+    scheduler.join()
+
+    assert results == [8]
+
+
+def test_failures_are_passed_to_the_errback():
+    scheduler = Scheduler()
+    errors = []
+
+    scheduler.submit(int, "not a number", errback=errors.append)
+    scheduler.join()
+
+    assert isinstance(errors[0], ValueError)
+
+
+def test_busy_classes_dont_hold_back_the_others():
+    scheduler = Scheduler(limits=ONE_AT_A_TIME)
+    blocker = threading.Event()
+    order = []
+
+    # Fill the only BULK slot
+    scheduler.submit(blocker.wait, priority=BULK)
+    scheduler.submit(order.append, "bulk", priority=BULK)
+    scheduler.submit(order.append, "prefetch", priority=PREFETCH)
+    scheduler.submit(order.append, "interactive", priority=INTERACTIVE)
+
+    blocker.set()
+    scheduler.join()
+
+    assert order.index("interactive") < order.index("bulk")
+    assert set(order) == {"bulk", "prefetch", "interactive"}
+
+
+def test_cancel_scope():
+    scheduler = Scheduler(limits=ONE_AT_A_TIME)
+    blocker = threading.Event()
+    results, errors = [], []
+
+    scheduler.submit(blocker.wait, priority=PREFETCH)
+    scheduler.submit(results.append, "left", priority=PREFETCH, scope="issue.1",
+                     errback=errors.append)
+    scheduler.submit(results.append, "kept", priority=PREFETCH, scope="issue.2")
+
+    scheduler.cancel_scope("issue.1")
+    blocker.set()
+    scheduler.join()
+
+    assert results == ["kept"]
+    assert isinstance(errors[0], Cancelled)
+
+
+def test_calls_within_a_request_dont_wait_for_a_slot():
+    scheduler = Scheduler(limits=ONE_AT_A_TIME)
+    results = []
+
+    def nested():
+        return scheduler.call(pow, 2, 3, priority=PREFETCH)
+
+    scheduler.submit(nested, priority=PREFETCH, callback=results.append)
+    scheduler.join()
+
+    assert results == [8]
+
+
+class Exhausted(object):
+    """A budget with room for interactive requests only."""
+    def allows(self, priority):
+        return priority == INTERACTIVE
+
+    def delay(self, priority):
+        return 0 if priority == INTERACTIVE else 3600
+
+    def started(self, priority):
+        pass
+
+
+def test_budget_defers_background_requests():
+    scheduler = Scheduler(budget=Exhausted())
+    results = []
+
+    scheduler.submit(results.append, "bulk", priority=BULK)
+    scheduler.submit(results.append, "interactive", priority=INTERACTIVE)
+
+    assert scheduler.call(pow, 2, 3) == 8
+    with pytest.raises(OverBudget):
+        scheduler.call(pow, 2, 3, priority=BULK)
+
+    while scheduler.pending() > 1:
+        time.sleep(0.01)
+    assert results == ["interactive"]
+
+
+def test_map_calls_concurrently_and_keeps_the_order():
+    scheduler = Scheduler(limits={INTERACTIVE: 3, VISIBLE_REFRESH: 1, PREFETCH: 1, BULK: 1})
+    barrier = threading.Barrier(3, timeout=5)
+
+    def slow_square(n):
+        # Only returns once the three calls are running at the same time
+        barrier.wait()
+        return n * n
+
+    assert scheduler.map(slow_square, [1, 2, 3]) == [1, 4, 9]
@@ -0,0 +1,46 @@
+from shipit.search import LineIndex, Search
+
+
+LINES = [
+    "diff --git a/shipit/ui.py b/shipit/ui.py",
+    "@@ -1,3 +1,3 @@",
+    "-import Urwid",
+    "+import urwid",
+    " def diff(pr):",
+    "+    return pr_diff(pr)",
+]
+
+
+def test_find_returns_a_match_per_line():
+    index = LineIndex(LINES)
+
+    assert index.find("diff") == [0, 4, 5]
+    assert index.find("urwid") == [2, 3]
+    assert index.find("missing") == []
+
+
+def test_search_narrows_previous_matches():
+    search = Search(LineIndex(LINES))
+
+    assert search.update("d") == [0, 2, 3, 4, 5]
+    assert search.update("di") == [0, 4, 5]
+    assert search.update("dif") == [0, 4, 5]
+    assert search.update("diff(") == [4, 5]
+
+    # Not a refinement of the previous query
+    assert search.update("import") == [2, 3]
+    assert search.update("") == []
+
+
+def test_next_and_previous_wrap_around():
+    search = Search(LineIndex(LINES))
+    search.update("diff")
+
+    assert search.first(0) == 0
+    assert search.next(0) == 4
+    assert search.next(5) == 0
+    assert search.previous(4) == 0
+    assert search.previous(0) == 5
+
+    search.update("missing")
+    assert search.next(0) is None
@@ -0,0 +1,58 @@
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.exceptions import ConnectTimeout
+
+from shipit.session import Session
+
+
+class RecordingAdapter(BaseAdapter):
+    def __init__(self, error=None):
+        super(RecordingAdapter, self).__init__()
+        self.error = error
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append((request, kwargs))
+        if self.error is not None:
+            raise self.error
+        response = Response()
+        response.status_code = 200
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def test_session_is_pooled_and_compressed():
+    session = Session(pool_size=3)
+
+    assert session.adapter._pool_maxsize == 3
+    assert "gzip" in session.headers["Accept-Encoding"]
+    assert session.headers["Connection"] == "keep-alive"
+
+
+def test_requests_have_a_timeout_and_are_counted():
+    session = Session(connect_timeout=1, read_timeout=2)
+    adapter = RecordingAdapter()
+    session.mount("https://", adapter)
+
+    session.get("https://api.github.com/")
+
+    _, kwargs = adapter.sent[0]
+    assert kwargs["timeout"] == (1, 2)
+    assert session.stats.requests == 1
+    assert "requests: 1 (0 errors, 0 timeouts)" in session.report()
+
+
+def test_timeouts_are_counted():
+    session = Session()
+    session.mount("https://", RecordingAdapter(error=ConnectTimeout()))
+
+    try:
+        session.get("https://api.github.com/")
+    except ConnectTimeout:
+        pass
+
+    assert session.stats.timeouts == 1
+    assert session.stats.errors == 0
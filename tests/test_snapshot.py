@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from shipit import snapshot
+from shipit.records import IssueRecord, PullRequestRecord, record_from_json
+
+
+def issue(number, **fields):
+    json = {
+        "id": number, "number": number, "title": "Crash", "state": "open",
+        "user": {"login": "dialelo", "id": 1}, "assignee": None,
+        "milestone": {"id": 5, "number": 1, "title": "1.0"},
+        "labels": [{"id": 7, "name": "bug", "color": "fc2929"}], "comments": 3,
+        "created_at": "2014-01-20T10:00:00Z", "updated_at": "2014-01-21T10:00:00Z",
+        "closed_at": None,
+        "html_url": "https://github.com/dialelo/shipit/issues/%s" % number,
+        "url": "https://api.github.com/repos/dialelo/shipit/issues/%s" % number,
+    }
+    json.update(fields)
+    return json
+
+
+def test_records_are_the_same_in_the_next_run(tmpdir):
+    path = str(tmpdir.join("shipit.json"))
+    pr_json = issue(2, state="closed", closed_at="2014-01-22T10:00:00Z", pull_request={
+        "url": "https://api.github.com/repos/dialelo/shipit/pulls/2",
+        "merged_at": "2014-01-22T10:00:00Z",
+    })
+    records = [record_from_json(issue(1), None), record_from_json(pr_json, None)]
+
+    snapshot.save(path, records)
+    loaded = snapshot.load(path, None)
+
+    assert [type(r) for r in loaded] == [IssueRecord, PullRequestRecord]
+    for record, restored in zip(records, loaded):
+        for field in IssueRecord.fields():
+            assert getattr(restored, field) == getattr(record, field)
+    assert loaded[0].labels[0] is records[0].labels[0]
+    assert loaded[1].merged and loaded[1].closed_at == datetime(2014, 1, 22, 10)
+
+
+def test_missing_or_corrupted_snapshots_are_empty(tmpdir):
+    path = tmpdir.join("shipit.json")
+    assert snapshot.load(str(path), None) == []
+
+    path.write("{")
+    assert snapshot.load(str(path), None) == []
+
+
+def test_snapshots_are_saved_from_several_threads(tmpdir):
+    import threading
+
+    path = str(tmpdir.join("shipit.json"))
+    records = [record_from_json(issue(1), None)]
+    errors = []
+
+    def save():
+        try:
+            for _ in range(20):
+                snapshot.save(path, records)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=save) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert [r.number for r in snapshot.load(path, None)] == [1]
+    assert tmpdir.listdir() == [tmpdir.join("shipit.json")]
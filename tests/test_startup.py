@@ -0,0 +1,19 @@
+from shipit.startup import StartupProfile
+
+
+def test_phases_and_total_are_reported():
+    now = [0.0]
+    profile = StartupProfile(clock=lambda: now[0])
+
+    with profile.phase("import urwid"):
+        now[0] += 0.25
+    now[0] += 0.5
+    profile.finish()
+    # Only the first frame counts
+    now[0] += 1
+    profile.finish()
+
+    assert profile.phases == [("import urwid", 0.25), ("first frame", 0.5)]
+    assert profile.report().splitlines() == ["import urwid  250.0ms",
+                                             "first frame   500.0ms",
+                                             "total         750.0ms"]
@@ -0,0 +1,42 @@
+import os
+
+from shipit import workers
+from shipit.workers import Worker, call_in_main_thread
+
+
+def fail():
+    raise ValueError("boom")
+
+
+def test_failing_jobs_go_to_their_errback_and_the_worker_goes_on():
+    worker = Worker()
+    errors, results = [], []
+
+    worker.submit(fail, errback=errors.append)
+    worker.submit(fail)
+    worker.submit(lambda: 42, callback=results.append)
+    worker.join()
+
+    assert [str(e) for e in errors] == ["boom"]
+    assert results == [42]
+
+
+def test_callbacks_wait_for_the_ui_thread(monkeypatch):
+    class Loop(object):
+        def watch_pipe(self, callback):
+            self.callback = callback
+            self.read_fd, write_fd = os.pipe()
+            return write_fd
+
+    workers.run_inline(False)
+    monkeypatch.setattr(workers, "_WAKE_UP_FD", None)
+    called = []
+
+    call_in_main_thread(called.append, 1)
+    assert called == []
+
+    loop = Loop()
+    workers.attach(loop)
+    assert os.read(loop.read_fd, 1) == b"."
+    loop.callback()
+    assert called == [1]
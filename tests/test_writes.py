@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+
+from requests.exceptions import ConnectionError, HTTPError
+
+import shipit.writes
+from shipit.scheduler import Scheduler, INTERACTIVE
+from shipit.writes import Write, WriteQueue, Bulk
+
+
+class Issue(object):
+    number = 1
+    _api = "https://api.github.com/repos/shipit/shipit/issues/1"
+
+    def __init__(self, number=1):
+        self.number = number
+        self._api = "https://api.github.com/repos/shipit/shipit/issues/%s" % number
+
+
+class Response(object):
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.content = json.dumps(payload)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError("%s Error" % self.status_code, response=self)
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class Session(object):
+    def __init__(self, status_code=200, error=None):
+        self.status_code = status_code
+        self.error = error
+        self.sent = []
+
+    def request(self, method, url, data=None):
+        if self.error is not None:
+            raise self.error
+        self.sent.append((method, url, json.loads(data)))
+        return Response(self.status_code, {"url": url})
+
+
+def test_writes_are_sent_in_order():
+    session = Session()
+    scheduler = Scheduler()
+    queue = WriteQueue(session, scheduler=scheduler)
+    done = []
+
+    queue.push(Write.close(Issue()), on_done=done.append)
+    queue.push(Write.comment(Issue(), "Fixed"))
+    scheduler.join()
+
+    assert session.sent == [
+        ("PATCH", Issue._api, {"state": "closed"}),
+        ("POST", Issue._api + "/comments", {"body": "Fixed"}),
+    ]
+    assert done == [{"url": Issue._api}]
+    assert len(queue) == 0
+
+
+def test_rejected_writes_are_reported_and_dropped():
+    scheduler = Scheduler()
+    rejected = []
+    queue = WriteQueue(Session(status_code=403), scheduler=scheduler,
+                       on_error=lambda write, error: rejected.append(write))
+    errors = []
+
+    write = Write.reopen(Issue())
+    queue.push(write, on_error=errors.append)
+    scheduler.join()
+
+    assert isinstance(errors[0], HTTPError)
+    assert rejected == [write]
+    assert len(queue) == 0
+
+
+def test_writes_are_retried_when_github_has_an_error(monkeypatch):
+    monkeypatch.setattr(shipit.writes, "RETRY_SECONDS", 3600)
+    scheduler = Scheduler()
+    errors = []
+    queue = WriteQueue(Session(status_code=502), scheduler=scheduler,
+                       on_error=lambda write, error: errors.append(error))
+
+    queue.push(Write.reopen(Issue()))
+    scheduler.join()
+
+    assert errors == []
+    assert len(queue) == 1
+
+
+def test_pending_writes_survive_restarts(monkeypatch):
+    # Don't retry while the test runs
+    monkeypatch.setattr(shipit.writes, "RETRY_SECONDS", 3600)
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "writes.json")
+    try:
+        scheduler = Scheduler()
+        offline = WriteQueue(Session(error=ConnectionError()), path, scheduler)
+        offline.push(Write.edit(Issue(), "Title", "Body"))
+        scheduler.join()
+
+        # It's kept to be sent again later
+        assert len(offline) == 1
+        offline.close()
+
+        session = Session()
+        restarted = WriteQueue(session, path, scheduler)
+        assert len(restarted) == 1
+
+        restarted.flush()
+        scheduler.join()
+        restarted.close()
+
+        assert session.sent == [("PATCH", Issue._api, {"title": "Title", "body": "Body"})]
+        assert WriteQueue(session, path, scheduler).pending == []
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_pending_writes_are_sent_by_one_shipit_only(monkeypatch):
+    monkeypatch.setattr(shipit.writes, "RETRY_SECONDS", 3600)
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "writes.json")
+    try:
+        scheduler = Scheduler()
+        crashed = WriteQueue(Session(error=ConnectionError()), path, scheduler)
+        crashed.push(Write.comment(Issue(), "Fixed"))
+        scheduler.join()
+        crashed.close()
+
+        first = WriteQueue(Session(), path, scheduler)
+        second = WriteQueue(Session(), path, scheduler)
+
+        assert (len(first), len(second)) == (1, 0)
+        assert second.path == path + ".1"
+
+        second.push(Write.close(Issue()))
+        scheduler.join()
+        assert first.session.sent == [] and len(second.session.sent) == 1
+    finally:
+        shutil.rmtree(directory)
+
+
+class FlakySession(Session):
+    """Rejects the writes to even issues."""
+    def request(self, method, url, data=None):
+        if int(url.rsplit("/", 1)[-1]) % 2 == 0:
+            return Response(422, {})
+        return super(FlakySession, self).request(method, url, data)
+
+
+def test_bulk_writes_report_progress_per_item():
+    scheduler = Scheduler()
+    issues = [Issue(n) for n in range(1, 11)]
+    updated, progress = [], []
+
+    bulk = Bulk(FlakySession(), issues, Write.close, scheduler,
+                on_item_done=lambda issue, write, result: updated.append(issue),
+                on_progress=lambda bulk: progress.append(len(bulk.done) + len(bulk.failed)))
+    bulk.start()
+    scheduler.join()
+
+    assert bulk.finished
+    assert sorted(i.number for i in bulk.done) == [1, 3, 5, 7, 9]
+    assert sorted(i.number for i, _ in bulk.failed) == [2, 4, 6, 8, 10]
+    assert sorted(updated, key=lambda i: i.number) == sorted(bulk.done, key=lambda i: i.number)
+    assert sorted(progress) == list(range(1, 11))
+
+
+def test_bulk_writes_are_interactive_but_capped():
+    class SlowSession(Session):
+        in_flight = peak = 0
+        lock = threading.Lock()
+
+        def request(self, method, url, data=None):
+            with self.lock:
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+            time.sleep(0.01)
+            with self.lock:
+                self.in_flight -= 1
+            return super(SlowSession, self).request(method, url, data)
+
+    scheduler = Scheduler(limits={INTERACTIVE: 8, 1: 1, 2: 1, 3: 1})
+    session = SlowSession()
+    bulk = Bulk(session, [Issue(n) for n in range(1, 9)], Write.close, scheduler,
+                concurrency=2).start()
+    scheduler.join()
+
+    assert bulk.finished and len(bulk.done) == 8
+    assert session.peak == 2